@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+from argparse import RawTextHelpFormatter
+
+from mpet.version import __version__
+from mpet.cache import ResultCache, fingerprint
+from mpet.config import Config
+import mpet.utils as utils
+
+desc = """MPET - Multiphase Porous Electrode Theory
+Manage the cache of simulation output used by mpetrun.py -c and mpetsweep.py -c.
+
+  list                 list the entries, most recently used first
+  clear                remove all entries
+  remove KEY|CFG ...   remove entries by key, or the entry of a system config file
+  prune SIZE           remove the least recently used entries until the cache is
+                       smaller than SIZE, e.g. 5G
+
+See also: https://bitbucket.org/bazantgroup/mpet"""
+
+parser = argparse.ArgumentParser(description=desc, formatter_class=RawTextHelpFormatter)
+parser.add_argument('command', choices=['list', 'clear', 'remove', 'prune'])
+parser.add_argument('args', nargs='*', help='Arguments of the command')
+parser.add_argument('-d', '--dir',
+                    help='Cache directory (default: MPET_CACHE_DIR or ~/.cache/mpet)')
+parser.add_argument('-v','--version', action='version',
+                    version='%(prog)s '+__version__)
+args = parser.parse_args()
+
+cache = ResultCache(args.dir)
+if args.command == 'list':
+    entries = cache.entries()
+    for key, size, lastUsed in entries:
+        print(f"{key}  {size/1024**2:10.1f} MB  "
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(lastUsed))}")
+    print(f"{len(entries)} entries, {sum(size for _, size, _ in entries)/1024**2:.1f} MB "
+          f"in {cache.path}")
+elif args.command == 'clear':
+    removed = cache.invalidate()
+    print(f"Removed {len(removed)} entries from {cache.path}")
+elif args.command == 'remove':
+    if not args.args:
+        parser.error('remove needs the keys or config files of the entries to remove')
+    # Config files are processed to find the key of their simulation
+    keys = [fingerprint(Config(arg)) if arg.endswith('.cfg') else arg for arg in args.args]
+    removed = cache.invalidate(keys)
+    for key in keys:
+        print(key, 'removed' if key in removed else 'not in the cache')
+elif args.command == 'prune':
+    if len(args.args) != 1:
+        parser.error('prune needs the size limit of the cache')
+    removed = cache.evict(utils.parse_size(args.args[0]))
+    print(f"Removed {len(removed)} entries from {cache.path}")
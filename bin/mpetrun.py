@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 
-import sys
 import argparse
 from argparse import RawTextHelpFormatter
 
 from mpet.version import __version__
+from mpet.cache import ResultCache
+import mpet.utils as utils
 import mpet.main as main
 
 desc = """MPET - Multiphase Porous Electrode Theory
@@ -20,12 +21,22 @@ See also: https://bitbucket.org/bazantgroup/mpet"""
 
 parser = argparse.ArgumentParser(description=desc, formatter_class=RawTextHelpFormatter)
 parser.add_argument('file', help='MPET system configuration file')
+parser.add_argument('-c', '--cache', nargs='?', const='', metavar='DIR',
+                    help='Use the output of an identical simulation in the cache if available,\n'
+                         'and store the output in the cache otherwise (default directory:\n'
+                         'MPET_CACHE_DIR or ~/.cache/mpet)')
+parser.add_argument('--cache-size', type=utils.parse_size,
+                    help='Size limit of the cache, e.g. 10G (default: 10G)')
 parser.add_argument('-v','--version', action='version',
                     version='%(prog)s '+__version__)
 args = parser.parse_args()
 
+cache = None
+if args.cache is not None:
+    cache = ResultCache(args.cache or None, args.cache_size)
+
 try:
-    main.main(sys.argv[1])
+    main.main(args.file, cache=cache)
 except IndexError:
     print("ERROR: No parameter file specified. Aborting")
     raise
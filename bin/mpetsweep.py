@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import argparse
+from argparse import RawTextHelpFormatter
+
+from mpet.version import __version__
+from mpet.cache import ResultCache
+import mpet.utils as utils
+import mpet.sweep as sweep
+
+desc = """MPET - Multiphase Porous Electrode Theory
+Run variants of a simulation in parallel, each in its own process and output
+directory. The variants are given as a grid of parameter values (all
+combinations are run), as a CSV file with the parameter names in the first row
+and the values of a variant in each next row, or both. Electrode parameters are
+prefixed by cathode. or anode., e.g.
+
+mpetsweep.py params_system.cfg -g Crate=0.5,1,2 -g cathode.k0=1,10 -j 4
+
+The largest variants are started first. A summary of all variants is printed
+at the end and written to summary.csv in the sweep directory.
+
+See also: https://bitbucket.org/bazantgroup/mpet"""
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=desc, formatter_class=RawTextHelpFormatter)
+    parser.add_argument('file', help='MPET system configuration file of the base config')
+    parser.add_argument('-g', '--grid', action='append', default=[], metavar='NAME=VALUES',
+                        help='Values of a parameter, comma-separated or as a Python list')
+    parser.add_argument('-s', '--samples', help='CSV file with the parameters of each variant')
+    parser.add_argument('-o', '--outdir',
+                        help='Folder to create the sweep directory in (default: ./sweeps)')
+    parser.add_argument('-j', '--processes', type=int,
+                        help='Number of simulations to run at the same time '
+                             '(default: number of CPUs)')
+    parser.add_argument('-t', '--timeout', type=float,
+                        help='Time limit of each simulation in seconds')
+    parser.add_argument('-m', '--memory', type=utils.parse_size,
+                        help='Memory limit of each simulation, e.g. 4G')
+    parser.add_argument('-c', '--cache', nargs='?', const='', metavar='DIR',
+                        help='Use the output of identical simulations in the cache if\n'
+                             'available, and store the output in the cache otherwise\n'
+                             '(default directory: MPET_CACHE_DIR or ~/.cache/mpet)')
+    parser.add_argument('--cache-size', type=utils.parse_size,
+                        help='Size limit of the cache, e.g. 10G (default: 10G)')
+    parser.add_argument('-v','--version', action='version',
+                        version='%(prog)s '+__version__)
+    args = parser.parse_args()
+
+    grid = {}
+    for item in args.grid:
+        name, sep, values = item.partition('=')
+        if not sep:
+            parser.error(f'Invalid grid parameter: {item}, expected NAME=VALUES')
+        grid[name.strip()] = sweep.parse_values(values)
+    samples = sweep.read_samples(args.samples) if args.samples else [{}]
+    jobs = [{**sample, **params} for sample in samples for params in sweep.expand_grid(grid)]
+
+    cache = None
+    if args.cache is not None:
+        cache = ResultCache(args.cache or None, args.cache_size)
+
+    rows = sweep.run_sweep(args.file, jobs, outdir=args.outdir, processes=args.processes,
+                           timeout=args.timeout, memory=args.memory, cache=cache)
+    print()
+    print(sweep.format_summary(rows))
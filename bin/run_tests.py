@@ -1,7 +1,7 @@
 import os.path as osp
 import time
 from os import getcwd, makedirs, walk
-from tests.test_suite import run_test_sims, run_test_sims_analyt
+from tests.test_suite import run_test_sims, run_test_sims_analyt, run_test_sims_equivalence
 import tests.test_defs as defs
 from shutil import rmtree
 import argparse
@@ -29,7 +29,14 @@ def run(test_outputs, testDir, tests=None):
         runInfoAnalyt = {
             "testAnalytCylDifn": (defs.testAnalytCylDifn, defs.analytCylDifn),
             "testAnalytSphDifn": (defs.testAnalytSphDifn, defs.analytSphDifn),
+            "testAnalytSphDifnGeometric": (defs.testAnalytSphDifnGeometric, defs.analytSphDifn),
+            "testAnalytSphDifnPoly": (defs.testAnalytSphDifnPoly, defs.analytSphDifnAvg),
         }
+        equivalenceTests = sorted(defs.equivalenceTests)
+    else:
+        # Tests compared to the output of another test
+        equivalenceTests = [test for test in tests if test in defs.equivalenceTests]
+        tests = [test for test in tests if test not in defs.equivalenceTests]
 
     if osp.exists(dirDict["out"]):
         rmtree(dirDict["out"])
@@ -37,6 +44,7 @@ def run(test_outputs, testDir, tests=None):
     dirDict["plots"] = osp.join(dirDict["out"], "plots")
     makedirs(dirDict["plots"])
     run_test_sims(tests, dirDict, pflag)
+    run_test_sims_equivalence(equivalenceTests, dirDict)
     try:
         run_test_sims_analyt(runInfoAnalyt, dirDict)
     except Exception:
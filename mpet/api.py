@@ -0,0 +1,127 @@
+"""Run simulations from Python, with the output kept in memory.
+
+Unlike :func:`mpet.main.main`, :func:`run` does not create a time-stamped history directory,
+copy the config files or record the state of the source code, and it only writes files if an
+output directory is given. This makes it suited to calling the model many times, e.g. in an
+optimization loop.
+
+Example usage:
+
+>>> from mpet import api
+>>> result = api.run('configs/params_system.cfg')
+>>> result['phi_applied'], result['phi_applied_times']
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import daetools.pyDAE as dae
+import numpy as np
+
+import mpet.cache
+from mpet.config import Config
+import mpet.main as main
+import mpet.solvers as solvers
+
+#: File in the cache with the output of :func:`run`
+DATA_FILE = "output_data.npz"
+
+
+class Result:
+    """Output of a simulation run with :func:`run`.
+
+    The output arrays can be accessed with the ``[]`` operator, with the same keys as in the
+    output data file written by :func:`mpet.main.main` (e.g. ``'phi_applied'``,
+    ``'phi_applied_times'``, ``'c_lyte_c'``). As in that file, the values are nondimensional.
+
+    :ivar dict data: Output arrays by key
+    :ivar config: Processed :class:`mpet.config.Config` of the simulation
+    :ivar str endCondition: Description of the end condition that stopped the simulation
+        (e.g. ``'Vmin reached'``), or None if it ran until the end
+    :ivar str error: Message of the error that stopped the simulation, or None
+    :ivar dict timings: Wall clock time of each phase of the simulation (s)
+    :ivar str outdir: Directory the output was written to, or None
+    :ivar bool cached: Whether the output was read from the cache instead of simulated. The
+        timings are then those of the simulation that was stored in the cache.
+    """
+    def __init__(self, data, config, endCondition=None, error=None, timings=None,
+                 outdir=None, cached=False):
+        self.data = data
+        self.config = config
+        self.endCondition = endCondition
+        self.error = error
+        self.timings = timings if timings is not None else {}
+        self.outdir = outdir
+        self.cached = cached
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def keys(self):
+        return self.data.keys()
+
+
+def run(config, outdir=None, progress=None, cache=None):
+    """
+    Run a simulation and return its output.
+
+    :param config: Processed :class:`mpet.config.Config` (e.g. from
+        :meth:`mpet.config.Config.from_mapping`), or the path to a system .cfg file
+    :param str outdir: If given, the output data file, the processed config and
+        run_timings.json are written to this directory, as in the output directory of
+        :func:`mpet.main.main`
+    :param progress: Function called with the simulation time and the time horizon (s) after
+        each reporting interval. If given, the progress is not written to stdout.
+    :param cache: :class:`mpet.cache.ResultCache` to read the output from, if it holds the
+        output of an identical simulation, and to store the output in otherwise
+
+    :return: :class:`Result`
+    """
+    timeStart = time.time()
+    if not isinstance(config, Config):
+        config = Config(config)
+    configTime = time.time() - timeStart
+
+    if outdir is not None:
+        os.makedirs(outdir, exist_ok=True)
+        config.write(outdir)
+
+    if cache is not None:
+        key = mpet.cache.fingerprint(config)
+        outputFiles = main.get_output_files(config, outdir) if outdir is not None else {}
+        hit = cache.get(key, [DATA_FILE] + list(outputFiles.keys()))
+        if hit is not None:
+            entry, result = hit
+            for filename, path in outputFiles.items():
+                shutil.copyfile(os.path.join(entry, filename), path)
+            with np.load(os.path.join(entry, DATA_FILE)) as fi:
+                data = dict(fi)
+            return Result(data, config, endCondition=result["endCondition"],
+                          error=result["error"], timings=result["timings"], outdir=outdir,
+                          cached=True)
+
+    # Evaluation mode of the equations (auto is calibrated after initialization)
+    solvers.set_evaluation_mode(config)
+    dae.daeGetConfig().SetString('daetools.activity.printStats', 'false')
+
+    simulation = main.run_simulation(config, outdir, progress=progress, inMemory=True)
+    totalTime = time.time() - timeStart
+    if outdir is not None:
+        main.write_timings(simulation, configTime, totalTime, outdir)
+
+    timings = {"Config processing": configTime, **simulation.timer.timings,
+               "total": totalTime}
+    data = simulation.memoryReporter.get_data()
+    # Store the output unless the simulation was stopped by an error or interrupted
+    if cache is not None and simulation.error is None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            np.savez(os.path.join(tmpdir, DATA_FILE), **data)
+            cache.put(key, {DATA_FILE: os.path.join(tmpdir, DATA_FILE), **outputFiles},
+                      {"endCondition": simulation.endCondition, "error": simulation.error,
+                       "timings": timings})
+    return Result(data, config, endCondition=simulation.endCondition, error=simulation.error,
+                  timings=timings, outdir=outdir)
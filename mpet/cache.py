@@ -0,0 +1,249 @@
+"""Cache of simulation output, keyed by the processed config.
+
+The key of a simulation (:func:`fingerprint`) is a hash of its processed config, including the
+random seed, the generated particle distributions (``psd_*``, ``G`` and the particle-specific
+parameters in ``indvPart``) and the mpet version, as well as the contents of the files with
+custom functions and of the output of a previous simulation the simulation continues from
+(``prevDir``). Simulations with the same key give the same output, so the output can be reused.
+
+Each entry of the cache is a directory named after the key, which holds output files of the
+simulation. Entries are removed in least recently used order when the size of the cache exceeds
+its limit.
+
+Example usage:
+
+>>> from mpet import api
+>>> from mpet.cache import ResultCache
+>>> cache = ResultCache()
+>>> result = api.run('configs/params_system.cfg', cache=cache)  # runs the simulation
+>>> result = api.run('configs/params_system.cfg', cache=cache)  # reads the output from the cache
+
+Note that without ``randomSeed``, the particle sizes are different in every config, so
+simulations of such configs are not found in the cache.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+import mpet
+
+#: Default cache directory, unless set by the MPET_CACHE_DIR environment variable
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'mpet')
+
+#: Default size limit of the cache (bytes)
+DEFAULT_MAX_SIZE = 10 * 1024**3
+
+#: File with the end condition and error of the simulation of an entry, written last
+RESULT_FILE = 'result.json'
+
+#: System parameters that do not change the output of a simulation. The electrode parameters
+#: are part of the key themselves, instead of the names of their config files, and the format
+#: of the output data file is checked when an entry is read.
+IGNORED_PARAMS = ['cathode', 'anode', 'dataReporter']
+
+
+def _update_hash(h, value):
+    """
+    Add a value from a config to a hash, independent of the order of dictionaries and of the
+    way the value is stored (e.g. pickled).
+
+    :param h: hashlib hash object
+    :param value: Value to add
+    """
+    if isinstance(value, dict):
+        h.update(b'{')
+        for key in sorted(value, key=str):
+            _update_hash(h, str(key))
+            _update_hash(h, value[key])
+        h.update(b'}')
+    elif isinstance(value, np.ndarray) and value.dtype != object:
+        h.update(f'array{value.dtype.str}{value.shape}'.encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        h.update(b'[')
+        for item in value:
+            _update_hash(h, item)
+        h.update(b']')
+    else:
+        if isinstance(value, np.generic):
+            value = value.item()
+        h.update(f'{type(value).__name__}:{value!r};'.encode())
+
+
+def _update_hash_file(h, filename):
+    """
+    Add the contents of a file to a hash, if the file exists.
+
+    :param h: hashlib hash object
+    :param str filename: Path to the file
+    """
+    if filename is None or not os.path.isfile(filename):
+        return
+    with open(filename, 'rb') as fi:
+        for block in iter(lambda: fi.read(1024**2), b''):
+            h.update(block)
+
+
+def fingerprint(config):
+    """
+    Key of the simulation of a processed config in the cache.
+
+    :param config: Processed :class:`mpet.config.Config`
+    :return: Key (hexadecimal string)
+    """
+    h = hashlib.sha256()
+    _update_hash(h, mpet.__version__)
+    system = {key: value for key, value in config.D_s.params.items()
+              if key not in IGNORED_PARAMS}
+    _update_hash(h, system)
+    trodes = {'c': config.D_c}
+    if 'a' in config['trodes']:
+        trodes['a'] = config.D_a
+    for trode, params in trodes.items():
+        _update_hash(h, trode)
+        _update_hash(h, params.params)
+    # Files with custom functions
+    _update_hash_file(h, config['SMset_filename'])
+    for trode in trodes:
+        for key in ['rxnType_filename', 'muRfunc_filename', 'Dfunc_filename']:
+            _update_hash_file(h, config[trode, key])
+    # Initial state of a continued simulation
+    prevDir = config['prevDir']
+    if prevDir and prevDir != 'false':
+        for ext in ['.mat', '.hdf5']:
+            _update_hash_file(h, os.path.join(prevDir, 'output_data' + ext))
+    return h.hexdigest()
+
+
+def _get_size(path):
+    """Total size of the files in a directory (bytes)"""
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                size += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                # removed in the meantime
+                pass
+    return size
+
+
+class ResultCache:
+    def __init__(self, path=None, max_size=None):
+        """
+        Cache of simulation output in a directory on disk. The cache can be shared by
+        simulations that run at the same time, e.g. in a sweep.
+
+        :param str path: Cache directory (default: the MPET_CACHE_DIR environment variable, or
+            :data:`DEFAULT_DIR`)
+        :param int max_size: Size limit of the cache (bytes, default: :data:`DEFAULT_MAX_SIZE`)
+        """
+        if path is None:
+            path = os.environ.get('MPET_CACHE_DIR', DEFAULT_DIR)
+        self.path = os.path.abspath(path)
+        self.max_size = max_size if max_size is not None else DEFAULT_MAX_SIZE
+
+    def get(self, key, filenames=()):
+        """
+        Find the entry of a simulation, and mark it as used.
+
+        :param str key: Key of the simulation, see :func:`fingerprint`
+        :param list filenames: Files the entry must hold, besides the result of the simulation
+
+        :return: tuple of the entry directory and the result of the simulation (a dict with its
+            end condition, error and timings), or None if the entry does not exist or does not
+            hold all files
+        """
+        entry = os.path.join(self.path, key)
+        for filename in [RESULT_FILE] + list(filenames):
+            if not os.path.isfile(os.path.join(entry, filename)):
+                return None
+        with open(os.path.join(entry, RESULT_FILE)) as fi:
+            result = json.load(fi)
+        # The modification time of the entry is the time it was last used
+        os.utime(entry)
+        return entry, result
+
+    def put(self, key, files, result):
+        """
+        Add the output of a simulation to the cache, and remove the least recently used entries
+        if the cache exceeds its size limit. Files that are already in the entry are kept, and
+        files that do not exist are skipped.
+
+        :param str key: Key of the simulation, see :func:`fingerprint`
+        :param dict files: Files to store, {name in the entry: path}
+        :param dict result: End condition, error and timings of the simulation
+
+        :return: Entry directory
+        """
+        entry = os.path.join(self.path, key)
+        os.makedirs(entry, exist_ok=True)
+        # Each file is copied to a temporary file first, so readers never see partial files
+        tmpname = f'.tmp{os.getpid()}'
+        items = [(name, path) for name, path in files.items()
+                 if os.path.isfile(path) and not os.path.isfile(os.path.join(entry, name))]
+        for name, path in items:
+            shutil.copyfile(path, os.path.join(entry, name + tmpname))
+            os.replace(os.path.join(entry, name + tmpname), os.path.join(entry, name))
+        with open(os.path.join(entry, RESULT_FILE + tmpname), 'w') as fo:
+            json.dump(result, fo, indent=4, default=str)
+        os.replace(os.path.join(entry, RESULT_FILE + tmpname), os.path.join(entry, RESULT_FILE))
+        self.evict()
+        return entry
+
+    def entries(self):
+        """
+        Entries of the cache, most recently used first.
+
+        :return: list of (key, size in bytes, time of last use) tuples
+        """
+        if not os.path.isdir(self.path):
+            return []
+        entries = []
+        for key in os.listdir(self.path):
+            entry = os.path.join(self.path, key)
+            try:
+                entries.append((key, _get_size(entry), os.path.getmtime(entry)))
+            except OSError:
+                # removed in the meantime
+                pass
+        return sorted(entries, key=lambda item: item[2], reverse=True)
+
+    def evict(self, max_size=None):
+        """
+        Remove the least recently used entries until the size of the cache is within the limit.
+
+        :param int max_size: Size limit (bytes, default: the size limit of the cache)
+        :return: list of keys of the removed entries
+        """
+        if max_size is None:
+            max_size = self.max_size
+        entries = self.entries()
+        size = sum(entrySize for _, entrySize, _ in entries)
+        removed = []
+        while entries and size > max_size:
+            key, entrySize, _ = entries.pop()
+            shutil.rmtree(os.path.join(self.path, key), ignore_errors=True)
+            size -= entrySize
+            removed.append(key)
+        return removed
+
+    def invalidate(self, keys=None):
+        """
+        Remove entries from the cache.
+
+        :param list keys: Keys of the entries to remove (default: all entries)
+        :return: list of keys of the removed entries
+        """
+        if keys is None:
+            keys = [key for key, _, _ in self.entries()]
+        removed = []
+        for key in keys:
+            entry = os.path.join(self.path, key)
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+                removed.append(key)
+        return removed
@@ -17,7 +17,7 @@ from mpet.config.parameterset import ParameterSet
 
 
 class Config:
-    def __init__(self, paramfile='params.cfg', from_dicts=False):
+    def __init__(self, paramfile='params.cfg', from_dicts=False, mappings=None, samples=None):
         """
         Hold values from system and electrode configuration files, as well as
         derived values. When initializing a new Config object, the invididual
@@ -46,6 +46,11 @@ class Config:
             on disk if from_dicts=True
         :param bool from_dicts: Whether to read existing config dicts from disk.
             Instead of using from_dicts=True, consider using the Config.from_dicts function instead
+        :param tuple mappings: (system, cathode, anode) parameters to use instead of .cfg files,
+            in which case paramfile is the folder relative to which paths are resolved.
+            Consider using the Config.from_mapping function instead
+        :param dict samples: Random samples of the particle size and Gibbs free energy
+            distributions to use instead of generating them, see :meth:`copy_with`
 
         :return: Config object
 
@@ -73,12 +78,18 @@ class Config:
         # initially this list is empty. When the individual particle values
         # are calculated, the list is populated.
         self.params_per_particle = []
+        # Random samples the particle distributions were generated from
+        self.samples = dict(samples) if samples is not None else {}
 
         if from_dicts:
             # read existing dictionaries instead of parameter file
             # paramfile is now folder with input dicts
             self.path = os.path.normpath(paramfile)
             self._init_from_dicts()
+        elif mappings is not None:
+            # paramfile is now the folder relative to which paths are resolved
+            self.path = os.path.normpath(paramfile)
+            self._init_from_mappings(*mappings)
         else:
             # store path to config file
             self.path = os.path.dirname(paramfile)
@@ -101,6 +112,64 @@ class Config:
         """
         return cls(path, from_dicts=True)
 
+    @classmethod
+    def from_mapping(cls, system, cathode, anode=None, path=''):
+        """
+        Create a config instance from dictionaries of parameters, instead of from config files.
+        Each dictionary holds the sections of a config file, {section: {parameter: value}}. The
+        values can be given as in the config files (strings) or as Python values. They are
+        validated and processed in the same way as those read from config files.
+
+        :param dict system: System parameters. The cathode and anode file names in the
+            Electrodes section are not needed.
+        :param dict cathode: Cathode parameters
+        :param dict anode: Anode parameters, required if the anode is simulated (Nvol_a > 0)
+        :param str path: Folder relative to which paths (e.g. prevDir and the files with custom
+            functions) are resolved (default: current folder)
+
+        :return: Config object
+
+        Example usage:
+
+        >>> from mpet.config import Config
+        >>> system = {'Sim Params': {'profileType': 'CC', 'Crate': 1, ...}, ...}
+        >>> cathode = {'Particles': {'type': 'ACR', ...}, ...}
+        >>> config = Config.from_mapping(system, cathode)
+        """
+        return cls(path, mappings=(system, cathode, anode))
+
+    def copy_with(self, cathode=None, anode=None, **overrides):
+        """
+        Create a config with some parameters changed, from the parameters this config was
+        created with. The particle size and Gibbs free energy distributions are generated from
+        the same random samples as this config, unless parameters they are sampled with are
+        changed (see :data:`mpet.config.constants.SAMPLING_PARAMS`). All other values are
+        processed again, e.g. scaled with the new parameters.
+
+        :param dict cathode: Cathode parameters to change
+        :param dict anode: Anode parameters to change
+        :param overrides: System parameters to change
+
+        :return: Config object
+
+        Example usage, to change the C-rate and the cathode rate constant:
+
+        >>> config2 = config.copy_with(Crate=2, cathode={'k0': 5.})
+        """
+        if self.D_s.raw_sections == {}:
+            raise ValueError('Only a config created from config files or mappings can be copied')
+        system = self.D_s.get_sections(overrides)
+        trodes = {'c': self.D_c.get_sections(cathode)}
+        if anode is not None or self.D_a is not None:
+            if self.D_a is None:
+                raise ValueError('Anode parameters given, but the anode is not simulated')
+            trodes['a'] = self.D_a.get_sections(anode)
+        samples = None
+        if not set(overrides) & set(constants.SAMPLING_PARAMS):
+            samples = self.samples
+        return type(self)(self.path, mappings=(system, trodes['c'], trodes.get('a')),
+                          samples=samples)
+
     def _init_from_dicts(self):
         """
         Initialize configuration from a set of dictionaries on disk, generated
@@ -135,15 +204,7 @@ class Config:
         """
         # load system parameters file
         self.D_s = ParameterSet(paramfile, 'system', self.path)
-        # the anode and separator are optional: only if there are volumes to simulate
-        trodes = ['c']
-        if self.D_s['Nvol_a'] > 0:
-            trodes.append('a')
-        self['trodes'] = trodes
-        # to check for separator, directly access underlying dict of system config;
-        # self['Nvol']['s'] would not work because that requires have_separator to
-        # be defined already
-        self['have_separator'] = self.D_s['Nvol_s'] > 0
+        self._set_regions()
 
         # load electrode parameter file(s)
         self.paramfiles = {}
@@ -163,6 +224,55 @@ class Config:
         else:
             self.D_a = None
 
+        self._init_processing()
+
+    def _init_from_mappings(self, system, cathode, anode):
+        """
+        Initialize configuration from dictionaries of parameters.
+        This method should only be called from the
+        ``__init__`` of :class:`Config`.
+
+        :param dict system: System parameters, {section: {parameter: value}}
+        :param dict cathode: Cathode parameters
+        :param dict anode: Anode parameters, or None
+        """
+        # the electrode parameters are given directly, so their file names are not needed
+        system = {section: dict(params) for section, params in system.items()}
+        electrodes = system.setdefault('Electrodes', {})
+        electrodes.setdefault('cathode', '')
+        electrodes.setdefault('anode', '')
+        self.D_s = ParameterSet(system, 'system', self.path)
+        self._set_regions()
+
+        self.paramfiles = {}
+        self.D_c = ParameterSet(cathode, 'electrode', self.path)
+        if 'a' in self['trodes']:
+            if anode is None:
+                raise ValueError('The anode is simulated, but no anode parameters are given')
+            self.D_a = ParameterSet(anode, 'electrode', self.path)
+        else:
+            self.D_a = None
+
+        self._init_processing()
+
+    def _set_regions(self):
+        """
+        Store which electrodes are simulated, and whether there is a separator.
+        """
+        # the anode and separator are optional: only if there are volumes to simulate
+        trodes = ['c']
+        if self.D_s['Nvol_a'] > 0:
+            trodes.append('a')
+        self['trodes'] = trodes
+        # to check for separator, directly access underlying dict of system config;
+        # self['Nvol']['s'] would not work because that requires have_separator to
+        # be defined already
+        self['have_separator'] = self.D_s['Nvol_s'] > 0
+
+    def _init_processing(self):
+        """
+        Process and verify the parameters once they are loaded.
+        """
         # set defaults and scale values that should be non-dim
         self.config_processed = False
         # either process the config, or read already processed config from disk
@@ -462,6 +572,15 @@ class Config:
             self._G()
             # Electrode parameters that depend on invidividual particle
             self._indvPart()
+            # With a random seed, continue the random sequence from the same state as when the
+            # samples were drawn, so a copy is the same as a config created with its parameters
+            if self.D_s['randomSeed']:
+                if 'random_state' in self.samples:
+                    np.random.set_state(self.samples['random_state'])
+                else:
+                    self.samples['random_state'] = np.random.get_state()
+        # Identical particles, which are simulated only once
+        self._merge_particles()
 
     def _scale_system_parameters(self, theoretical_1C_current):
         """
@@ -610,6 +729,8 @@ class Config:
             solidType = self[trode, 'type']
             Nvol = self['Nvol'][trode]
             Npart = self['Npart'][trode]
+            # Fraction of the number of particles of each size, if not all the same
+            numFrac = None
 
             # check if PSD is specified. If so, it is an ndarray so use np.all
             if not np.all(self['specified_psd'][trode]):
@@ -623,7 +744,17 @@ class Config:
                     var = stddev**2
                     mu = np.log((mean**2) / np.sqrt(var + mean**2))
                     sigma = np.sqrt(np.log(var/(mean**2) + 1))
-                    raw = np.random.lognormal(mu, sigma, size=(Nvol, Npart))
+                    if self['psdQuadrature']:
+                        # Gauss-Hermite nodes of the normal distribution of ln(size), with the
+                        # fraction of the number of particles of each size as weights. The
+                        # outermost nodes are within +-sqrt(4*Npart) standard deviations (2.9 for
+                        # 5 particles, 7.6 for 20), with tiny weights for many particles.
+                        nodes, weights = np.polynomial.hermite_e.hermegauss(Npart)
+                        raw = np.tile(np.exp(mu + sigma*nodes), (Nvol, 1))
+                        numFrac = np.tile(weights/weights.sum(), (Nvol, 1))
+                    else:
+                        raw = self._sample(('psd', trode), np.random.lognormal,
+                                           mu, sigma, size=(Nvol, Npart))
             else:
                 # use user-defined PSD
                 raw = self['specified_psd'][trode]
@@ -640,8 +771,9 @@ class Config:
             elif solidType in ['CHR', 'diffn', 'CHR2', 'diffn2']:
                 psd_num = np.ceil(raw / solidDisc).astype(int) + 1
                 psd_len = solidDisc * (psd_num - 1)
-            # For homogeneous particles (only one 'volume' per particle)
-            elif solidType in ['homog', 'homog_sdn', 'homog2', 'homog2_sdn']:
+            # For homogeneous particles (only one 'volume' per particle), and particles with a
+            # polynomial profile (only the surface concentration)
+            elif solidType in ['homog', 'homog_sdn', 'homog2', 'homog2_sdn', 'diffn_poly']:
                 # Each particle is only one volume
                 psd_num = np.ones(raw.shape, dtype=int)
                 # The lengths are given by the original length distr.
@@ -666,7 +798,10 @@ class Config:
             # Fraction of individual particle volume compared to total
             # volume of particles _within the simulated electrode
             # volume_
-            psd_frac_vol = psd_vol / psd_vol.sum(axis=1, keepdims=True)
+            if numFrac is None:
+                psd_frac_vol = psd_vol / psd_vol.sum(axis=1, keepdims=True)
+            else:
+                psd_frac_vol = numFrac * psd_vol / (numFrac * psd_vol).sum(axis=1, keepdims=True)
 
             # store values to config
             self['psd_num'][trode] = psd_num
@@ -675,6 +810,21 @@ class Config:
             self['psd_vol'][trode] = psd_vol
             self['psd_vol_FracVol'][trode] = psd_frac_vol
 
+    def _sample(self, key, distribution, *args, **kwargs):
+        """
+        Draw random samples from a distribution, or reuse the samples stored under the same
+        key (see :meth:`copy_with`).
+
+        :param tuple key: Name of the samples
+        :param distribution: Function that draws the samples, e.g. np.random.lognormal
+        :param args: Arguments of the distribution function
+
+        :return: The samples
+        """
+        if key not in self.samples:
+            self.samples[key] = distribution(*args, **kwargs)
+        return self.samples[key]
+
     def _G(self):
         """
         Generate Gibbs free energy distribution and store in config.
@@ -691,7 +841,8 @@ class Config:
                 var = stddev**2
                 mu = np.log((mean**2) / np.sqrt(var + mean**2))
                 sigma = np.sqrt(np.log(var / (mean**2) + 1))
-                G = np.random.lognormal(mu, sigma, size=(Nvol, Npart))
+                G = self._sample(('G', trode), np.random.lognormal,
+                                 mu, sigma, size=(Nvol, Npart))
 
             # scale and store
             self['G'][trode] = G * constants.k * constants.T_ref * self['t_ref'] \
@@ -706,9 +857,12 @@ class Config:
             Npart = self['Npart'][trode]
             self[trode, 'indvPart'] = {}
 
-            # intialize parameters
+            # intialize parameters, parameters that are not used by the model remain nan
             for param, dtype in constants.PARAMS_PARTICLE.items():
-                self[trode, 'indvPart'][param] = np.empty((Nvol, Npart), dtype=dtype)
+                if dtype is float:
+                    self[trode, 'indvPart'][param] = np.full((Nvol, Npart), np.nan)
+                else:
+                    self[trode, 'indvPart'][param] = np.empty((Nvol, Npart), dtype=dtype)
 
             # reference scales per trode
             cs_ref_part = constants.N_A * self[trode, 'cs_ref']  # part/m^3
@@ -755,6 +909,58 @@ class Config:
         # per particle instead of from the values per electrode
         self.params_per_particle = list(constants.PARAMS_PARTICLE.keys())
 
+    def _merge_particles(self):
+        """
+        Find the particles within each electrode volume that are identical, i.e. that have the
+        same discretization and particle-specific parameters, and store which particle
+        represents each of them. Only the representative particles are simulated, with the
+        total volume fraction of the particles they represent.
+        """
+        self['partRep'] = {}
+        self['partWeight'] = {}
+        for trode in self['trodes']:
+            Nvol = self['Nvol'][trode]
+            Npart = self['Npart'][trode]
+            partRep = np.tile(np.arange(Npart), (Nvol, 1))
+            # Particles with noise differ, and particles connected in a chain are not
+            # interchangeable
+            if self['mergeParticles'] and not self[trode, 'noise'] \
+                    and not self['simPartCond'][trode]:
+                indvPart = self[trode, 'indvPart']
+                for i in range(Nvol):
+                    classes = {}
+                    for j in range(Npart):
+                        values = [self['psd_num'][trode][i, j]]
+                        values += [indvPart[param][i, j] for param in constants.PARAMS_PARTICLE]
+                        key = np.array(values, dtype=float).tobytes()
+                        partRep[i, j] = classes.setdefault(key, j)
+            partWeight = np.zeros((Nvol, Npart))
+            for i in range(Nvol):
+                np.add.at(partWeight[i], partRep[i], self['psd_vol_FracVol'][trode][i])
+            self['partRep'][trode] = partRep
+            self['partWeight'][trode] = partWeight
+
+    def get_particle_values(self, trode, name, value):
+        """
+        Values of a particle-specific parameter for every particle of an electrode, e.g. a new
+        value of a runtime parameter. Merged particles (see ``mergeParticles``) are only
+        simulated once, so they must have the same value.
+
+        :param str trode: Electrode, c or a
+        :param str name: Name of the parameter, used in the error message
+        :param value: Value for all particles, or array that can be broadcast to the shape of
+            the particles (Nvol, Npart)
+
+        :return: array of shape (Nvol, Npart)
+        """
+        values = np.broadcast_to(np.asarray(value, dtype=float),
+                                 self['psd_num'][trode].shape).copy()
+        partRep = self['partRep'][trode]
+        if not np.array_equal(values, np.take_along_axis(values, partRep, axis=1)):
+            raise ValueError(f"{name} must be the same for all merged particles "
+                             "(see mergeParticles)")
+        return values
+
     def _verify_config(self):
         """
         Verify configuration parameters.
@@ -767,6 +973,15 @@ class Config:
                 raise Exception("ACR and homog_sdn req. C3 shape")
             if (solidType in ["CHR", "diffn"] and solidShape not in ["sphere", "cylinder"]):
                 raise NotImplementedError("CHR and diffn req. sphere or cylinder")
+            if self[trode, 'radialMesh'] != "uniform" and solidShape not in ["sphere", "cylinder"]:
+                raise NotImplementedError("non-uniform radialMesh req. sphere or cylinder")
+            if solidType == "diffn_poly":
+                if solidShape not in ["sphere", "cylinder"]:
+                    raise NotImplementedError("diffn_poly req. sphere or cylinder")
+                if self[trode, 'noise']:
+                    raise NotImplementedError("noise is not supported for diffn_poly")
+            if self[trode, 'muRfuncTable'] and solidType not in constants.one_var_types:
+                raise NotImplementedError("muRfuncTable req. a 1var type")
 
     @staticmethod
     def size2regsln(size):
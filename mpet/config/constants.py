@@ -13,7 +13,7 @@ F = e * N_A
 #: General particle classification (1 var)
 two_var_types = ["diffn2", "CHR2", "homog2", "homog2_sdn"]
 #: General particle classification (2 var)
-one_var_types = ["ACR", "diffn", "CHR", "homog", "homog_sdn"]
+one_var_types = ["ACR", "diffn", "CHR", "homog", "homog_sdn", "diffn_poly"]
 #: Reference concentration, mol/m^3 = 1M
 c_ref = 1000.
 #: Reaction rate epsilon for values close to zero
@@ -22,10 +22,19 @@ reactions_epsilon = 1e-12
 #: parameter that are defined per electrode with a ``_{electrode}`` suffix
 PARAMS_PER_TRODE = ['Nvol', 'Npart', 'mean', 'stddev', 'cs0', 'simBulkCond', 'sigma_s',
                     'simPartCond', 'G_mean', 'G_stddev', 'L', 'P_L', 'poros', 'BruggExp',
-                    'specified_psd']
+                    'specified_psd', 'elyteMeshRatio']
 #: subset of ``PARAMS_PER_TRODE``` that is defined for the separator as well
-PARAMS_SEPARATOR = ['Nvol', 'L', 'poros', 'BruggExp']
+PARAMS_SEPARATOR = ['Nvol', 'L', 'poros', 'BruggExp', 'elyteMeshRatio']
 #: parameters that are defined for each particle, and their type
 PARAMS_PARTICLE = {'N': int, 'kappa': float, 'beta_s': float, 'D': float, 'k0': float,
                    'Rfilm': float, 'delta_L': float, 'Omega_a': float, 'E_D': float,
                    'E_A': float}
+#: system parameters with which the random particle distributions are sampled
+SAMPLING_PARAMS = ['Nvol_c', 'Nvol_a', 'Npart_c', 'Npart_a', 'mean_c', 'stddev_c', 'mean_a',
+                   'stddev_a', 'specified_psd_c', 'specified_psd_a', 'psdQuadrature', 'G_mean_c',
+                   'G_stddev_c', 'G_mean_a', 'G_stddev_a', 'randomSeed', 'seed']
+#: system parameters that are assigned at run time with ``runtimeParameters``
+RUNTIME_PARAMS = ['currset', 'Vset', 'power', 'Rser', 'phimin', 'phimax', 'k0_foil',
+                  'Rfilm_foil']
+#: particle parameters that are assigned at run time with ``runtimeParameters``
+RUNTIME_PARAMS_PARTICLE = ['k0', 'D', 'Rfilm']
@@ -3,7 +3,7 @@ import numpy as np
 from mpet import props_am
 from mpet.exceptions import UnknownParameterError
 from mpet.config import constants
-from mpet.utils import import_function
+from mpet.plugins import get_function
 
 
 class DerivedValues:
@@ -193,8 +193,7 @@ class DerivedValues:
             return self.config['Damb']
         else:
             SMset = self.config["SMset"]
-            elyte_function = import_function(self.config["SMset_filename"], SMset,
-                                             mpet_module=f"mpet.electrolyte.{SMset}")
+            elyte_function = get_function("electrolyte", SMset, self.config["SMset_filename"])
             return elyte_function()[-1]
 
     def z(self):
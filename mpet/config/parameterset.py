@@ -11,7 +11,8 @@ class ParameterSet:
         """
         Hold a set of parameters for a single entity (system, one electrode).
 
-        :param str paramfile: Full path to .cfg file on disk
+        :param str/dict paramfile: Full path to .cfg file on disk, or a dict of
+            {section: {parameter: value}} with the same contents as a .cfg file
         :param str config_type: "system" or "electrode"
         :param str path: Folder containing the .cfg file
 
@@ -25,8 +26,12 @@ class ParameterSet:
         self.config_type = config_type
 
         self.params = {}
+        # Parameters as given in the file or mapping, before validation
+        self.raw_sections = {}
 
-        if paramfile is not None:
+        if isinstance(paramfile, dict):
+            self._load_sections(paramfile)
+        elif paramfile is not None:
             self._load_file(paramfile)
 
     def _load_file(self, fname):
@@ -42,18 +47,29 @@ class ParameterSet:
         parser.optionxform = str
         parser.read(fname)
 
+        # sections that are not part of the schemas are ignored
+        section_schemas = getattr(schemas, self.config_type)
+        self._load_sections({section: dict(parser[section]) for section in parser.sections()
+                             if section in section_schemas})
+
+    def _load_sections(self, sections):
+        """
+        Create config from a dict of sections.
+
+        :param dict sections: dict of {section: {parameter: value}}
+        """
         # get schemas for all potential sections
         section_schemas = getattr(schemas, self.config_type)
+        for section in sections:
+            if section not in section_schemas:
+                raise ValueError(f'Unknown {self.config_type} config section: {section}')
+        self.raw_sections = {section: dict(params) for section, params in sections.items()}
 
         # load each potential section and validate schema
         for section, config_schema in section_schemas.items():
-            # try to read this section from the file
-            try:
-                raw_section_params = dict(parser[section])
-            except KeyError:
-                # this section does not exist. Make it an empty dict, so
-                # schema can still handle optional parameters in the section
-                raw_section_params = dict()
+            # a section that does not exist is an empty dict, so
+            # schema can still handle optional parameters in the section
+            raw_section_params = dict(sections.get(section, {}))
             # validate the parameters
             section_params = config_schema.validate(raw_section_params)
             # verify there are no duplicate keys
@@ -63,6 +79,27 @@ class ParameterSet:
             # store the config
             self.params.update(section_params)
 
+    def get_sections(self, overrides=None):
+        """
+        Parameters as they were given in the file or mapping, per section, with some of them
+        changed.
+
+        :param dict overrides: {parameter: value} of the parameters to change
+
+        :return: dict of {section: {parameter: value}}
+        """
+        sections = {section: dict(params) for section, params in self.raw_sections.items()}
+        section_schemas = getattr(schemas, self.config_type)
+        for item, value in (overrides or {}).items():
+            for section, config_schema in section_schemas.items():
+                keys = [getattr(key, 'schema', key) for key in config_schema.schema]
+                if item in keys:
+                    sections.setdefault(section, {})[item] = value
+                    break
+            else:
+                raise UnknownParameterError(f'Unknown parameter: {item}')
+        return sections
+
     def __repr__(self):
         """
         When printing this class, print the parameters dict.
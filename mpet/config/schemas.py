@@ -9,15 +9,28 @@ import numpy as np
 from mpet.config import constants
 
 
+def literal(value):
+    """
+    Evaluate a Python literal given as a string, as in the config files. Other values, e.g.
+    given in a mapping (see :meth:`mpet.config.Config.from_mapping`), are returned as they are.
+
+    :param value: Value to evaluate
+    :return: Evaluated value
+    """
+    if isinstance(value, str):
+        return ast.literal_eval(value)
+    return value
+
+
 def parse_segments(key):
     """
     Parse the segments key of the configuration file and
     validate it
 
-    :param str key: The raw key from the config file
+    :param str/list key: The raw key from the config file, or the list of segments
     :return: segments (tuple)
     """
-    segments = ast.literal_eval(key)
+    segments = literal(key)
     assert isinstance(segments, list), "segments must be a list"
     assert len(segments) > 0, "There must be at least one segment"
     for item in segments:
@@ -41,11 +54,14 @@ def check_allowed_values(value, allowed_values):
 
 def tobool(value):
     """
-    Convert string value (y/yes/t/true/1/on, n/no/f/false/0/off) to boolean
+    Convert string value (y/yes/t/true/1/on, n/no/f/false/0/off) to boolean. Booleans are
+    returned as they are.
 
-    :param str value: Value to convert to bool
+    :param str/bool value: Value to convert to bool
     :return: Boolean representation of value
     """
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
     assert isinstance(value, str), f"{value} must be a string"
     # strtobool returns 0 or 1, use bool() to convert to actual boolean type
     return bool(strtobool(value))
@@ -72,12 +88,33 @@ system = {'Sim Params': {'profileType': lambda x:
                          'randomSeed': Use(tobool),
                          Optional('seed'): And(Use(int), lambda x: x >= 0),
                          Optional('dataReporter', default='mat'): str,
+                         Optional('particleBank', default=False): Use(tobool),
+                         Optional('reduceModel', default=False): Use(tobool),
+                         Optional('mergeParticles', default=False): Use(tobool),
+                         Optional('expandMergedOutput', default=True): Use(tobool),
+                         Optional('runtimeParameters', default=False): Use(tobool),
                          'Rser': Use(float),
                          'Nvol_c': And(Use(int), lambda x: x > 0),
                          'Nvol_s': And(Use(int), lambda x: x >= 0),
                          'Nvol_a': And(Use(int), lambda x: x >= 0),
                          'Npart_c': And(Use(int), lambda x: x >= 0),
                          'Npart_a': And(Use(int), lambda x: x >= 0)},
+          'Solver': {Optional('linearSolverMethod', default='direct'): lambda x:
+                     check_allowed_values(x, ["direct", "GMRES"]),
+                     Optional('linearSolver', default='SuperLU'): lambda x:
+                     check_allowed_values(x, ["SuperLU", "SuperLU_MT", "Amesos_Klu",
+                                              "Amesos_Umfpack", "Pardiso", "IntelPardiso"]),
+                     Optional('linearSolverThreads', default=0): And(Use(int), lambda x: x >= 0),
+                     Optional('linearSolverOrdering', default='default'): lambda x:
+                     check_allowed_values(x, ["default", "NATURAL", "MMD_ATA", "MMD_AT_PLUS_A",
+                                              "COLAMD", "METIS_AT_PLUS_A"]),
+                     Optional('gmresKrylovDim', default=30): And(Use(int), lambda x: x > 0),
+                     Optional('gmresMaxRestarts', default=5): And(Use(int), lambda x: x >= 0),
+                     Optional('gmresEpsLin', default=0.05): And(Use(float), lambda x: x > 0),
+                     Optional('evaluationMode', default='default'): lambda x:
+                     check_allowed_values(x, ["default", "computeStack_OpenMP",
+                                              "evaluationTree_OpenMP", "auto"]),
+                     Optional('evaluationThreads', default=0): And(Use(int), lambda x: x >= 0)},
           'Electrodes': {'cathode': str,
                          'anode': str,
                          'k0_foil': Use(float),
@@ -88,10 +125,11 @@ system = {'Sim Params': {'profileType': lambda x:
                         'stddev_a': Use(float),
                         'cs0_c': Use(float),
                         'cs0_a': Use(float),
+                        Optional('psdQuadrature', default=False): Use(tobool),
                         Optional('specified_psd_c', default=False):
-                            Or(Use(tobool), Use(lambda x: np.array(ast.literal_eval(x)))),
+                            Or(Use(tobool), Use(lambda x: np.array(literal(x)))),
                         Optional('specified_psd_a', default=False):
-                            Or(Use(tobool), Use(lambda x: np.array(ast.literal_eval(x))))},
+                            Or(Use(tobool), Use(lambda x: np.array(literal(x))))},
           'Conductivity': {'simBulkCond_c': Use(tobool),
                            'simBulkCond_a': Use(tobool),
                            'sigma_s_c': Use(float),
@@ -112,15 +150,29 @@ system = {'Sim Params': {'profileType': lambda x:
                        'poros_s': Use(float),
                        'BruggExp_c': Use(float),
                        'BruggExp_a': Use(float),
-                       'BruggExp_s': Use(float)},
+                       'BruggExp_s': Use(float),
+                       Optional('elyteMesh', default='uniform'): lambda x:
+                           check_allowed_values(x, ["uniform", "geometric", "tanh"]),
+                       Optional('elyteMeshRatio_c', default=1.):
+                           And(Use(float), lambda x: x >= 1),
+                       Optional('elyteMeshRatio_a', default=1.):
+                           And(Use(float), lambda x: x >= 1),
+                       Optional('elyteMeshRatio_s', default=1.):
+                           And(Use(float), lambda x: x >= 1)},
           'Electrolyte': {'c0': Use(float),
                           'zp': Use(int),
                           'zm': And(Use(int), lambda x: x < 0),
                           'nup': Use(int),
                           'num': Use(int),
                           'elyteModelType': str,
+                          Optional('elyteQuasiSteady', default=False): Use(tobool),
                           Optional('SMset_filename', default=None): str,
                           'SMset': str,
+                          Optional('SMsetTable', default=False): Use(tobool),
+                          Optional('SMsetTableTol', default=1e-4):
+                              And(Use(float), lambda x: x > 0),
+                          Optional('SMsetTableRange', default=(1e-3, 5.)):
+                              Use(lambda x: tuple(literal(x))),
                           'n': Use(int),
                           'sp': Use(int),
                           Optional('Dp', default=None): Use(float),
@@ -133,9 +185,20 @@ electrode = {'Particles': {'type': lambda x: check_allowed_values(x,
                            'discretization': Use(float),
                            'shape': lambda x:
                                check_allowed_values(x, ["C3", "sphere", "cylinder", "homog_sdn"]),
-                           Optional('thickness'): Use(float)},
+                           Optional('thickness'): Use(float),
+                           Optional('radialMesh', default='uniform'): lambda x:
+                               check_allowed_values(x, ["uniform", "geometric", "tanh"]),
+                           Optional('radialMeshRatio', default=1.):
+                               And(Use(float), lambda x: x >= 1),
+                           Optional('polyParams', default=3):
+                               And(Use(int), lambda x: check_allowed_values(x, [2, 3]))},
              'Material': {Optional('muRfunc_filename', default=None): str,
                           'muRfunc': str,
+                          Optional('muRfuncTable', default=False): Use(tobool),
+                          Optional('muRfuncTableTol', default=1e-4):
+                              And(Use(float), lambda x: x > 0),
+                          Optional('muRfuncTableRange', default=(1e-3, 1 - 1e-3)):
+                              Use(lambda x: tuple(literal(x))),
                           'noise': Use(tobool),
                           'noise_prefac': Use(float),
                           'numnoise': Use(int),
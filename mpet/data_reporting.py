@@ -11,6 +11,84 @@ import daetools.pyDAE as dae
 from daetools.pyDAE.data_reporters import daeMatlabMATFileDataReporter
 
 
+def get_output_variables(dataReporter):
+    """
+    Iterate over the reported variables, yielding the output key, the values and the time values
+    of each variable. The variables of a particle bank are split up per particle, so the output
+    keys and values are the same as those of individual particle models. The output of variables
+    eliminated from a reduced model is evaluated from the reported variables they were
+    substituted by. Particles that were merged into an identical particle get the output of that
+    particle.
+    """
+    banks = getattr(dataReporter, "particle_banks", {})
+    eliminated = getattr(dataReporter, "eliminated_outputs", {})
+    merged = getattr(dataReporter, "merged_particles", {})
+    outputs = {}
+    for var in dataReporter.Process.Variables:
+        # Remove the model name part of the output key for
+        # brevity.
+        dkeybase = var.Name[var.Name.index(".")+1:]
+        # Remove dots from variable keys. This enables the mat
+        # file to be read by, e.g., MATLAB.
+        dkeybase = dkeybase.replace(".", "_")
+        bankName, _, varName = dkeybase.partition("_")
+        if bankName in banks:
+            for bInd, partName in enumerate(banks[bankName]):
+                outputs[f"{partName}_{varName}"] = var.Values[:, bInd], var.TimeValues
+        else:
+            outputs[dkeybase] = var.Values, var.TimeValues
+    for partName, definitions in eliminated.items():
+        for varName, definition in definitions.items():
+            outputs[f"{partName}_{varName}"] = get_eliminated_output(outputs, partName,
+                                                                     definition)
+    for partName, repName in merged.items():
+        for dkeybase in [key for key in outputs if key.startswith(repName + "_")]:
+            outputs[partName + dkeybase[len(repName):]] = outputs[dkeybase]
+    for dkeybase, (values, times) in outputs.items():
+        yield dkeybase, values, times
+
+
+def get_eliminated_output(outputs, partName, definition):
+    """
+    Output of a variable eliminated from a particle, the weighted sum of the output of other
+    variables of the particle (see :class:`mpet.mod_electrodes.EliminatedVariable`).
+
+    :param dict outputs: Values and time values of the reported variables by output key
+    :param str partName: Name of the particle
+    :param dict definition: Weights of the variables of the particle, {variable: weights}
+    :return: values, time values
+    """
+    value = 0
+    for varName, weights in definition.items():
+        values, times = outputs[f"{partName}_{varName}"]
+        value = value + np.reshape(values, (len(times), -1)) @ np.atleast_1d(weights)
+    return value, times
+
+
+def get_solver_stats(dataReporter, tPrev=0.):
+    """
+    Iterate over the DAE solver statistics recorded for each reporting interval, yielding their
+    output key and values. The times at the end of the intervals are shifted by tPrev, the end
+    time of a previous simulation that is continued.
+    """
+    for key, values in getattr(dataReporter, "solver_stats", {}).items():
+        values = np.array(values)
+        if key == "times":
+            values = values + tPrev
+        yield "solver_stats_" + key, values
+
+
+def write_solver_stats_hdf5(dataReporter, mat_dat, tPrev):
+    """Write the DAE solver statistics to an hdf5 file, appending to those of a previous
+    simulation if present."""
+    for dkey, values in get_solver_stats(dataReporter, tPrev):
+        if dkey in mat_dat:
+            mat_dat[dkey].resize((mat_dat[dkey].shape[0] + values.shape[0]), axis=0)
+            mat_dat[dkey][-values.shape[0]:] = values
+        else:
+            mat_dat.create_dataset(dkey, data=values, maxshape=(None,), compression='lzf')
+
+
 class Myhdf5DataReporterFast(daeMatlabMATFileDataReporter):
     """Ignores internal particle concentrations with hdf5 data saving to be faster.
     Input is dataReporter"""
@@ -25,16 +103,12 @@ class Myhdf5DataReporterFast(daeMatlabMATFileDataReporter):
                 continued_sim = 1
                 # remains 0 if not continued sim
         with h5py.File(self.ConnectionString + ".hdf5", 'a') as mat_dat:
-            for var in self.Process.Variables:
-                # Remove the model name part of the output key for
-                # brevity.
-                dkeybase = var.Name[var.Name.index(".")+1:]
-                # Remove dots from variable keys. This enables the mat
-                # file to be read by, e.g., MATLAB.
-                dkeybase = dkeybase.replace(".", "_")
+            # end time of the previous simulation
+            tPrev = mat_dat['phi_applied_times'][-1] if continued_sim == 1 else 0.
+            for dkeybase, values, times in get_output_variables(self):
                 # Remove port variables
                 if "port" not in dkeybase:
-                    mdict[dkeybase] = var.Values  # mdict stores the new data
+                    mdict[dkeybase] = values  # mdict stores the new data
                     # if we are in a directory that has continued simulations (maccor reader)
                     if continued_sim == 1:
                         # increment time by the previous end time of the last simulation
@@ -49,7 +123,7 @@ class Myhdf5DataReporterFast(daeMatlabMATFileDataReporter):
                             mat_dat[dkeybase][-mdict[dkeybase].shape[0]:] = mdict[dkeybase]
 
                             if dkeybase == 'phi_applied':
-                                mdict['times'] = var.TimeValues + tend
+                                mdict['times'] = times + tend
                                 # resize and append dkeybase varibale
                                 mat_dat['phi_applied_times'].resize(
                                     (mat_dat['phi_applied_times'].shape[0]
@@ -76,7 +150,7 @@ class Myhdf5DataReporterFast(daeMatlabMATFileDataReporter):
 
                             if dkeybase == 'phi_applied':
                                 # only save times for voltage
-                                mdict['times'] = var.TimeValues
+                                mdict['times'] = times
                                 mat_dat.create_dataset('phi_applied_times', data=mdict['times'],
                                                        maxshape=(None,), compression='lzf')
 
@@ -86,6 +160,9 @@ class Myhdf5DataReporterFast(daeMatlabMATFileDataReporter):
                             mat_dat.create_dataset(dkeybase, data=mdict[dkeybase][-2:],
                                                    maxshape=(None,)*shape, compression='lzf')
 
+            # Solver statistics per reporting interval
+            write_solver_stats_hdf5(self, mat_dat, tPrev)
+
 
 class Myhdf5DataReporter(daeMatlabMATFileDataReporter):
     """Reports hdf5 file outputs in full, otherwise ignores internal particle concentrations"""
@@ -100,16 +177,12 @@ class Myhdf5DataReporter(daeMatlabMATFileDataReporter):
                 continued_sim = 1
                 # remains 0 if not continued sim
         with h5py.File(self.ConnectionString + ".hdf5", 'a') as mat_dat:
-            for var in self.Process.Variables:
-                # Remove the model name part of the output key for
-                # brevity.
-                dkeybase = var.Name[var.Name.index(".")+1:]
-                # Remove dots from variable keys. This enables the mat
-                # file to be read by, e.g., MATLAB.
-                dkeybase = dkeybase.replace(".", "_")
+            # end time of the previous simulation
+            tPrev = mat_dat['phi_applied_times'][-1] if continued_sim == 1 else 0.
+            for dkeybase, values, times in get_output_variables(self):
                 # remove port variables
                 if "port" not in dkeybase:
-                    mdict[dkeybase] = var.Values
+                    mdict[dkeybase] = values
                     # if we are in a directory that has continued simulations (maccor reader)
                     if continued_sim == 1:
                         # increment time by the previous end time of the last simulation
@@ -120,7 +193,7 @@ class Myhdf5DataReporter(daeMatlabMATFileDataReporter):
                         mat_dat[dkeybase][-mdict[dkeybase].shape[0]:] = mdict[dkeybase]
 
                         if dkeybase == 'phi_applied':
-                            mdict['times'] = var.TimeValues + tend
+                            mdict['times'] = times + tend
                             # resize and append dkeybase varibale
                             mat_dat['phi_applied_times'].resize(
                                 (mat_dat['phi_applied_times'].shape[0]
@@ -137,10 +210,13 @@ class Myhdf5DataReporter(daeMatlabMATFileDataReporter):
 
                         if dkeybase == 'phi_applied':
                             # only save times for voltage
-                            mdict['times'] = var.TimeValues
+                            mdict['times'] = times
                             mat_dat.create_dataset('phi_applied_times', data=mdict['times'],
                                                    maxshape=(None,), compression='lzf')
 
+            # Solver statistics per reporting interval
+            write_solver_stats_hdf5(self, mat_dat, tPrev)
+
 
 class MyMATDataReporter(daeMatlabMATFileDataReporter):
     """See source code for pyDataReporting.daeMatlabMATFileDataReporter
@@ -158,20 +234,14 @@ class MyMATDataReporter(daeMatlabMATFileDataReporter):
                 continued_sim = 1
                 mat_dat = sio.loadmat(self.ConnectionString + ".mat")
                 # remains 0 if not continued sim
-        for var in self.Process.Variables:
-            # Remove the model name part of the output key for
-            # brevity.
-            dkeybase = var.Name[var.Name.index(".")+1:]
-            # Remove dots from variable keys. This enables the mat
-            # file to be read by, e.g., MATLAB.
-            dkeybase = dkeybase.replace(".", "_")
+        for dkeybase, values, times in get_output_variables(self):
             # Remove port variables
             if "port" not in dkeybase:
                 if continued_sim == 0:
-                    mdict[dkeybase] = var.Values
+                    mdict[dkeybase] = values
                     if dkeybase == 'phi_applied':
                         # if we are not in a continuation directory
-                        mdict[dkeybase + '_times'] = var.TimeValues
+                        mdict[dkeybase + '_times'] = times
                 else:
                     # if we are in a directory that has continued simulations (maccor reader)
                     # increment time by the previous end time of the last simulation
@@ -179,7 +249,7 @@ class MyMATDataReporter(daeMatlabMATFileDataReporter):
                     # get previous values from old output_mat
                     if dkeybase == 'phi_applied':
 
-                        mdict[dkeybase + '_times'] = (var.TimeValues + tend).T
+                        mdict[dkeybase + '_times'] = (times + tend).T
                         mdict[dkeybase + '_times'] = np.append(mat_dat[dkeybase + '_times'],
                                                                mdict[dkeybase + '_times'])
                     # may flatten array, so we specify axis
@@ -194,15 +264,93 @@ class MyMATDataReporter(daeMatlabMATFileDataReporter):
                     if mdict[dkeybase].shape[1] == 1:
                         mdict[dkeybase] = np.squeeze(mdict[dkeybase])
 
+        # Solver statistics per reporting interval
+        # end time of the previous simulation
+        tPrev = mat_dat['phi_applied_times'][0, -1] if continued_sim == 1 else 0.
+        for dkey, values in get_solver_stats(self, tPrev):
+            if dkey in mat_dat:
+                values = np.append(mat_dat[dkey], values)
+            mdict[dkey] = values
+
         sio.savemat(self.ConnectionString + ".mat",
                     mdict, appendmat=False, format='5',
                     long_field_names=False, do_compression=False,
                     oned_as='row')
 
 
-def setup_data_reporters(simulation, config, outdir):
-    """Create daeDelegateDataReporter and add data reporter."""
+class MemoryDataReporter(dae.daeDataReporterLocal):
+    """Keeps the reported data in memory, for simulations run from Python (see
+    :mod:`mpet.api`). :meth:`get_data` gives the output as it would be written to a mat file."""
+
+    def __init__(self):
+        dae.daeDataReporterLocal.__init__(self)
+        self.ProcessName = ""
+
+    def Connect(self, ConnectionString, ProcessName):
+        self.ProcessName = ProcessName
+        return True
+
+    def Disconnect(self):
+        return True
+
+    def IsConnected(self):
+        return True
+
+    def get_data(self):
+        """
+        Output of the simulation, with the same keys as the output data file.
+
+        :return: dict of {output key: numpy array}
+        """
+        data = {}
+        for dkeybase, values, times in get_output_variables(self):
+            # Remove port variables
+            if "port" not in dkeybase:
+                data[dkeybase] = np.array(values)
+                if dkeybase == "phi_applied":
+                    data["phi_applied_times"] = np.array(times)
+        for dkey, values in get_solver_stats(self):
+            data[dkey] = values
+        return data
+
+
+def set_output_keys(simulation, config, dataReporter):
+    """Give a data reporter the information it needs to write the output of every particle
+    under its own keys, and the DAE solver statistics."""
+    # Output keys of the particles within particle banks
+    dataReporter.particle_banks = {
+        bank.Name: [particle.Name for particle in bank.particles]
+        for trode in simulation.m.banks for bank in simulation.m.banks[trode]}
+    # DAE solver statistics, recorded during the simulation
+    dataReporter.solver_stats = simulation.solver_stats
+    # Output of the variables eliminated from the particles of a reduced model
+    dataReporter.eliminated_outputs = {
+        particle.Name: particle.get_eliminated_outputs()
+        for trode in simulation.m.trodes for particle in simulation.m.particles[trode].flat}
+    # Output keys of the particles that were merged into identical particles
+    dataReporter.merged_particles = {}
+    if config["expandMergedOutput"]:
+        dataReporter.merged_particles = simulation.m.get_merged_particles()
+
+
+def setup_data_reporters(simulation, config, outdir, inMemory=False):
+    """Create daeDelegateDataReporter and add data reporter.
+
+    :param str outdir: Directory of the output data file, or None to not write one
+    :param bool inMemory: Also keep the data in memory, in ``simulation.memoryReporter``
+    """
     datareporter = dae.daeDelegateDataReporter()
+    simName = simulation.m.Name + time.strftime(" [%d.%m.%Y %H:%M:%S]",
+                                                time.localtime())
+    simulation.memoryReporter = None
+    if inMemory:
+        simulation.memoryReporter = MemoryDataReporter()
+        set_output_keys(simulation, config, simulation.memoryReporter)
+        datareporter.AddDataReporter(simulation.memoryReporter)
+        simulation.memoryReporter.Connect("", simName)
+    if outdir is None:
+        return datareporter
+
     # if default, use mat data reporter
     simulation.dr = MyMATDataReporter()
     # else if specified, we use hdf5 data reporter
@@ -213,11 +361,10 @@ def setup_data_reporters(simulation, config, outdir):
     elif config["dataReporter"] != "mat":
         # if the data reporter called hasn't been implemented yet
         raise Exception("Data Reporter " + config["dataReporter"] + " not installed")
+    set_output_keys(simulation, config, simulation.dr)
 
     datareporter.AddDataReporter(simulation.dr)
     # Connect data reporters
-    simName = simulation.m.Name + time.strftime(" [%d.%m.%Y %H:%M:%S]",
-                                                time.localtime())
     # we name it another name so it doesn't overwrite our output data file
     matDataName = "output_data"
     matfilename = os.path.join(outdir, matDataName)
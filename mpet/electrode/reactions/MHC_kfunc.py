@@ -1,3 +1,5 @@
+import functools
+
 import numpy as np
 import daetools.pyDAE as dae
 import scipy.special as spcl
@@ -5,11 +7,33 @@ import scipy.special as spcl
 
 def MHC_kfunc(eta, lmbda):
     a = 1. + np.sqrt(lmbda)
-    if isinstance(eta, dae.pyCore.adouble):
-        ERF = dae.Erf
-    else:
-        ERF = spcl.erf
     # evaluate with eta for oxidation, -eta for reduction
     return (np.sqrt(np.pi*lmbda) / (1 + np.exp(-eta))
-            * (1. - ERF((lmbda - np.sqrt(a + eta**2))
+            * (1. - erf((lmbda - np.sqrt(a + eta**2))
                / (2*np.sqrt(lmbda)))))
+
+
+@functools.lru_cache(maxsize=None)
+def MHC_k0(lmbda):
+    """Rate constant at zero overpotential, MHC_kfunc(0, lmbda), used to normalize k0"""
+    return float(MHC_kfunc(0., lmbda))
+
+
+def MHC_net_rate(eta, c_sld, c_lyte, lmbda):
+    """Net rate MHC_kfunc(-eta)*c_lyte - MHC_kfunc(eta)*c_sld of reduction and oxidation.
+    Both rate constants share the same erfc term, and 1/(1 + exp(eta)) = 1 - 1/(1 + exp(-eta)),
+    so this needs a single erf and exp per element instead of two of each.
+    Works for numbers, expressions and arrays of either.
+    """
+    a = 1. + np.sqrt(lmbda)
+    erfc_term = 1. - erf((lmbda - np.sqrt(a + eta**2)) / (2*np.sqrt(lmbda)))
+    return np.sqrt(np.pi*lmbda) * erfc_term * (c_lyte - (c_lyte + c_sld)/(1 + np.exp(-eta)))
+
+
+def erf(x):
+    """Error function of numbers, daetools expressions, or arrays of either."""
+    if isinstance(x, np.ndarray) and x.dtype == object:
+        return np.array([erf(xi) for xi in x], dtype=object)
+    if isinstance(x, (np.ndarray, np.number, float, int)):
+        return spcl.erf(x)
+    return dae.Erf(x)
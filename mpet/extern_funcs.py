@@ -3,31 +3,110 @@
 These functions are handled here because they cannot be written in a form that DAE Tools knows how
 to automatically differentiate. For example, they may contain `if` statements or a function from an
 external library that the DAE Tools library doesn't know about.
+
+Note that external functions are only evaluated in the Evaluation Tree mode of daetools.
 """
-import scipy.interpolate as sintrp
+import bisect
+
+import numpy as np
 
 from daetools.pyDAE import daeScalarExternalFunction, adouble
 
 
-class InterpTimeScalar(daeScalarExternalFunction):
-    def __init__(self, Name, Model, units, time, tvec, yvec):
+class InterpScalar(daeScalarExternalFunction):
+    """Piecewise polynomial of one argument, with the exact derivative of the polynomial of the
+    active interval. The interval is found by bisection over the knots, so the cost of an
+    evaluation hardly depends on their number. Outside of the knots, the function is constant.
+
+    The value and derivative at the previous argument are cached. The number of evaluations and
+    of evaluations at the previous argument (cache hits) are counted in numCalls and
+    numCacheHits, for profiling.
+
+    :param str Name: Name of the function
+    :param Model: Model the function belongs to
+    :param units: Units of the function
+    :param x: Argument of the function (an expression)
+    :param knots: Increasing knots of the intervals
+    :param coeffs: Coefficients of the polynomial of each interval in powers of the distance to
+        its first knot, from the highest power, of shape (degree + 1, number of intervals) (as
+        in scipy.interpolate.PPoly)
+    :param tuple fill_value: Values before the first and after the last knot (default: the
+        values at the first and last knot)
+    :param str argument: Name of the argument
+    """
+    def __init__(self, Name, Model, units, x, knots, coeffs, fill_value=None, argument="x"):
         arguments = {}
-        arguments["time"] = time
+        arguments[argument] = x
+        self.argument = argument
         self.cache = None
-        self.interp = sintrp.interp1d(tvec, yvec, bounds_error=False,
-                                      fill_value=yvec[-1])
+        self.numCalls = 0
+        self.numCacheHits = 0
+        self.knots = [float(xk) for xk in knots]
+        self.coeffs = np.asarray(coeffs, dtype=float)
+        if fill_value is None:
+            last = np.polyval(self.coeffs[:, -1], self.knots[-1] - self.knots[-2])
+            fill_value = (self.coeffs[-1, 0], last)
+        self.fill_value = tuple(float(value) for value in fill_value)
+        # Coefficients of the derivative of the polynomial of each interval
+        degree = len(self.coeffs) - 1
+        self.dcoeffs = self.coeffs[:-1]*np.arange(degree, 0, -1)[:, None]
         daeScalarExternalFunction.__init__(self, Name, Model, units, arguments)
 
     def Calculate(self, values):
-        time = values["time"]
-        # A derivative for Jacobian is requested - always return 0.0
-        if time.Derivative != 0:
-            return adouble(0)
-        # Store the previous time value to prevent excessive
-        # interpolation.
-        if self.cache:
-            if self.cache[0] == time.Value:
-                return adouble(float(self.cache[1]))
-        yval = float(self.interp(time.Value))
-        self.cache = (time.Value, yval)
-        return adouble(yval)
+        self.numCalls += 1
+        x = values[self.argument]
+        # Store the previous argument to prevent excessive interpolation
+        if self.cache is not None and self.cache[0] == x.Value:
+            self.numCacheHits += 1
+            value, slope = self.cache[1:]
+        else:
+            value, slope = self.evaluate(x.Value)
+            self.cache = (x.Value, value, slope)
+        result = adouble(value)
+        # A derivative is requested if that of the argument is not zero (chain rule)
+        if x.Derivative != 0:
+            result.Derivative = slope*x.Derivative
+        return result
+
+    def evaluate(self, x):
+        """Value and derivative at x, with the interval found by bisection."""
+        knots = self.knots
+        if x < knots[0]:
+            return self.fill_value[0], 0.
+        if x > knots[-1]:
+            return self.fill_value[1], 0.
+        # Interval knots[k] <= x < knots[k+1], or the last interval at its end
+        k = min(bisect.bisect_right(knots, x), len(knots) - 1) - 1
+        dx = x - knots[k]
+        value = 0.
+        for c in self.coeffs[:, k]:
+            value = value*dx + c
+        slope = 0.
+        for c in self.dcoeffs[:, k]:
+            slope = slope*dx + c
+        return float(value), float(slope)
+
+    def get_stats(self):
+        """Number of evaluations and cache hits."""
+        return {"calls": self.numCalls, "cache_hits": self.numCacheHits}
+
+
+class InterpTimeScalar(InterpScalar):
+    """Piecewise linear interpolation of yvec in time, with the slope of the active interval as
+    its derivative. Outside of tvec, the last value of yvec is used. Repeated times are steps,
+    of which the last value is used from that time on.
+    """
+    def __init__(self, Name, Model, units, time, tvec, yvec):
+        tvec = np.asarray(tvec, dtype=float)
+        yvec = np.asarray(yvec, dtype=float)
+        # Intervals between consecutive times, except those of zero length (steps)
+        dt = np.diff(tvec)
+        ind = np.flatnonzero(dt > 0)
+        if len(ind) == 0:
+            # A constant
+            knots, coeffs = [tvec[0], tvec[0] + 1.], [[0.], [yvec[-1]]]
+        else:
+            knots = np.append(tvec[ind], tvec[-1])
+            coeffs = [(yvec[ind + 1] - yvec[ind])/dt[ind], yvec[ind]]
+        super().__init__(Name, Model, units, time, knots, coeffs,
+                         fill_value=(yvec[-1], yvec[-1]), argument="time")
@@ -1,10 +1,50 @@
 """Helper functions to get information about the mesh/geometry of the simulated particles."""
+import functools
+
 import numpy as np
+import scipy.optimize as sopt
+import scipy.sparse as sprs
 
 import mpet.utils as utils
 
 
-def get_unit_solid_discr(Shape, N):
+def get_radial_mesh(N, mesh="uniform", ratio=1.):
+    """
+    Positions of the grid points of a particle with unit radius, from the center to the
+    surface. Non-uniform meshes are refined towards the surface.
+
+    :param int N: Number of grid points
+    :param str mesh: uniform, geometric (the width of the intervals decreases by a constant
+        factor) or tanh (the positions follow tanh(delta*s)/tanh(delta) for uniform s)
+    :param float ratio: Width of the innermost interval divided by that of the outermost
+        interval, for non-uniform meshes
+
+    :return: r_vec (array)
+    """
+    if mesh == "uniform" or ratio == 1 or N <= 2:
+        return np.linspace(0, 1., N)
+    if mesh == "geometric":
+        widths = ratio**(-np.arange(N - 1)/(N - 2))
+    elif mesh == "tanh":
+        s = np.linspace(0, 1., N)
+
+        def get_ratio(delta):
+            widths = np.diff(np.tanh(delta*s))
+            return widths[0]/widths[-1] - ratio
+        # The slope of tanh(delta*s) decreases by cosh(delta)^2 from the center to the surface,
+        # and the ratio of the intervals is somewhat smaller
+        delta = np.arccosh(np.sqrt(ratio))
+        while get_ratio(2*delta) < 0:
+            delta *= 2
+        delta = sopt.brentq(get_ratio, delta, 2*delta)
+        widths = np.diff(np.tanh(delta*s))
+    else:
+        raise NotImplementedError(f"Unknown radial mesh: {mesh}")
+    r_vec = np.hstack((0, np.cumsum(widths)))
+    return r_vec/r_vec[-1]
+
+
+def get_unit_solid_discr(Shape, N, mesh="uniform", ratio=1.):
     if N == 1:  # homog particle, hopefully
         r_vec = None
         volfrac_vec = np.ones(1)
@@ -13,6 +53,14 @@ def get_unit_solid_discr(Shape, N):
         # For 1D particle, the vol fracs are simply related to the
         # length discretization
         volfrac_vec = (1./N) * np.ones(N)  # scaled to 1D particle volume
+    elif Shape in ["sphere", "cylinder"] and mesh != "uniform":
+        # Control volumes around the grid points, bounded by the midpoints between them
+        r_vec = get_radial_mesh(N, mesh, ratio)
+        edges = np.hstack((0, utils.mean_linear(r_vec), 1.))
+        if Shape == "sphere":
+            volfrac_vec = np.diff(edges**3)
+        else:
+            volfrac_vec = np.diff(edges**2)
     elif Shape == "sphere":
         Rs = 1.  # (non-dimensionalized by itself)
         dr = Rs/(N - 1)
@@ -37,17 +85,89 @@ def get_unit_solid_discr(Shape, N):
     return r_vec, volfrac_vec
 
 
-def get_dr_edges(shape, N):
-    r_vec = get_unit_solid_discr(shape, N)[0]
+def get_dr_edges(shape, N, mesh="uniform", ratio=1.):
+    """
+    Spacing of the grid points (a number for uniform meshes, otherwise an array of the N-1
+    intervals) and the edges of the control volumes of a particle.
+    """
+    r_vec = get_unit_solid_discr(shape, N, mesh, ratio)[0]
     dr = edges = None
     if r_vec is not None:
         Rs = 1.
-        dr = r_vec[1] - r_vec[0]
+        if mesh == "uniform":
+            dr = r_vec[1] - r_vec[0]
+        else:
+            dr = np.diff(r_vec)
         edges = np.hstack((0, utils.mean_linear(r_vec), Rs))
     return dr, edges
 
 
+def get_Mmat(shape, N, mesh="uniform", ratio=1.):
+    r_vec, volfrac_vec = get_unit_solid_discr(shape, N, mesh, ratio)
+    if shape == "C3":
+        Mmat = sprs.eye(N, N, format="csr")
+    elif shape in ["sphere", "cylinder"]:
+        Rs = 1.
+        # For discretization background, see Zeng & Bazant 2013
+        # Mass matrix is common for each shape, diffn or CHR
+        if shape == "sphere":
+            Vp = 4./3. * np.pi * Rs**3
+        elif shape == "cylinder":
+            Vp = np.pi * Rs**2  # per unit height
+        vol_vec = Vp * volfrac_vec
+        if mesh == "uniform":
+            M1 = sprs.diags([1./8, 3./4, 1./8], [-1, 0, 1],
+                            shape=(N, N), format="csr")
+            M1[1,0] = M1[-2,-1] = 1./4
+        else:
+            # A quarter of the volume on either side of each grid point is attributed to the
+            # neighbouring point on that side. The columns of M1 sum to one, so mass is
+            # conserved, and M1 is the above matrix for uniform meshes.
+            dr = np.diff(r_vec)
+            dr_left = np.hstack((0, dr))
+            dr_right = np.hstack((dr, 0))
+            frac_left = dr_left/(dr_left + dr_right)
+            frac_right = dr_right/(dr_left + dr_right)
+            M1 = sprs.diags([frac_right[:-1]/4, 3./4, frac_left[1:]/4], [-1, 0, 1],
+                            shape=(N, N), format="csr")
+        M2 = sprs.diags(vol_vec, 0, format="csr")
+        Mmat = M1*M2
+    return Mmat
+
+
+@functools.lru_cache(maxsize=None)
+def get_solid_disc(shape, N, mesh="uniform", ratio=1.):
+    """
+    Discretization of a particle with N grid points. It only depends on the shape and the mesh,
+    so it is computed once and shared by all particles with the same discretization. The arrays
+    are read-only.
+
+    :return: dict with the grid positions (r_vec), volume fractions (volfrac_vec), spacing (dr),
+        edges and areas (area_vec) of the control volumes, and the mass matrix (Mmat) and its
+        lower, main and upper diagonals (Mbands), where defined for the shape
+    """
+    out = {}
+    out["r_vec"], out["volfrac_vec"] = get_unit_solid_discr(shape, N, mesh, ratio)
+    out["dr"], out["edges"] = get_dr_edges(shape, N, mesh, ratio)
+    out["area_vec"] = None
+    if shape == "sphere" and out["edges"] is not None:
+        out["area_vec"] = 4*np.pi*out["edges"]**2
+    elif shape == "cylinder" and out["edges"] is not None:
+        out["area_vec"] = 2*np.pi*out["edges"]  # per unit height
+    out["Mmat"] = out["Mbands"] = None
+    if shape == "C3" or (shape in ["sphere", "cylinder"] and N > 1):
+        out["Mmat"] = get_Mmat(shape, N, mesh, ratio)
+        out["Mbands"] = tuple(out["Mmat"].diagonal(k) for k in [-1, 0, 1])
+    # Protect the shared arrays from modification
+    for value in list(out.values()) + list(out["Mbands"] or []):
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+    return out
+
+
 def calc_curv(c, dr, r_vec, Rs, beta_s, particleShape):
+    if np.ndim(dr) > 0:
+        return calc_curv_nonuniform(c, dr, r_vec, Rs, beta_s, particleShape)
     N = len(c)
     curv = np.empty(N, dtype=c.dtype)
     if particleShape == "sphere":
@@ -71,10 +191,74 @@ def calc_curv(c, dr, r_vec, Rs, beta_s, particleShape):
     return curv
 
 
-def get_elyte_disc(Nvol, L, poros, BruggExp):
+def calc_curv_nonuniform(c, dr, r_vec, Rs, beta_s, particleShape):
+    """Curvature of c as in :func:`calc_curv`, on a mesh with intervals dr."""
+    if particleShape == "sphere":
+        dim = 2
+    elif particleShape == "cylinder":
+        dim = 1
+    else:
+        raise NotImplementedError("calc_curv_c only for sphere and cylinder")
+    N = len(c)
+    hm, hp = dr[:-1], dr[1:]
+    curv = np.empty(N, dtype=c.dtype)
+    curv[0] = (dim + 1) * (2*c[1] - 2*c[0]) / dr[0]**2
+    # Second and first derivatives from the three neighbouring points
+    d2c = 2*(hm*c[2:] - (hm + hp)*c[1:-1] + hp*c[:-2]) / (hm*hp*(hm + hp))
+    dc = (hm**2*c[2:] - hp**2*c[:-2] + (hp**2 - hm**2)*c[1:-1]) / (hm*hp*(hm + hp))
+    curv[1:N-1] = d2c + (dim/r_vec[1:-1])*dc
+    curv[N-1] = (
+        (dim/Rs)*beta_s
+        + (2*c[-2] - 2*c[-1] + 2*dr[-1]*beta_s)/dr[-1]**2)
+    return curv
+
+
+def get_elyte_mesh(N, mesh="uniform", ratio=1.):
+    """
+    Widths of the electrolyte volumes of a region (anode, separator or cathode), relative to the
+    length of the region. Non-uniform meshes are refined symmetrically towards both ends of the
+    region, i.e. towards the current collectors and the interfaces between the regions.
+
+    :param int N: Number of volumes
+    :param str mesh: uniform, geometric or tanh, with the grading of :func:`get_radial_mesh`
+        from the center of the region towards each end
+    :param float ratio: Width of the central volume divided by that of the volumes at the ends,
+        for non-uniform meshes
+
+    :return: widths (array)
+    """
+    if mesh == "uniform" or ratio == 1 or N <= 2:
+        return np.full(N, 1./N)
+    # Each half of the region is graded like a particle from its center to its surface, and
+    # for an odd number of volumes the halves share the central volume
+    half = np.diff(get_radial_mesh(N//2 + N % 2 + 1, mesh, ratio))
+    widths = np.hstack((half[::-1], half[N % 2:]))
+    return widths/np.sum(widths)
+
+
+def get_elyte_widths(Nvol, mesh="uniform", ratio=None):
+    """
+    Relative widths of the electrolyte volumes in each region, see :func:`get_elyte_mesh`.
+
+    :param dict Nvol: Number of volumes per region
+    :param str mesh: Type of mesh
+    :param dict ratio: Ratio of the widths per region, for non-uniform meshes
+
+    :return: dict of {region: widths}
+    """
+    if ratio is None:
+        ratio = {}
+    return {region: get_elyte_mesh(N, mesh, ratio.get(region, 1.))
+            for region, N in Nvol.items()}
+
+
+def get_elyte_disc(Nvol, L, poros, BruggExp, mesh="uniform", ratio=None):
     out = {}
     # Width of each cell
-    out["dxvec"] = utils.get_dxvec(L, Nvol)
+    if mesh == "uniform":
+        out["dxvec"] = utils.get_dxvec(L, Nvol)
+    else:
+        out["dxvec"] = utils.get_dxvec(L, Nvol, get_elyte_widths(Nvol, mesh, ratio))
 
     # Distance between cell centers
     dxtmp = np.hstack((out["dxvec"][0], out["dxvec"], out["dxvec"][-1]))
@@ -1,6 +1,7 @@
 """The main module that organizes the simulation and manages data IO."""
 import errno
 import glob
+import json
 import os
 import shutil
 import subprocess as subp
@@ -9,33 +10,51 @@ import time
 from shutil import copyfile
 
 import daetools.pyDAE as dae
-from daetools.solvers.superlu import pySuperLU
 import numpy as np
 
 import mpet
+import mpet.cache
 import mpet.data_reporting as data_reporting
 from mpet.config import Config
 import mpet.sim as sim
+import mpet.solvers as solvers
 import mpet.utils as utils
 
 
-def run_simulation(config, outdir):
+def run_simulation(config, outdir, progress=None, inMemory=False):
+    """
+    Create the simulation and run it.
+
+    :param config: Processed :class:`mpet.config.Config`
+    :param str outdir: Directory of the output data file, or None to not write one
+    :param progress: Function called with the simulation time and the time horizon (s) after
+        each reporting interval. If given, the progress is not written to stdout.
+    :param bool inMemory: Also keep the output in memory, in ``simulation.memoryReporter``
+
+    :return: The simulation
+    """
     tScale = config["t_ref"]
     # Create Log, Solver, DataReporter and Simulation object
-    log = dae.daePythonStdOutLog()
+    log = dae.daePythonStdOutLog() if progress is None else dae.daeBaseLog()
     daesolver = dae.daeIDAS()
-    simulation = sim.SimMPET(config, tScale)
-    datareporter = data_reporting.setup_data_reporters(simulation, config, outdir)
+    simulation = sim.SimMPET(config, tScale, progress=progress)
+    datareporter = data_reporting.setup_data_reporters(simulation, config, outdir,
+                                                       inMemory=inMemory)
 
-    # Use SuperLU direct sparse LA solver
-    lasolver = pySuperLU.daeCreateSuperLUSolver()
-    daesolver.SetLASolver(lasolver)
+    # Use the selected direct sparse LA solver, or GMRES with a preconditioner
+    lasolverName, lasolver = solvers.set_linear_solver(daesolver, config)
+    if progress is None:
+        print("Linear solver:", lasolverName)
+    # Keep a reference to the LA solver for as long as the simulation is used
+    simulation.linearSolver = (lasolverName, lasolver)
 
     # Enable reporting of all variables
     simulation.m.SetReportingOn(True)
 
     # Turn off reporting of some variables
     simulation.m.endCondition.ReportingOn = False
+    for var in simulation.m.get_runtime_variables():
+        var.ReportingOn = False
 
     # Turn off reporting of particle ports
     for trode in simulation.m.trodes:
@@ -65,32 +84,91 @@ def run_simulation(config, outdir):
         sys.exit()
 
     # Initialize the simulation
-    simulation.Initialize(daesolver, datareporter, log)
+    timer = simulation.timer
+    with timer.phase("Initialize"):
+        simulation.Initialize(daesolver, datareporter, log)
+
+    # Select the fastest evaluation mode of the equations for the auto mode
+    simulation.evaluationCalibration = None
+    if config["evaluationMode"] == "auto":
+        with timer.phase("Evaluation mode calibration"):
+            simulation.evaluationCalibration = solvers.calibrate_evaluation_mode(
+                simulation, daesolver, config, verbose=progress is None)
 
     # Solve at time=0 (initialization)
     # Increase the number of Newton iterations for more robust initialization
     dae.daeGetConfig().SetString("daetools.IDAS.MaxNumItersIC","100")
-    simulation.SolveInitial()
+    with timer.phase("SolveInitial"):
+        simulation.SolveInitial()
 
     # Run
+    timer.start("Run")
     try:
         simulation.Run()
     except Exception as e:
         print(str(e))
+        simulation.error = str(e)
         simulation.ReportData(simulation.CurrentTime)
         pass
     except KeyboardInterrupt:
         print("\nphi_applied at ctrl-C:",
               simulation.m.phi_applied.GetValue(), "\n")
+        simulation.error = "KeyboardInterrupt"
         simulation.ReportData(simulation.CurrentTime)
-    simulation.Finalize()
+    timer.stop("Run")
+    # Finalize writes the output data
+    with timer.phase("Finalize"):
+        simulation.Finalize()
+    return simulation
+
+
+def write_timings(simulation, config_time, total_time, outdir):
+    """
+    Write the time spent in each phase of the simulation, and the size of the model, to
+    run_timings.json in the output directory. DeclareEquations is part of Initialize.
+    The timings of the linear solver (e.g. of the factorization) are included if available,
+    as well as the solver statistics of the whole run (e.g. the number of linear iterations
+    and convergence failures of GMRES) and the timings of the auto evaluation mode.
+    """
+    lasolverName, lasolver = simulation.linearSolver
+    timings = {"phases": {"Config processing": config_time, **simulation.timer.timings},
+               "total": total_time,
+               "model_sizes": utils.get_model_sizes(simulation.m),
+               "linear_solver": {"name": lasolverName,
+                                 "call_stats": solvers.get_call_stats(lasolver)},
+               "solver_stats": simulation.get_solver_stats(),
+               "evaluation_mode_calibration": simulation.evaluationCalibration}
+    with open(os.path.join(outdir, "run_timings.json"), "w") as fo:
+        json.dump(timings, fo, indent=4, default=str)
+
+
+def get_output_files(config, outdir):
+    """
+    Output files of a simulation that are stored in the cache: the output data file and
+    run_timings.json.
+
+    :return: dict of {file name: path}
+    """
+    ext = ".mat" if config["dataReporter"] == "mat" else ".hdf5"
+    return {filename: os.path.join(outdir, filename)
+            for filename in ["output_data" + ext, "run_timings.json"]}
+
 
+def main(paramfile, keepArchive=True, cache=None):
+    """
+    Run a simulation, with the output in a time-stamped directory in ./history, which is also
+    copied (or moved if keepArchive is False) to ./sim_output.
 
-def main(paramfile, keepArchive=True):
+    :param str paramfile: System config file
+    :param bool keepArchive: Keep the output in ./history
+    :param cache: :class:`mpet.cache.ResultCache` to read the output from, if it holds the
+        output of an identical simulation, and to store the output in otherwise
+    """
     timeStart = time.time()
     # Get the parameters dictionary (and the config instance) from the
     # parameter file
     config = Config(paramfile)
+    configTime = time.time() - timeStart
 
     # Directories we'll store output in.
     outdir_name = time.strftime("%Y%m%d_%H%M%S", time.localtime())
@@ -164,25 +242,37 @@ def main(paramfile, keepArchive=True):
 
     fo.close()
 
-    # External functions are not supported by the Compute Stack approach.
-    # Activate the Evaluation Tree approach if noise, CCsegments,
-    # or CVsegments are used
+    if cache is not None:
+        key = mpet.cache.fingerprint(config)
+        outputFiles = get_output_files(config, outdir)
+        hit = cache.get(key, outputFiles.keys())
+        if hit is not None:
+            entry = hit[0]
+            print("Using the output of an identical simulation in the cache:", entry)
+            with open(os.path.join(outdir, 'run_info.txt'), 'a') as fo:
+                print("\nOutput read from the cache:", entry, file=fo)
+            for filename, path in outputFiles.items():
+                copyfile(os.path.join(entry, filename), path)
+            copy_output(outdir, keepArchive)
+            return
+
     cfg = dae.daeGetConfig()
-    segments = config["profileType"] in ["CCsegments","CVsegments"]
-    if (segments and config["tramp"] > 0) \
-            and 'daetools.core.equations.evaluationMode' in cfg:
-        cfg.SetString('daetools.core.equations.evaluationMode', 'evaluationTree_OpenMP')
+
+    # Evaluation mode of the equations (auto is calibrated after initialization)
+    evaluationMode = solvers.set_evaluation_mode(config)
+    if evaluationMode is not None:
+        print("Evaluation mode:", evaluationMode)
 
     # Disable printStats
     cfg.SetString('daetools.activity.printStats','false')
 
-    # Write config file
+    # Carry out the simulation
+    simulation = run_simulation(config, outdir)
+
+    # Write config file, including the evaluation mode selected by the auto mode
     with open(os.path.join(outdir, "daetools_config_options.txt"), 'w') as fo:
         print(cfg, file=fo)
 
-    # Carry out the simulation
-    run_simulation(config, outdir)
-
     # Final output for user
     print("\n\nUsed parameter file ""{fname}""\n\n".format(fname=paramfile))
     timeEnd = time.time()
@@ -193,8 +283,19 @@ def main(paramfile, keepArchive=True):
             print("\nTotal run time:", tTot, "s", file=fo)
     except Exception:
         pass
+    write_timings(simulation, configTime, tTot, outdir)
+
+    # Store the output unless the simulation was stopped by an error or interrupted
+    if cache is not None and simulation.error is None:
+        cache.put(key, outputFiles, {"endCondition": simulation.endCondition,
+                                     "error": simulation.error,
+                                     "timings": simulation.timer.timings})
+
+    copy_output(outdir, keepArchive)
+
 
-    # Copy or move simulation output to current directory
+def copy_output(outdir, keepArchive=True):
+    """Copy or move simulation output to ./sim_output"""
     tmpDir = os.path.join(os.getcwd(), "sim_output")
     shutil.rmtree(tmpDir, ignore_errors=True)
     if keepArchive:
@@ -7,19 +7,25 @@ This includes the equations defining
  - potential drop along the electrodes
  - potential drop between simulated particles
 """
+import functools
+
 import daetools.pyDAE as dae
 from pyUnits import s
 
 import numpy as np
 
-import mpet.extern_funcs as extern_funcs
 import mpet.geometry as geom
 import mpet.mod_electrodes as mod_electrodes
+import mpet.plugins as plugins
 import mpet.ports as ports
+import mpet.tables as tables
 import mpet.utils as utils
 from mpet.config import constants
 from mpet.daeVariableTypes import mole_frac_t, elec_pot_t, conc_t
 
+# Tabulated electrolyte transport functions, see get_elyte_functions
+_elyte_functions = {}
+
 # Dictionary of end conditions
 endConditions = {
     1:"Vmax reached",
@@ -27,10 +33,12 @@ endConditions = {
 
 
 class ModCell(dae.daeModel):
-    def __init__(self, config, Name, Parent=None, Description=""):
+    def __init__(self, config, Name, Parent=None, Description="", timer=None):
         dae.daeModel.__init__(self, Name, Parent, Description)
 
         self.config = config
+        # Records the time spent declaring the equations
+        self.timer = timer if timer is not None else utils.PhaseTimer()
         self.profileType = config['profileType']
         Nvol = config["Nvol"]
         Npart = config["Npart"]
@@ -114,28 +122,36 @@ class ModCell(dae.daeModel):
             "current", dae.no_t, self, "Total current of the cell")
         self.endCondition = dae.daeVariable(
             "endCondition", dae.no_t, self, "A nonzero value halts the simulation")
+        # Parameters that can be changed without rebuilding the model are variables with an
+        # assigned value (see runtimeParameters)
+        self.runtime_params = {}
+        if config["runtimeParameters"]:
+            for name in constants.RUNTIME_PARAMS:
+                if config[name] is not None:
+                    self.runtime_params[name] = dae.daeVariable(
+                        name, dae.no_t, self, "Runtime value of {name}".format(name=name))
 
         # Create models for representative particles within electrode
         # volumes and ports with which to talk to them.
         self.portsOutLyte = {}
         self.portsOutBulk = {}
         self.particles = {}
+        # Particle banks hold all particles of an electrode with the same discretization in a
+        # single model, which uses the variables of the cell directly instead of ports.
+        self.particleBank = config["particleBank"]
+        self.banks = {}
         for trode in trodes:
             Nv = Nvol[trode]
             Np = Npart[trode]
-            self.portsOutLyte[trode] = np.empty(Nv, dtype=object)
-            self.portsOutBulk[trode] = np.empty((Nv, Np), dtype=object)
             self.particles[trode] = np.empty((Nv, Np), dtype=object)
+            if self.particleBank:
+                self.create_particle_banks(trode)
+                self.alias_merged_particles(trode)
+                continue
             for vInd in range(Nv):
-                self.portsOutLyte[trode][vInd] = ports.portFromElyte(
-                    "portTrode{trode}vol{vInd}".format(trode=trode, vInd=vInd), dae.eOutletPort,
-                    self, "Electrolyte port to particles")
                 for pInd in range(Np):
-                    self.portsOutBulk[trode][vInd,pInd] = ports.portFromBulk(
-                        "portTrode{trode}vol{vInd}part{pInd}".format(
-                            trode=trode, vInd=vInd, pInd=pInd),
-                        dae.eOutletPort, self,
-                        "Bulk electrode port to particles")
+                    if not self.is_representative(trode, vInd, pInd):
+                        continue
                     solidType = config[trode, "type"]
                     if solidType in constants.two_var_types:
                         pMod = mod_electrodes.Mod2var
@@ -148,12 +164,129 @@ class ModCell(dae.daeModel):
                         Name="partTrode{trode}vol{vInd}part{pInd}".format(
                             trode=trode, vInd=vInd, pInd=pInd),
                         Parent=self)
-                    self.ConnectPorts(self.portsOutLyte[trode][vInd],
-                                      self.particles[trode][vInd,pInd].portInLyte)
-                    self.ConnectPorts(self.portsOutBulk[trode][vInd,pInd],
-                                      self.particles[trode][vInd,pInd].portInBulk)
+            self.alias_merged_particles(trode)
+            # In a reduced model, the particles use the cell variables directly
+            if not config["reduceModel"]:
+                self.connect_particle_ports(trode)
+
+    def is_representative(self, trode, vInd, pInd):
+        """
+        Whether a particle is simulated, i.e. it is not merged into an identical particle in
+        the same electrode volume (see ``mergeParticles``).
+        """
+        return self.config["partRep"][trode][vInd, pInd] == pInd
+
+    def alias_merged_particles(self, trode):
+        """
+        Refer to the model of the representative particle for each merged particle, so the
+        variables of every particle can be accessed.
+        """
+        partRep = self.config["partRep"][trode]
+        for (vInd, pInd), rep in np.ndenumerate(partRep):
+            if rep != pInd:
+                self.particles[trode][vInd, pInd] = self.particles[trode][vInd, rep]
+
+    def get_merged_particles(self):
+        """
+        Names of the particles that are not simulated, and of the particle representing each.
+
+        :return: dict of {name: name of the representative particle}
+        """
+        merged = {}
+        for trode in self.trodes:
+            for (vInd, pInd), rep in np.ndenumerate(self.config["partRep"][trode]):
+                if rep != pInd:
+                    name = "partTrode{trode}vol{vInd}part{pInd}".format(
+                        trode=trode, vInd=vInd, pInd=pInd)
+                    merged[name] = self.particles[trode][vInd, pInd].Name
+        return merged
+
+    def connect_particle_ports(self, trode):
+        """
+        Create the ports through which the particles of an electrode receive the electrolyte and
+        solid potential variables, and connect them to the particles.
+        """
+        Nv = self.config["Nvol"][trode]
+        Np = self.config["Npart"][trode]
+        self.portsOutLyte[trode] = np.empty(Nv, dtype=object)
+        self.portsOutBulk[trode] = np.empty((Nv, Np), dtype=object)
+        for vInd in range(Nv):
+            self.portsOutLyte[trode][vInd] = ports.portFromElyte(
+                "portTrode{trode}vol{vInd}".format(trode=trode, vInd=vInd), dae.eOutletPort,
+                self, "Electrolyte port to particles")
+            for pInd in range(Np):
+                if not self.is_representative(trode, vInd, pInd):
+                    continue
+                self.portsOutBulk[trode][vInd,pInd] = ports.portFromBulk(
+                    "portTrode{trode}vol{vInd}part{pInd}".format(
+                        trode=trode, vInd=vInd, pInd=pInd),
+                    dae.eOutletPort, self,
+                    "Bulk electrode port to particles")
+                self.ConnectPorts(self.portsOutLyte[trode][vInd],
+                                  self.particles[trode][vInd,pInd].portInLyte)
+                self.ConnectPorts(self.portsOutBulk[trode][vInd,pInd],
+                                  self.particles[trode][vInd,pInd].portInBulk)
+
+    def get_param(self, name):
+        """
+        Value of a system parameter in the equations: the assigned variable of a runtime
+        parameter (see ``runtimeParameters``), or else the value in the config.
+        """
+        if name in self.runtime_params:
+            return self.runtime_params[name]()
+        return self.config[name]
+
+    def get_runtime_variables(self):
+        """
+        Variables holding the runtime parameters of the cell and of all particle models.
+        """
+        variables = list(self.runtime_params.values())
+        for trode in self.trodes:
+            models = self.banks[trode] if self.particleBank else [
+                self.particles[trode][vInd, pInd]
+                for vInd, pInd in np.ndindex(self.particles[trode].shape)
+                if self.is_representative(trode, vInd, pInd)]
+            for model in models:
+                variables.extend(model.params.values())
+        return variables
+
+    def assign_runtime_parameters(self, reassign=False):
+        """
+        Assign the values of the runtime parameters in the config to their variables. Once the
+        simulation is initialized, they are reassigned (reassign=True).
+        """
+        config = self.config
+        method = "ReAssignValue" if reassign else "AssignValue"
+        for name, var in self.runtime_params.items():
+            getattr(var, method)(config[name])
+        for trode in self.trodes:
+            for vInd, pInd in np.ndindex(self.particles[trode].shape):
+                if not self.is_representative(trode, vInd, pInd):
+                    continue
+                for name, var in self.particles[trode][vInd, pInd].params.items():
+                    getattr(var, method)(float(config[trode, name][vInd, pInd]))
+
+    def create_particle_banks(self, trode):
+        """
+        Create one particle bank per distinct particle discretization size in an electrode.
+        The particles of a bank are stored in self.particles like individual particle models.
+        """
+        config = self.config
+        psd_num = config["psd_num"][trode]
+        self.banks[trode] = []
+        for N in np.unique(psd_num):
+            inds = [(vInd, pInd) for vInd in range(config["Nvol"][trode])
+                    for pInd in range(config["Npart"][trode])
+                    if psd_num[vInd,pInd] == N and self.is_representative(trode, vInd, pInd)]
+            bank = mod_electrodes.ModParticleBank(
+                config, trode, int(N), inds,
+                Name="bankTrode{trode}N{N}".format(trode=trode, N=N), Parent=self)
+            self.banks[trode].append(bank)
+            for particle in bank.particles:
+                self.particles[trode][particle.ind] = particle
 
     def DeclareEquations(self):
+        self.timer.start("DeclareEquations")
         dae.daeModel.DeclareEquations(self)
 
         # Some values of domain lengths
@@ -162,20 +295,25 @@ class ModCell(dae.daeModel):
         Nvol = config["Nvol"]
         Npart = config["Npart"]
         Nlyte = np.sum(list(Nvol.values()))
+        # Widths of the electrolyte volumes, relative to the length of each region
+        widths = geom.get_elyte_widths(Nvol, config["elyteMesh"], config["elyteMeshRatio"])
 
         # Define the overall filling fraction in the electrodes
         for trode in trodes:
             eq = self.CreateEquation("ffrac_{trode}".format(trode=trode))
             eq.Residual = self.ffrac[trode]()
-            dx = 1./Nvol[trode]
+            dx = widths[trode]
             # Make a float of Vtot, total particle volume in electrode
             # Note: for some reason, even when "factored out", it's a bit
             # slower to use Sum(self.psd_vol_ac[l].array([], [])
             tmp = 0
             for vInd in range(Nvol[trode]):
                 for pInd in range(Npart[trode]):
-                    Vj = config["psd_vol_FracVol"][trode][vInd,pInd]
-                    tmp += self.particles[trode][vInd,pInd].cbar() * Vj * dx
+                    if not self.is_representative(trode, vInd, pInd):
+                        continue
+                    # Volume fraction of this particle and those merged into it
+                    Vj = config["partWeight"][trode][vInd,pInd]
+                    tmp += self.particles[trode][vInd,pInd].cbar() * Vj * dx[vInd]
             eq.Residual -= tmp
 
         # Define dimensionless R_Vp for each electrode volume
@@ -188,8 +326,10 @@ class ModCell(dae.daeModel):
                 RHS = 0
                 # sum over particle volumes in given electrode volume
                 for pInd in range(Npart[trode]):
-                    # The volume of this particular particle
-                    Vj = config["psd_vol_FracVol"][trode][vInd,pInd]
+                    if not self.is_representative(trode, vInd, pInd):
+                        continue
+                    # The volume of this particular particle, and of those merged into it
+                    Vj = config["partWeight"][trode][vInd,pInd]
                     RHS += -(config["beta"][trode] * (1-config["poros"][trode])
                              * config["P_L"][trode] * Vj
                              * self.particles[trode][vInd,pInd].dcbardt())
@@ -197,21 +337,25 @@ class ModCell(dae.daeModel):
 
         # Define output port variables
         for trode in trodes:
-            for vInd in range(Nvol[trode]):
-                eq = self.CreateEquation(
-                    "portout_c_trode{trode}vol{vInd}".format(vInd=vInd, trode=trode))
-                eq.Residual = (self.c_lyte[trode](vInd)
-                               - self.portsOutLyte[trode][vInd].c_lyte())
-                eq = self.CreateEquation(
-                    "portout_p_trode{trode}vol{vInd}".format(vInd=vInd, trode=trode))
-                phi_lyte = self.phi_lyte[trode](vInd)
-                eq.Residual = (phi_lyte - self.portsOutLyte[trode][vInd].phi_lyte())
-                for pInd in range(Npart[trode]):
+            # Particles in a bank or a reduced model use the cell variables directly
+            if trode in self.portsOutLyte:
+                for vInd in range(Nvol[trode]):
                     eq = self.CreateEquation(
-                        "portout_pm_trode{trode}v{vInd}p{pInd}".format(
-                            vInd=vInd, pInd=pInd, trode=trode))
-                    eq.Residual = (self.phi_part[trode](vInd, pInd)
-                                   - self.portsOutBulk[trode][vInd,pInd].phi_m())
+                        "portout_c_trode{trode}vol{vInd}".format(vInd=vInd, trode=trode))
+                    eq.Residual = (self.c_lyte[trode](vInd)
+                                   - self.portsOutLyte[trode][vInd].c_lyte())
+                    eq = self.CreateEquation(
+                        "portout_p_trode{trode}vol{vInd}".format(vInd=vInd, trode=trode))
+                    phi_lyte = self.phi_lyte[trode](vInd)
+                    eq.Residual = (phi_lyte - self.portsOutLyte[trode][vInd].phi_lyte())
+                    for pInd in range(Npart[trode]):
+                        if not self.is_representative(trode, vInd, pInd):
+                            continue
+                        eq = self.CreateEquation(
+                            "portout_pm_trode{trode}v{vInd}p{pInd}".format(
+                                vInd=vInd, pInd=pInd, trode=trode))
+                        eq.Residual = (self.phi_part[trode](vInd, pInd)
+                                       - self.portsOutBulk[trode][vInd,pInd].phi_m())
 
             # Simulate the potential drop along the bulk electrode
             # solid phase
@@ -233,9 +377,11 @@ class ModCell(dae.daeModel):
                     # Potential at current at current collector is
                     # reference (set)
                     phi_tmp[-1] = config["phi_cathode"]
-                dx = config["L"][trode]/Nvol[trode]
+                dx = config["L"][trode]*widths[trode]
+                # Distance between the centers of the volumes (and to the ghost points)
+                dxd1 = utils.mean_linear(utils.pad_vec(dx))
                 dvg_curr_dens = np.diff(-poros_walls*config["sigma_s"][trode]
-                                        * np.diff(phi_tmp)/dx)/dx
+                                        * np.diff(phi_tmp)/dxd1)/dx
             # Actually set up the equations for bulk solid phi
             for vInd in range(Nvol[trode]):
                 eq = self.CreateEquation(
@@ -287,7 +433,8 @@ class ModCell(dae.daeModel):
             eq = self.CreateEquation("phi_lyte")
             eq.Residual = self.phi_lyte["c"](0) - self.phi_cell()
         else:
-            disc = geom.get_elyte_disc(Nvol, config["L"], config["poros"], config["BruggExp"])
+            disc = geom.get_elyte_disc(Nvol, config["L"], config["poros"], config["BruggExp"],
+                                       config["elyteMesh"], config["elyteMeshRatio"])
             cvec = utils.get_asc_vec(self.c_lyte, Nvol)
             dcdtvec = utils.get_asc_vec(self.c_lyte, Nvol, dt=True)
             phivec = utils.get_asc_vec(self.phi_lyte, Nvol)
@@ -297,7 +444,8 @@ class ModCell(dae.daeModel):
             ctmp = np.hstack((self.c_lyteGP_L(), cvec, cvec[-1]))
             phitmp = np.hstack((self.phi_lyteGP_L(), phivec, phivec[-1]))
 
-            Nm_edges, i_edges = get_lyte_internal_fluxes(ctmp, phitmp, disc, config)
+            Nm_edges, i_edges = get_lyte_internal_fluxes(ctmp, phitmp, disc, config,
+                                                         model=self)
 
             # If we don't have a porous anode:
             # 1) the total current flowing into the electrolyte is set
@@ -312,12 +460,12 @@ class ModCell(dae.daeModel):
                 # We assume BV kinetics with alpha = 0.5,
                 # exchange current density, ecd = k0_foil * c_lyte**(0.5)
                 cWall = .5*(ctmp[0] + ctmp[1])
-                ecd = config["k0_foil"]*cWall**0.5
+                ecd = self.get_param("k0_foil")*cWall**0.5
                 # note negative current because positive current is
                 # oxidation here
                 BVfunc = -self.current() / ecd
                 eta_eff = 2*np.arcsinh(-BVfunc/2.)
-                eta = eta_eff + self.current()*config["Rfilm_foil"]
+                eta = eta_eff + self.current()*self.get_param("Rfilm_foil")
                 # eta = mu_R - mu_O = -mu_O (evaluated at interface)
                 # mu_O = [T*ln(c) +] phiWall - phi_cell = -eta
                 # phiWall = -eta + phi_cell [- T*ln(c)]
@@ -336,7 +484,18 @@ class ModCell(dae.daeModel):
             for vInd in range(Nlyte):
                 # Mass Conservation (done with the anion, although "c" is neutral salt conc)
                 eq = self.CreateEquation("lyte_mass_cons_vol{vInd}".format(vInd=vInd))
-                eq.Residual = disc["porosvec"][vInd]*dcdtvec[vInd] + (1./config["num"])*dvgNm[vInd]
+                if not config["elyteQuasiSteady"]:
+                    eq.Residual = (disc["porosvec"][vInd]*dcdtvec[vInd]
+                                   + (1./config["num"])*dvgNm[vInd])
+                elif vInd < Nlyte - 1:
+                    # The anion flux is steady
+                    eq.Residual = dvgNm[vInd]
+                else:
+                    # As no anions cross the boundaries, the steady flux equations only
+                    # determine the concentration up to a constant, which follows from the
+                    # conservation of the total amount of salt
+                    salt = disc["porosvec"]*disc["dxvec"]
+                    eq.Residual = np.sum(salt*cvec) - config["c0"]*np.sum(salt)
                 # Charge Conservation
                 eq = self.CreateEquation("lyte_charge_cons_vol{vInd}".format(vInd=vInd))
                 eq.Residual = -dvgi[vInd] + config["zp"]*Rvvec[vInd]
@@ -347,40 +506,40 @@ class ModCell(dae.daeModel):
         eq = self.CreateEquation("Total_Current")
         eq.Residual = self.current()
         limtrode = config["limtrode"]
-        dx = 1./Nvol[limtrode]
+        dx = widths[limtrode]
         rxn_scl = config["beta"][limtrode] * (1-config["poros"][limtrode]) \
             * config["P_L"][limtrode]
         for vInd in range(Nvol[limtrode]):
             if limtrode == "a":
-                eq.Residual -= dx * self.R_Vp[limtrode](vInd)/rxn_scl
+                eq.Residual -= dx[vInd] * self.R_Vp[limtrode](vInd)/rxn_scl
             else:
-                eq.Residual += dx * self.R_Vp[limtrode](vInd)/rxn_scl
+                eq.Residual += dx[vInd] * self.R_Vp[limtrode](vInd)/rxn_scl
         # Define the measured voltage, offset by the "applied" voltage
         # by any series resistance.
         # phi_cell = phi_applied - I*R
         eq = self.CreateEquation("Measured_Voltage")
         eq.Residual = self.phi_cell() - (
-            self.phi_applied() - config["Rser"]*self.current())
+            self.phi_applied() - self.get_param("Rser")*self.current())
 
         if self.profileType == "CC":
             # Total Current Constraint Equation
             eq = self.CreateEquation("Total_Current_Constraint")
             if config["tramp"] > 0:
                 eq.Residual = self.current() - (
-                    config["currPrev"] + (config["currset"] - config["currPrev"])
+                    config["currPrev"] + (self.get_param("currset") - config["currPrev"])
                     * (1 - np.exp(-dae.Time()/(config["tend"]*config["tramp"]))))
             else:
-                eq.Residual = self.current() - config["currset"]
+                eq.Residual = self.current() - self.get_param("currset")
         elif self.profileType == "CV":
             # Keep applied potential constant
             eq = self.CreateEquation("applied_potential")
             if config["tramp"] > 0:
                 eq.Residual = self.phi_applied() - (
-                    config["phiPrev"] + (config["Vset"] - config["phiPrev"])
+                    config["phiPrev"] + (self.get_param("Vset") - config["phiPrev"])
                     * (1 - np.exp(-dae.Time()/(config["tend"]*config["tramp"])))
                     )
             else:
-                eq.Residual = self.phi_applied() - config["Vset"]
+                eq.Residual = self.phi_applied() - self.get_param("Vset")
         elif self.profileType == "CP":
             # constant power constraint
             ndDVref = config["c", "phiRef"]
@@ -391,20 +550,22 @@ class ModCell(dae.daeModel):
             if config["tramp"] > 0:
                 eq.Residual = self.current()*(self.phi_applied() + ndDVref) - (
                     config["currPrev"]*(config["phiPrev"] + ndDVref)
-                    + (config["power"] - (config["currPrev"]*(config["phiPrev"]
-                                                              + ndDVref)))
+                    + (self.get_param("power") - (config["currPrev"]*(config["phiPrev"]
+                                                                      + ndDVref)))
                     * (1 - np.exp(-dae.Time()/(config["tend"]*config["tramp"])))
                     )
             else:
-                eq.Residual = self.current()*(self.phi_applied() + ndDVref) - config["power"]
+                eq.Residual = (self.current()*(self.phi_applied() + ndDVref)
+                               - self.get_param("power"))
         elif self.profileType == "CCsegments":
             if config["tramp"] > 0:
                 config["segments_setvec"][0] = config["currPrev"]
-                self.segSet = extern_funcs.InterpTimeScalar(
-                    "segSet", self, dae.unit(), dae.Time(),
-                    config["segments_tvec"], config["segments_setvec"])
-                eq = self.CreateEquation("Total_Current_Constraint")
-                eq.Residual = self.current() - self.segSet()
+
+                def declare_equations(segSet):
+                    eq = self.CreateEquation("Total_Current_Constraint")
+                    eq.Residual = self.current() - segSet
+                utils.declare_piecewise_linear_time(
+                    self, config["segments_tvec"], config["segments_setvec"], declare_equations)
 
             # CCsegments implemented as discontinuous equations
             else:
@@ -430,11 +591,12 @@ class ModCell(dae.daeModel):
         elif self.profileType == "CVsegments":
             if config["tramp"] > 0:
                 config["segments_setvec"][0] = config["phiPrev"]
-                self.segSet = extern_funcs.InterpTimeScalar(
-                    "segSet", self, dae.unit(), dae.Time(),
-                    config["segments_tvec"], config["segments_setvec"])
-                eq = self.CreateEquation("applied_potential")
-                eq.Residual = self.phi_applied() - self.segSet()
+
+                def declare_equations(segSet):
+                    eq = self.CreateEquation("applied_potential")
+                    eq.Residual = self.phi_applied() - segSet
+                utils.declare_piecewise_linear_time(
+                    self, config["segments_tvec"], config["segments_setvec"], declare_equations)
 
             # CVsegments implemented as discontinuous equations
             else:
@@ -463,17 +625,41 @@ class ModCell(dae.daeModel):
         # Ending conditions for the simulation
         if self.profileType in ["CC", "CCsegments"]:
             # Vmax reached
-            self.ON_CONDITION((self.phi_applied() <= config["phimin"])
+            self.ON_CONDITION((self.phi_applied() <= self.get_param("phimin"))
                               & (self.endCondition() < 1),
                               setVariableValues=[(self.endCondition, 1)])
 
             # Vmin reached
-            self.ON_CONDITION((self.phi_applied() >= config["phimax"])
+            self.ON_CONDITION((self.phi_applied() >= self.get_param("phimax"))
                               & (self.endCondition() < 1),
                               setVariableValues=[(self.endCondition, 2)])
 
-
-def get_lyte_internal_fluxes(c_lyte, phi_lyte, disc, config):
+        self.timer.stop("DeclareEquations")
+
+
+def get_elyte_functions(config, model=None):
+    """
+    Transport functions of a Stefan-Maxwell electrolyte (D, sigma, thermodynamic factor and
+    tp0), replaced by tables if ``SMsetTable`` is set. The tables are made once for each
+    electrolyte, temperature and table settings, e.g. not again for every time step that
+    ``mpet.plot.plot_data`` computes the current of. Tables evaluated in expressions use
+    external functions of the given model.
+    """
+    elyte_function = plugins.get_function("electrolyte", config["SMset"],
+                                          config["SMset_filename"])
+    if not config["SMsetTable"]:
+        return elyte_function()[:-1]
+    key = (elyte_function, config["T"], config["SMsetTableTol"],
+           tuple(config["SMsetTableRange"]))
+    if key not in _elyte_functions:
+        _elyte_functions[key] = tables.tabulate_elyte_functions(
+            elyte_function()[:-1], config["T"], config["SMsetTableTol"],
+            config["SMsetTableRange"], name=config["SMset"])
+    return [functools.partial(function, model=model) if hasattr(function, "table")
+            else function for function in _elyte_functions[key]]
+
+
+def get_lyte_internal_fluxes(c_lyte, phi_lyte, disc, config, model=None):
     zp, zm, nup, num = config["zp"], config["zm"], config["nup"], config["num"]
     nu = nup + num
     T = config["T"]
@@ -494,10 +680,7 @@ def get_lyte_internal_fluxes(c_lyte, phi_lyte, disc, config):
         i_edges_int = (-((nup*zp*Dp + num*zm*Dm)*np.diff(c_lyte)/dxd1)
                        - (nup*zp**2*Dp + num*zm**2*Dm)/T*c_edges_int*np.diff(phi_lyte)/dxd1)
     elif config["elyteModelType"] == "SM":
-        SMset = config["SMset"]
-        elyte_function = utils.import_function(config["SMset_filename"], SMset,
-                                               mpet_module=f"mpet.electrolyte.{SMset}")
-        D_fs, sigma_fs, thermFac, tp0 = elyte_function()[:-1]
+        D_fs, sigma_fs, thermFac, tp0 = get_elyte_functions(config, model)
 
         # Get diffusivity and conductivity at cell edges using weighted harmonic mean
         D_edges = utils.weighted_harmonic_mean(eps_o_tau*D_fs(c_lyte, T), wt)
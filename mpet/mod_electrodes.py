@@ -6,105 +6,173 @@ This includes the equations for both 1-parameter models and 2-parameters models
 In each model class it has options for different types of particles:
  - homogeneous
  - Fick-like diffusion
+ - Fick-like diffusion with a polynomial concentration profile
  - Cahn-Hilliard (with reaction boundary condition)
  - Allen-Cahn (with reaction throughout the particle)
 These models can be instantiated from the mod_cell module to simulate various types of active
-materials within a battery electrode.
+materials within a battery electrode. Alternatively, all particles of an electrode that share the
+same discretization can be simulated within a single particle bank model.
+In a reduced model, the particles use the variables of the cell directly instead of through ports,
+and the rate of particle filling is substituted by the reaction rates it follows from.
 """
 import daetools.pyDAE as dae
 import numpy as np
 import scipy.sparse as sprs
-import scipy.interpolate as sintrp
 
 import mpet.geometry as geo
+import mpet.plugins as plugins
 import mpet.ports as ports
 import mpet.props_am as props_am
+import mpet.tables as tables
+import mpet.trace as trace
 import mpet.utils as utils
+from mpet.config import constants
 from mpet.daeVariableTypes import mole_frac_t
 
 
-class Mod2var(dae.daeModel):
-    def __init__(self, config, trode, vInd, pInd,
-                 Name, Parent=None, Description=""):
-        super().__init__(Name, Parent, Description)
+class ParticleEquations:
+    """Base for the equations of a single particle.
 
-        self.config = config
-        self.trode = trode
-        self.ind = (vInd, pInd)
-
-        # Domain
-        self.Dmn = dae.daeDomain("discretizationDomain", self, dae.unit(),
-                                 "discretization domain")
-
-        # Variables
-        self.c1 = dae.daeVariable(
-            "c1", mole_frac_t, self,
-            "Concentration in 'layer' 1 of active particle", [self.Dmn])
-        self.c2 = dae.daeVariable(
-            "c2", mole_frac_t, self,
-            "Concentration in 'layer' 2 of active particle", [self.Dmn])
-        self.cbar = dae.daeVariable(
-            "cbar", mole_frac_t, self,
-            "Average concentration in active particle")
-        self.c1bar = dae.daeVariable(
-            "c1bar", mole_frac_t, self,
-            "Average concentration in 'layer' 1 of active particle")
-        self.c2bar = dae.daeVariable(
-            "c2bar", mole_frac_t, self,
-            "Average concentration in 'layer' 2 of active particle")
-        self.dcbardt = dae.daeVariable("dcbardt", dae.no_t, self, "Rate of particle filling")
-        if self.get_trode_param("type") not in ["ACR2"]:
-            self.Rxn1 = dae.daeVariable("Rxn1", dae.no_t, self, "Rate of reaction 1")
-            self.Rxn2 = dae.daeVariable("Rxn2", dae.no_t, self, "Rate of reaction 2")
-        else:
-            self.Rxn1 = dae.daeVariable("Rxn1", dae.no_t, self, "Rate of reaction 1", [self.Dmn])
-            self.Rxn2 = dae.daeVariable("Rxn2", dae.no_t, self, "Rate of reaction 2", [self.Dmn])
-
-        # Get reaction rate function
-        rxnType = config[trode, "rxnType"]
-        self.calc_rxn_rate = utils.import_function(config[trode, "rxnType_filename"],
-                                                   rxnType,
-                                                   f"mpet.electrode.reactions.{rxnType}")
-
-        # Ports
-        self.portInLyte = ports.portFromElyte(
-            "portInLyte", dae.eInletPort, self, "Inlet port from electrolyte")
-        self.portInBulk = ports.portFromBulk(
-            "portInBulk", dae.eInletPort, self,
-            "Inlet port from e- conducting phase")
-        self.phi_lyte = self.portInLyte.phi_lyte
-        self.c_lyte = self.portInLyte.c_lyte
-        self.phi_m = self.portInBulk.phi_m
+    Subclasses provide the particle variables (``c``, ``cbar``, ``dcbardt``, ``Rxn``, ...), the
+    electrolyte and electron conducting phase variables (``c_lyte``, ``phi_lyte``, ``phi_m``),
+    ``calc_rxn_rate`` and ``CreateEquation``. This allows the same equations to be declared in
+    a stand-alone particle model (:class:`Mod1var`, :class:`Mod2var`) or for a single particle
+    within a :class:`ModParticleBank`.
+    """
 
     def get_trode_param(self, item):
         """
-        Shorthand to retrieve electrode-specific value
+        Shorthand to retrieve electrode-specific value. Runtime parameters (see
+        ``runtimeParameters``) are the expressions of their assigned variables.
         """
+        if item in self.params:
+            return self.params[item]()
         value = self.config[self.trode, item]
         # check if it is a particle-specific parameter
         if item in self.config.params_per_particle:
             value = value[self.ind]
         return value
 
-    def DeclareEquations(self):
-        dae.daeModel.DeclareEquations(self)
+    def get_muRfunc(self):
+        """
+        Chemical potential function of this particle, replaced by tables if ``muRfuncTable``
+        is set. The external functions of the tables belong to the model of the equations (the
+        particle bank for particles of a bank).
+        """
+        muRfunc = props_am.muRfuncs(self.config, self.trode, self.ind, particle=self).muRfunc
+        if self.get_trode_param("muRfuncTable"):
+            muRfunc = tables.tabulate_muRfunc(
+                muRfunc, self.get_trode_param("muR_ref"),
+                self.get_trode_param("muRfuncTableTol"),
+                self.get_trode_param("muRfuncTableRange"), name=self.get_trode_param("muRfunc"),
+                model=getattr(self, "bank", self))
+        return muRfunc
+
+    def get_mesh_options(self):
+        """
+        Type and refinement ratio of the radial mesh of this particle, as used by the
+        functions of :mod:`mpet.geometry`
+        """
+        return self.get_trode_param("radialMesh"), self.get_trode_param("radialMeshRatio")
+
+    def declare_noise(self, name):
+        """
+        Declare the equations of a noise variable, which has random values at ``numnoise``
+        times at each grid point, interpolated linearly in time. After the last time, 5% after
+        the end of the simulation, the noise is zero.
+
+        :param str name: Name of the noise variable
+        :return: array of the noise at each grid point
+        """
+        N = self.get_trode_param("N")
+        numnoise = self.get_trode_param("numnoise")
+        noise_prefac = self.get_trode_param("noise_prefac")
+        tvec = np.linspace(0., 1.05*self.config["tend"], numnoise)
+        noise_data = noise_prefac*np.random.randn(numnoise, N)
+        noise = getattr(self, name)
+
+        def declare_equations(values):
+            for k in range(N):
+                eq = self.CreateEquation("{name}{k}".format(name=name, k=k))
+                eq.Residual = noise(k) - values[k]
+        utils.declare_piecewise_linear_time(self, tvec, noise_data, declare_equations,
+                                            yafter=0.)
+        return np.array([noise(k) for k in range(N)], dtype=object)
+
+    def get_eliminated_outputs(self):
+        """
+        Describe the variables eliminated from the particle in a reduced model, which are
+        substituted by a weighted sum of other variables of the particle (see
+        :class:`EliminatedVariable`). Their output is evaluated from the reported values of those
+        variables in the same way.
+
+        :return: {eliminated variable: {variable: weights}}
+        """
+        if not self.config["reduceModel"]:
+            return {}
+        if self.get_trode_param("type") in constants.two_var_types:
+            names = ["Rxn1", "Rxn2"]
+        else:
+            names = ["Rxn"]
+        weights = self.get_filling_rate_weights()
+        return {"dcbardt": {name: weights for name in names}}
+
+    def get_filling_rate_weights(self):
+        """
+        Weights of the reaction rates in the average rate of filling of the particle, which
+        follow from mass conservation of its discretization: the fluxes between grid points do
+        not change the amount in the particle. For two variable particles, the weights apply to
+        each of the reaction rates.
+
+        :return: array of the weights of the reaction rate at each grid point for ACR particles,
+            and the weight of the reaction rate otherwise
+        """
+        solidType = self.get_trode_param("type")
+        disc = geo.get_solid_disc(self.get_trode_param("shape"), self.get_trode_param("N"),
+                                  *self.get_mesh_options())
+        # The rate of filling is volfrac_vec^T * dcdt, where M*dcdt = RHS
+        weights_RHS = disc["volfrac_vec"]
+        if disc["Mmat"] is not None:
+            weights_RHS = np.linalg.solve(disc["Mmat"].T.toarray(), weights_RHS)
+        if solidType in ["ACR", "ACR2"]:
+            weights = self.get_trode_param("delta_L") * weights_RHS
+        elif solidType in ["diffn", "CHR", "diffn2", "CHR2"]:
+            # The reaction is the flux into the particle at its surface
+            weights = weights_RHS[-1] * disc["area_vec"][-1]
+        else:
+            weights = self.get_trode_param("delta_L")
+        if solidType in constants.two_var_types:
+            # The rate of filling is the average of both layers
+            weights = .5 * weights
+        if solidType in ["diffn2", "CHR2"]:
+            # Each layer takes up half of its reaction at the surface
+            weights = .5 * weights
+        return weights
+
+    def use_cell_variables(self, cell):
+        """
+        Use the electrolyte and solid potential variables of the parent cell model directly,
+        instead of through ports.
+        """
+        vInd, pInd = self.ind
+        self.c_lyte = VariableView(cell.c_lyte[self.trode], vInd)
+        self.phi_lyte = VariableView(cell.phi_lyte[self.trode], vInd)
+        self.phi_m = VariableView(cell.phi_part[self.trode], vInd, pInd)
+
+
+class Particle2varEquations(ParticleEquations):
+    def declare_particle_equations(self):
         N = self.get_trode_param("N")  # number of grid points in particle
         T = self.config["T"]  # nondimensional temperature
-        r_vec, volfrac_vec = geo.get_unit_solid_discr(self.get_trode_param('shape'), N)
+        volfrac_vec = geo.get_solid_disc(self.get_trode_param('shape'), N,
+                                         *self.get_mesh_options())["volfrac_vec"]
+        # Chemical potential function of this particle
+        self.muRfunc = self.get_muRfunc()
 
         # Prepare noise
-        self.noise1 = self.noise2 = None
+        noises = (None, None)
         if self.get_trode_param("noise"):
-            numnoise = self.get_trode_param("numnoise")
-            noise_prefac = self.get_trode_param("noise_prefac")
-            tvec = np.linspace(0., 1.05*self.config["tend"], numnoise)
-            noise_data1 = noise_prefac*np.random.randn(numnoise, N)
-            noise_data2 = noise_prefac*np.random.randn(numnoise, N)
-            self.noise1 = sintrp.interp1d(tvec, noise_data1, axis=0,
-                                          bounds_error=False, fill_value=0.)
-            self.noise2 = sintrp.interp1d(tvec, noise_data2, axis=0,
-                                          bounds_error=False, fill_value=0.)
-        noises = (self.noise1, self.noise2)
+            noises = (self.declare_noise("noise1"), self.declare_noise("noise2"))
 
         # Figure out mu_O, mu of the oxidized state
         mu_O, act_lyte = calc_mu_O(
@@ -122,11 +190,12 @@ class Mod2var(dae.daeModel):
         eq = self.CreateEquation("cbar")
         eq.Residual = self.cbar() - .5*(self.c1bar() + self.c2bar())
 
-        # Define average rate of filling of particle
-        eq = self.CreateEquation("dcbardt")
-        eq.Residual = self.dcbardt()
-        for k in range(N):
-            eq.Residual -= .5*(self.c1.dt(k) + self.c2.dt(k)) * volfrac_vec[k]
+        # Define average rate of filling of particle, unless it is eliminated
+        if not self.config["reduceModel"]:
+            eq = self.CreateEquation("dcbardt")
+            eq.Residual = self.dcbardt()
+            for k in range(N):
+                eq.Residual -= .5*(self.c1.dt(k) + self.c2.dt(k)) * volfrac_vec[k]
 
         c1 = np.empty(N, dtype=object)
         c2 = np.empty(N, dtype=object)
@@ -139,24 +208,21 @@ class Mod2var(dae.daeModel):
             # Equations for 0D particles of 1 field variables
             self.sld_dynamics_0D2var(c1, c2, mu_O, act_lyte, noises)
 
-        for eq in self.Equations:
-            eq.CheckUnitsConsistency = False
-
     def sld_dynamics_0D2var(self, c1, c2, muO, act_lyte, noises):
         T = self.config["T"]
         c1_surf = c1
         c2_surf = c2
         (mu1R_surf, mu2R_surf), (act1R_surf, act2R_surf) = calc_muR(
-            (c1_surf, c2_surf), (self.c1bar(), self.c2bar()), self.config,
-            self.trode, self.ind)
+            (c1_surf, c2_surf), (self.c1bar(), self.c2bar()), self.muRfunc,
+            self.get_trode_param("muR_ref"))
         eta1 = calc_eta(mu1R_surf, muO)
         eta2 = calc_eta(mu2R_surf, muO)
         eta1_eff = eta1 + self.Rxn1()*self.get_trode_param("Rfilm")
         eta2_eff = eta2 + self.Rxn2()*self.get_trode_param("Rfilm")
         noise1, noise2 = noises
         if self.get_trode_param("noise"):
-            eta1_eff += noise1(dae.Time().Value)
-            eta2_eff += noise2(dae.Time().Value)
+            eta1_eff += noise1
+            eta2_eff += noise2
         Rxn1 = self.calc_rxn_rate(
             eta1_eff, c1_surf, self.c_lyte(), self.get_trode_param("k0"),
             self.get_trode_param("E_A"), T, act1R_surf, act_lyte,
@@ -180,13 +246,14 @@ class Mod2var(dae.daeModel):
         T = self.config["T"]
         # Equations for concentration evolution
         # Mass matrix, M, where M*dcdt = RHS, where c and RHS are vectors
-        Mmat = get_Mmat(self.get_trode_param('shape'), N)
-        dr, edges = geo.get_dr_edges(self.get_trode_param('shape'), N)
+        disc = geo.get_solid_disc(self.get_trode_param('shape'), N, *self.get_mesh_options())
+        dr = disc["dr"]
 
         # Get solid particle chemical potential, overpotential, reaction rate
         if self.get_trode_param("type") in ["diffn2", "CHR2"]:
             (mu1R, mu2R), (act1R, act2R) = calc_muR(
-                (c1, c2), (self.c1bar(), self.c2bar()), self.config, self.trode, self.ind)
+                (c1, c2), (self.c1bar(), self.c2bar()), self.muRfunc,
+                self.get_trode_param("muR_ref"))
             c1_surf = c1[-1]
             c2_surf = c2[-1]
             mu1R_surf, act1R_surf = mu1R[-1], act1R[-1]
@@ -227,19 +294,14 @@ class Mod2var(dae.daeModel):
             # flux of Li at the surface.
             Flux1_bc = -0.5 * self.Rxn1()
             Flux2_bc = -0.5 * self.Rxn2()
-            Dfunc_name = self.get_trode_param("Dfunc")
-            Dfunc = utils.import_function(self.get_trode_param("Dfunc_filename"),
-                                          Dfunc_name,
-                                          f"mpet.electrode.diffusion.{Dfunc_name}")
+            Dfunc = plugins.get_function("diffusion", self.get_trode_param("Dfunc"),
+                                         self.get_trode_param("Dfunc_filename"))
             if self.get_trode_param("type") == "CHR2":
                 noise1, noise2 = noises
                 Flux1_vec, Flux2_vec = calc_flux_CHR2(
                     c1, c2, mu1R, mu2R, self.get_trode_param("D"), Dfunc,
                     self.get_trode_param("E_D"), Flux1_bc, Flux2_bc, dr, T, noise1, noise2)
-            if self.get_trode_param("shape") == "sphere":
-                area_vec = 4*np.pi*edges**2
-            elif self.get_trode_param("shape") == "cylinder":
-                area_vec = 2*np.pi*edges  # per unit height
+            area_vec = disc["area_vec"]
             RHS1 = -np.diff(Flux1_vec * area_vec)
             RHS2 = -np.diff(Flux2_vec * area_vec)
 #            kinterlayer = 1e-3
@@ -255,8 +317,8 @@ class Mod2var(dae.daeModel):
         dc2dt_vec = np.empty(N, dtype=object)
         dc1dt_vec[0:N] = [self.c1.dt(k) for k in range(N)]
         dc2dt_vec[0:N] = [self.c2.dt(k) for k in range(N)]
-        LHS1_vec = MX(Mmat, dc1dt_vec)
-        LHS2_vec = MX(Mmat, dc2dt_vec)
+        LHS1_vec = MX_banded(disc["Mbands"], dc1dt_vec)
+        LHS2_vec = MX_banded(disc["Mbands"], dc2dt_vec)
         for k in range(N):
             eq1 = self.CreateEquation("dc1sdt_discr{k}".format(k=k))
             eq2 = self.CreateEquation("dc2sdt_discr{k}".format(k=k))
@@ -264,112 +326,60 @@ class Mod2var(dae.daeModel):
             eq2.Residual = LHS2_vec[k] - RHS2[k]
 
 
-class Mod1var(dae.daeModel):
-    def __init__(self, config, trode, vInd, pInd,
-                 Name, Parent=None, Description=""):
-        super().__init__(Name, Parent, Description)
-
-        self.config = config
-        self.trode = trode
-        self.ind = (vInd, pInd)
-
-        # Domain
-        self.Dmn = dae.daeDomain("discretizationDomain", self, dae.unit(),
-                                 "discretization domain")
-
-        # Variables
-        self.c = dae.daeVariable("c", mole_frac_t, self,
-                                 "Concentration in active particle",
-                                 [self.Dmn])
-        self.cbar = dae.daeVariable(
-            "cbar", mole_frac_t, self,
-            "Average concentration in active particle")
-        self.dcbardt = dae.daeVariable("dcbardt", dae.no_t, self, "Rate of particle filling")
-        if config[trode, "type"] not in ["ACR"]:
-            self.Rxn = dae.daeVariable("Rxn", dae.no_t, self, "Rate of reaction")
-        else:
-            self.Rxn = dae.daeVariable("Rxn", dae.no_t, self, "Rate of reaction", [self.Dmn])
-
-        # Get reaction rate function
-        rxnType = config[trode, "rxnType"]
-        self.calc_rxn_rate = utils.import_function(config[trode, "rxnType_filename"],
-                                                   rxnType,
-                                                   f"mpet.electrode.reactions.{rxnType}")
-
-        # Ports
-        self.portInLyte = ports.portFromElyte(
-            "portInLyte", dae.eInletPort, self,
-            "Inlet port from electrolyte")
-        self.portInBulk = ports.portFromBulk(
-            "portInBulk", dae.eInletPort, self,
-            "Inlet port from e- conducting phase")
-        self.phi_lyte = self.portInLyte.phi_lyte
-        self.c_lyte = self.portInLyte.c_lyte
-        self.phi_m = self.portInBulk.phi_m
-
-    def get_trode_param(self, item):
-        """
-        Shorthand to retrieve electrode-specific value
-        """
-        value = self.config[self.trode, item]
-        # check if it is a particle-specific parameter
-        if item in self.config.params_per_particle:
-            value = value[self.ind]
-        return value
-
-    def DeclareEquations(self):
-        dae.daeModel.DeclareEquations(self)
+class Particle1varEquations(ParticleEquations):
+    def declare_particle_equations(self):
         N = self.get_trode_param("N")  # number of grid points in particle
         T = self.config["T"]  # nondimensional temperature
-        r_vec, volfrac_vec = geo.get_unit_solid_discr(self.get_trode_param('shape'), N)
+        volfrac_vec = geo.get_solid_disc(self.get_trode_param('shape'), N,
+                                         *self.get_mesh_options())["volfrac_vec"]
+        # Chemical potential function of this particle
+        self.muRfunc = self.get_muRfunc()
 
         # Prepare noise
-        self.noise = None
+        noise = None
         if self.get_trode_param("noise"):
-            numnoise = self.get_trode_param("numnoise")
-            noise_prefac = self.get_trode_param("noise_prefac")
-            tvec = np.linspace(0., 1.05*self.config["tend"], numnoise)
-            noise_data = noise_prefac*np.random.randn(numnoise, N)
-            self.noise = sintrp.interp1d(tvec, noise_data, axis=0,
-                                         bounds_error=False, fill_value=0.)
+            noise = self.declare_noise("noise")
 
         # Figure out mu_O, mu of the oxidized state
         mu_O, act_lyte = calc_mu_O(self.c_lyte(), self.phi_lyte(), self.phi_m(), T,
                                    self.config["elyteModelType"])
 
+        if self.get_trode_param("type") == "diffn_poly":
+            # Equations for particles with a polynomial concentration profile
+            self.sld_dynamics_poly(np.array([self.c(0)], dtype=object), mu_O, act_lyte)
+            return
+
         # Define average filling fraction in particle
         eq = self.CreateEquation("cbar")
         eq.Residual = self.cbar()
         for k in range(N):
             eq.Residual -= self.c(k) * volfrac_vec[k]
 
-        # Define average rate of filling of particle
-        eq = self.CreateEquation("dcbardt")
-        eq.Residual = self.dcbardt()
-        for k in range(N):
-            eq.Residual -= self.c.dt(k) * volfrac_vec[k]
+        # Define average rate of filling of particle, unless it is eliminated
+        if not self.config["reduceModel"]:
+            eq = self.CreateEquation("dcbardt")
+            eq.Residual = self.dcbardt()
+            for k in range(N):
+                eq.Residual -= self.c.dt(k) * volfrac_vec[k]
 
         c = np.empty(N, dtype=object)
         c[:] = [self.c(k) for k in range(N)]
         if self.get_trode_param("type") in ["ACR", "diffn", "CHR"]:
             # Equations for 1D particles of 1 field varible
-            self.sld_dynamics_1D1var(c, mu_O, act_lyte, self.noise)
+            self.sld_dynamics_1D1var(c, mu_O, act_lyte, noise)
         elif self.get_trode_param("type") in ["homog", "homog_sdn"]:
             # Equations for 0D particles of 1 field variables
-            self.sld_dynamics_0D1var(c, mu_O, act_lyte, self.noise)
-
-        for eq in self.Equations:
-            eq.CheckUnitsConsistency = False
+            self.sld_dynamics_0D1var(c, mu_O, act_lyte, noise)
 
     def sld_dynamics_0D1var(self, c, muO, act_lyte, noise):
         T = self.config["T"]
         c_surf = c
-        muR_surf, actR_surf = calc_muR(c_surf, self.cbar(), self.config,
-                                       self.trode, self.ind)
+        muR_surf, actR_surf = calc_muR(c_surf, self.cbar(), self.muRfunc,
+                                       self.get_trode_param("muR_ref"))
         eta = calc_eta(muR_surf, muO)
         eta_eff = eta + self.Rxn()*self.get_trode_param("Rfilm")
         if self.get_trode_param("noise"):
-            eta_eff += noise[0]()
+            eta_eff += noise[0]
         Rxn = self.calc_rxn_rate(
             eta_eff, c_surf, self.c_lyte(), self.get_trode_param("k0"),
             self.get_trode_param("E_A"), T, actR_surf, act_lyte,
@@ -380,21 +390,62 @@ class Mod1var(dae.daeModel):
         eq = self.CreateEquation("dcsdt")
         eq.Residual = self.c.dt(0) - self.get_trode_param("delta_L")*self.Rxn()
 
+    def sld_dynamics_poly(self, c_surf, muO, act_lyte):
+        """Diffusion in a particle with a polynomial concentration profile (e.g. Subramanian et
+        al., J. Electrochem. Soc. 152, A2002, 2005). Instead of the profile, the average
+        concentration (cbar), the surface concentration (c) and, with three parameters, the
+        volume-averaged concentration gradient (q) are solved for.
+        """
+        T = self.config["T"]
+        alpha, beta, a, b = POLY_COEFFS[self.get_trode_param("shape"),
+                                        self.get_trode_param("polyParams")]
+        # The diffusivity is evaluated at the surface concentration
+        Dfunc = plugins.get_function("diffusion", self.get_trode_param("Dfunc"),
+                                     self.get_trode_param("Dfunc_filename"))
+        E_D = self.get_trode_param("E_D")
+        D = self.get_trode_param("D") * Dfunc(c_surf[0]) * np.exp(-E_D/T + E_D/1)
+
+        muR_surf, actR_surf = calc_muR(c_surf, self.cbar(), self.muRfunc,
+                                       self.get_trode_param("muR_ref"))
+        eta = calc_eta(muR_surf, muO)
+        eta_eff = eta + self.Rxn()*self.get_trode_param("Rfilm")
+        Rxn = self.calc_rxn_rate(
+            eta_eff, c_surf, self.c_lyte(), self.get_trode_param("k0"),
+            self.get_trode_param("E_A"), T, actR_surf, act_lyte,
+            self.get_trode_param("lambda"), self.get_trode_param("alpha"))
+        eq = self.CreateEquation("Rxn")
+        eq.Residual = self.Rxn() - Rxn[0]
+
+        # Mass conservation, with the reaction as flux into the particle
+        eq = self.CreateEquation("dcsdt")
+        eq.Residual = self.cbar.dt() - self.get_trode_param("delta_L")*self.Rxn()
+        if not self.config["reduceModel"]:
+            eq = self.CreateEquation("dcbardt")
+            eq.Residual = self.dcbardt() - self.cbar.dt()
+
+        # Surface concentration from the surface flux and the concentration gradient
+        eq = self.CreateEquation("csurf")
+        eq.Residual = alpha*D*(c_surf[0] - self.cbar()) - self.Rxn()
+        if self.get_trode_param("polyParams") == 3:
+            eq.Residual -= beta*D*self.q()
+            eq = self.CreateEquation("dqdt")
+            eq.Residual = self.q.dt() + a*D*self.q() - b*self.Rxn()
+
     def sld_dynamics_1D1var(self, c, muO, act_lyte, noise):
         N = self.get_trode_param("N")
         T = self.config["T"]
         # Equations for concentration evolution
         # Mass matrix, M, where M*dcdt = RHS, where c and RHS are vectors
-        Mmat = get_Mmat(self.get_trode_param('shape'), N)
-        dr, edges = geo.get_dr_edges(self.get_trode_param('shape'), N)
+        disc = geo.get_solid_disc(self.get_trode_param('shape'), N, *self.get_mesh_options())
+        dr = disc["dr"]
 
         # Get solid particle chemical potential, overpotential, reaction rate
         if self.get_trode_param("type") in ["ACR"]:
             c_surf = c
             muR_surf, actR_surf = calc_muR(
-                c_surf, self.cbar(), self.config, self.trode, self.ind)
+                c_surf, self.cbar(), self.muRfunc, self.get_trode_param("muR_ref"))
         elif self.get_trode_param("type") in ["diffn", "CHR"]:
-            muR, actR = calc_muR(c, self.cbar(), self.config, self.trode, self.ind)
+            muR, actR = calc_muR(c, self.cbar(), self.muRfunc, self.get_trode_param("muR_ref"))
             c_surf = c[-1]
             muR_surf = muR[-1]
             if actR is None:
@@ -426,53 +477,709 @@ class Mod1var(dae.daeModel):
             # Positive reaction (reduction, intercalation) is negative
             # flux of Li at the surface.
             Flux_bc = -self.Rxn()
-            Dfunc_name = self.get_trode_param("Dfunc")
-            Dfunc = utils.import_function(self.get_trode_param("Dfunc_filename"),
-                                          Dfunc_name,
-                                          f"mpet.electrode.diffusion.{Dfunc_name}")
+            Dfunc = plugins.get_function("diffusion", self.get_trode_param("Dfunc"),
+                                         self.get_trode_param("Dfunc_filename"))
             if self.get_trode_param("type") == "diffn":
                 Flux_vec = calc_flux_diffn(c, self.get_trode_param("D"), Dfunc,
                                            self.get_trode_param("E_D"), Flux_bc, dr, T, noise)
             elif self.get_trode_param("type") == "CHR":
                 Flux_vec = calc_flux_CHR(c, muR, self.get_trode_param("D"), Dfunc,
                                          self.get_trode_param("E_D"), Flux_bc, dr, T, noise)
-            if self.get_trode_param("shape") == "sphere":
-                area_vec = 4*np.pi*edges**2
-            elif self.get_trode_param("shape") == "cylinder":
-                area_vec = 2*np.pi*edges  # per unit height
+            area_vec = disc["area_vec"]
             RHS = -np.diff(Flux_vec * area_vec)
 
         dcdt_vec = np.empty(N, dtype=object)
         dcdt_vec[0:N] = [self.c.dt(k) for k in range(N)]
-        LHS_vec = MX(Mmat, dcdt_vec)
+        LHS_vec = MX_banded(disc["Mbands"], dcdt_vec)
         for k in range(N):
             eq = self.CreateEquation("dcsdt_discr{k}".format(k=k))
             eq.Residual = LHS_vec[k] - RHS[k]
 
 
-def calc_eta(muR, muO):
-    return muR - muO
+class Mod2var(dae.daeModel, Particle2varEquations):
+    def __init__(self, config, trode, vInd, pInd,
+                 Name, Parent=None, Description=""):
+        super().__init__(Name, Parent, Description)
+
+        self.config = config
+        self.trode = trode
+        self.ind = (vInd, pInd)
+
+        # Domain
+        self.Dmn = dae.daeDomain("discretizationDomain", self, dae.unit(),
+                                 "discretization domain")
+
+        # Parameters assigned at run time
+        self.params = get_runtime_parameters(self)
+
+        # Variables
+        self.c1 = dae.daeVariable(
+            "c1", mole_frac_t, self,
+            "Concentration in 'layer' 1 of active particle", [self.Dmn])
+        self.c2 = dae.daeVariable(
+            "c2", mole_frac_t, self,
+            "Concentration in 'layer' 2 of active particle", [self.Dmn])
+        self.cbar = dae.daeVariable(
+            "cbar", mole_frac_t, self,
+            "Average concentration in active particle")
+        self.c1bar = dae.daeVariable(
+            "c1bar", mole_frac_t, self,
+            "Average concentration in 'layer' 1 of active particle")
+        self.c2bar = dae.daeVariable(
+            "c2bar", mole_frac_t, self,
+            "Average concentration in 'layer' 2 of active particle")
+        if not config["reduceModel"]:
+            self.dcbardt = dae.daeVariable("dcbardt", dae.no_t, self, "Rate of particle filling")
+        if self.get_trode_param("type") not in ["ACR2"]:
+            self.Rxn1 = dae.daeVariable("Rxn1", dae.no_t, self, "Rate of reaction 1")
+            self.Rxn2 = dae.daeVariable("Rxn2", dae.no_t, self, "Rate of reaction 2")
+        else:
+            self.Rxn1 = dae.daeVariable("Rxn1", dae.no_t, self, "Rate of reaction 1", [self.Dmn])
+            self.Rxn2 = dae.daeVariable("Rxn2", dae.no_t, self, "Rate of reaction 2", [self.Dmn])
+        if config[trode, "noise"]:
+            self.noise1 = dae.daeVariable(
+                "noise1", dae.no_t, self, "Noise in 'layer' 1 of active particle", [self.Dmn])
+            self.noise2 = dae.daeVariable(
+                "noise2", dae.no_t, self, "Noise in 'layer' 2 of active particle", [self.Dmn])
+
+        # Get reaction rate function
+        self.calc_rxn_rate = plugins.get_function("reactions", config[trode, "rxnType"],
+                                                  config[trode, "rxnType_filename"])
+
+        # Ports, unless the variables of the cell are used directly
+        if config["reduceModel"]:
+            self.use_cell_variables(Parent)
+            self.dcbardt = EliminatedVariable(self, self.get_eliminated_outputs()["dcbardt"])
+        else:
+            self.portInLyte = ports.portFromElyte(
+                "portInLyte", dae.eInletPort, self, "Inlet port from electrolyte")
+            self.portInBulk = ports.portFromBulk(
+                "portInBulk", dae.eInletPort, self,
+                "Inlet port from e- conducting phase")
+            self.phi_lyte = self.portInLyte.phi_lyte
+            self.c_lyte = self.portInLyte.c_lyte
+            self.phi_m = self.portInBulk.phi_m
 
+    def DeclareEquations(self):
+        dae.daeModel.DeclareEquations(self)
+        self.declare_particle_equations()
 
-def get_Mmat(shape, N):
-    r_vec, volfrac_vec = geo.get_unit_solid_discr(shape, N)
-    if shape == "C3":
-        Mmat = sprs.eye(N, N, format="csr")
-    elif shape in ["sphere", "cylinder"]:
-        Rs = 1.
-        # For discretization background, see Zeng & Bazant 2013
-        # Mass matrix is common for each shape, diffn or CHR
-        if shape == "sphere":
-            Vp = 4./3. * np.pi * Rs**3
-        elif shape == "cylinder":
-            Vp = np.pi * Rs**2  # per unit height
-        vol_vec = Vp * volfrac_vec
-        M1 = sprs.diags([1./8, 3./4, 1./8], [-1, 0, 1],
-                        shape=(N, N), format="csr")
-        M1[1,0] = M1[-2,-1] = 1./4
-        M2 = sprs.diags(vol_vec, 0, format="csr")
-        Mmat = M1*M2
-    return Mmat
+        for eq in self.Equations:
+            eq.CheckUnitsConsistency = False
+
+
+class Mod1var(dae.daeModel, Particle1varEquations):
+    def __init__(self, config, trode, vInd, pInd,
+                 Name, Parent=None, Description=""):
+        super().__init__(Name, Parent, Description)
+
+        self.config = config
+        self.trode = trode
+        self.ind = (vInd, pInd)
+
+        # Domain
+        self.Dmn = dae.daeDomain("discretizationDomain", self, dae.unit(),
+                                 "discretization domain")
+
+        # Parameters assigned at run time
+        self.params = get_runtime_parameters(self)
+
+        # Variables
+        self.c = dae.daeVariable("c", mole_frac_t, self,
+                                 "Concentration in active particle",
+                                 [self.Dmn])
+        self.cbar = dae.daeVariable(
+            "cbar", mole_frac_t, self,
+            "Average concentration in active particle")
+        if not config["reduceModel"]:
+            self.dcbardt = dae.daeVariable("dcbardt", dae.no_t, self, "Rate of particle filling")
+        if config[trode, "type"] not in ["ACR"]:
+            self.Rxn = dae.daeVariable("Rxn", dae.no_t, self, "Rate of reaction")
+        else:
+            self.Rxn = dae.daeVariable("Rxn", dae.no_t, self, "Rate of reaction", [self.Dmn])
+        if config[trode, "type"] == "diffn_poly" and config[trode, "polyParams"] == 3:
+            self.q = dae.daeVariable(
+                "q", dae.no_t, self,
+                "Volume-averaged concentration gradient in active particle")
+        if config[trode, "noise"]:
+            self.noise = dae.daeVariable("noise", dae.no_t, self,
+                                         "Noise in active particle", [self.Dmn])
+
+        # Get reaction rate function
+        self.calc_rxn_rate = plugins.get_function("reactions", config[trode, "rxnType"],
+                                                  config[trode, "rxnType_filename"])
+
+        # Ports, unless the variables of the cell are used directly
+        if config["reduceModel"]:
+            self.use_cell_variables(Parent)
+            self.dcbardt = EliminatedVariable(self, self.get_eliminated_outputs()["dcbardt"])
+        else:
+            self.portInLyte = ports.portFromElyte(
+                "portInLyte", dae.eInletPort, self,
+                "Inlet port from electrolyte")
+            self.portInBulk = ports.portFromBulk(
+                "portInBulk", dae.eInletPort, self,
+                "Inlet port from e- conducting phase")
+            self.phi_lyte = self.portInLyte.phi_lyte
+            self.c_lyte = self.portInLyte.c_lyte
+            self.phi_m = self.portInBulk.phi_m
+
+    def DeclareEquations(self):
+        dae.daeModel.DeclareEquations(self)
+        self.declare_particle_equations()
+
+        for eq in self.Equations:
+            eq.CheckUnitsConsistency = False
+
+
+class ModParticleBank(dae.daeModel):
+    """All particles of an electrode with the same number of grid points, in a single model.
+
+    Instead of one model per particle, connected to the cell through ports, the particle
+    variables are distributed over an additional particle domain. The equations are those of
+    :class:`Mod1var` or :class:`Mod2var`, which refer to the electrolyte and solid potential
+    variables of the parent :class:`mpet.mod_cell.ModCell` directly. Each of them is declared
+    once for each :class:`BankGroup` of particles in the same electrolyte volume, distributed
+    over the particles of the group. The particle-specific parameters that differ between the
+    particles are parameters distributed over the particle domain.
+
+    The equations of a particle are traced once for the bank (see :class:`BankTrace`), and
+    replayed for each equation of each group. The equations are not distributed over the
+    electrolyte volumes as well, as the electrolyte variables of the volume of a particle cannot
+    be indexed with the index of the particle in the bank.
+
+    Particles with noise are declared one by one through a :class:`BankParticle` view instead,
+    as each has its own random noise.
+    """
+    def __init__(self, config, trode, N, inds, Name, Parent, Description=""):
+        super().__init__(Name, Parent, Description)
+
+        self.config = config
+        self.trode = trode
+        self.N = N
+        # (vInd, pInd) of each particle in the bank
+        self.inds = inds
+
+        # Domains
+        self.DmnBank = dae.daeDomain("particleDomain", self, dae.unit(),
+                                     "particles in the bank")
+        self.Dmn = dae.daeDomain("discretizationDomain", self, dae.unit(),
+                                 "discretization domain")
+        Dmns = [self.DmnBank]
+        Dmns_sld = [self.DmnBank, self.Dmn]
+
+        # Parameters assigned at run time
+        self.params = get_runtime_parameters(self, Dmns)
+
+        # Variables
+        solidType = config[trode, "type"]
+        if solidType in constants.two_var_types:
+            group_class = BankGroup2var
+            self.trace_class = BankTrace2var
+            self.c1 = dae.daeVariable(
+                "c1", mole_frac_t, self,
+                "Concentration in 'layer' 1 of active particle", Dmns_sld)
+            self.c2 = dae.daeVariable(
+                "c2", mole_frac_t, self,
+                "Concentration in 'layer' 2 of active particle", Dmns_sld)
+            self.cbar = dae.daeVariable(
+                "cbar", mole_frac_t, self,
+                "Average concentration in active particle", Dmns)
+            self.c1bar = dae.daeVariable(
+                "c1bar", mole_frac_t, self,
+                "Average concentration in 'layer' 1 of active particle", Dmns)
+            self.c2bar = dae.daeVariable(
+                "c2bar", mole_frac_t, self,
+                "Average concentration in 'layer' 2 of active particle", Dmns)
+            Dmns_rxn = Dmns_sld if solidType in ["ACR2"] else Dmns
+            self.Rxn1 = dae.daeVariable("Rxn1", dae.no_t, self, "Rate of reaction 1", Dmns_rxn)
+            self.Rxn2 = dae.daeVariable("Rxn2", dae.no_t, self, "Rate of reaction 2", Dmns_rxn)
+            self.particle_variables = ["c1", "c2", "cbar", "c1bar", "c2bar",
+                                       "dcbardt", "Rxn1", "Rxn2"]
+            if config[trode, "noise"]:
+                self.noise1 = dae.daeVariable(
+                    "noise1", dae.no_t, self, "Noise in 'layer' 1 of active particle", Dmns_sld)
+                self.noise2 = dae.daeVariable(
+                    "noise2", dae.no_t, self, "Noise in 'layer' 2 of active particle", Dmns_sld)
+                self.particle_variables += ["noise1", "noise2"]
+            particle_class = BankParticle2var
+        elif solidType in constants.one_var_types:
+            group_class = BankGroup1var
+            self.trace_class = BankTrace1var
+            self.c = dae.daeVariable("c", mole_frac_t, self,
+                                     "Concentration in active particle", Dmns_sld)
+            self.cbar = dae.daeVariable(
+                "cbar", mole_frac_t, self,
+                "Average concentration in active particle", Dmns)
+            Dmns_rxn = Dmns_sld if solidType in ["ACR"] else Dmns
+            self.Rxn = dae.daeVariable("Rxn", dae.no_t, self, "Rate of reaction", Dmns_rxn)
+            self.particle_variables = ["c", "cbar", "dcbardt", "Rxn"]
+            if solidType == "diffn_poly" and config[trode, "polyParams"] == 3:
+                self.q = dae.daeVariable(
+                    "q", dae.no_t, self,
+                    "Volume-averaged concentration gradient in active particle", Dmns)
+                self.particle_variables.append("q")
+            if config[trode, "noise"]:
+                self.noise = dae.daeVariable("noise", dae.no_t, self,
+                                             "Noise in active particle", Dmns_sld)
+                self.particle_variables.append("noise")
+            particle_class = BankParticle1var
+        else:
+            raise NotImplementedError("unknown solid type")
+        if config["reduceModel"]:
+            self.particle_variables.remove("dcbardt")
+        else:
+            self.dcbardt = dae.daeVariable("dcbardt", dae.no_t, self,
+                                           "Rate of particle filling", Dmns)
+
+        # Get reaction rate function
+        self.calc_rxn_rate = plugins.get_function("reactions", config[trode, "rxnType"],
+                                                  config[trode, "rxnType_filename"])
+
+        # Particle-specific parameters that differ between the particles, except for the
+        # runtime parameters, which are variables already
+        self.parameters = {}
+        for name in config.params_per_particle:
+            if name == "N" or name in self.params:
+                continue
+            if len(set(config[trode, name][ind] for ind in inds)) > 1:
+                self.parameters[name] = dae.daeParameter(
+                    name, dae.unit(), self, "Value of {name} of each particle".format(name=name),
+                    Dmns)
+
+        self.particles = [particle_class(self, bInd, vInd, pInd)
+                          for bInd, (vInd, pInd) in enumerate(inds)]
+        self.groups = [group_class(self, bInds) for bInds in self.get_groups()]
+        # Traced equations of the particles, see trace_equations
+        self.traces = {}
+
+    def get_groups(self):
+        """
+        Split the particles into groups of consecutive particles in the same electrolyte volume,
+        whose equations are declared once for the whole group. Within a group, the index of a
+        particle in the cell model differs from its index in the bank by a constant offset.
+        Particles with noise have their own random noise, so these are not grouped.
+
+        :return: list of the indices of the particles in the bank of each group
+        """
+        config = self.config
+        trode = self.trode
+        if config[trode, "noise"]:
+            return []
+        numeric = self.get_numeric_parameters()
+        groups = []
+        keys = []
+        for bInd, (vInd, pInd) in enumerate(self.inds):
+            key = (vInd, pInd - bInd) + tuple(config[trode, name][vInd, pInd]
+                                              for name in numeric)
+            if keys and keys[-1] == key:
+                groups[-1].append(bInd)
+            else:
+                keys.append(key)
+                groups.append([bInd])
+        return groups
+
+    def get_numeric_parameters(self):
+        """
+        Names of the particle-specific parameters whose values are needed as numbers, not as
+        parameters: those of tables of the chemical potential, which are made with the
+        parameters of the particles.
+        """
+        if self.config[self.trode, "muRfuncTable"]:
+            return self.config.params_per_particle
+        return []
+
+    def trace_equations(self, ind):
+        """
+        Traced equations of the particles, which are the same for all particles with the same
+        numeric parameters (see :meth:`get_numeric_parameters`), and are traced once for them.
+
+        :param tuple ind: (vInd, pInd) of a particle
+        :return: list of :class:`mpet.trace.TracedEquation`, or None if the equations cannot
+            be traced
+        """
+        numeric = self.get_numeric_parameters()
+        key = tuple(self.config[self.trode, name][ind] for name in numeric)
+        if key not in self.traces:
+            self.traces[key] = self.trace_class(self, ind, numeric).trace()
+        return self.traces[key]
+
+    def set_parameters(self):
+        """
+        Set the values of the particle-specific parameters distributed over the particle domain.
+        """
+        for name, param in self.parameters.items():
+            for bInd, ind in enumerate(self.inds):
+                param.SetValue(bInd, float(self.config[self.trode, name][ind]))
+
+    def DeclareEquations(self):
+        dae.daeModel.DeclareEquations(self)
+        if self.groups:
+            # All groups have the same equations, which are built again for each equation if
+            # they cannot be traced
+            names = None
+            for group in self.groups:
+                equations = self.trace_equations(group.ind)
+                if equations is not None:
+                    group.declare_traced_equations(equations)
+                else:
+                    names = group.declare_particle_equations(names)
+        else:
+            for particle in self.particles:
+                particle.declare_particle_equations()
+
+        for eq in self.Equations:
+            eq.CheckUnitsConsistency = False
+
+
+class VariableView:
+    """A variable restricted to fixed leading indices.
+
+    Calling the view (or its ``dt`` method) with the remaining indices gives the same result as
+    calling the underlying variable with all indices. This lets a single particle of a
+    :class:`ModParticleBank` be used wherever a stand-alone particle model is expected.
+    """
+    def __init__(self, var, *ind):
+        self.var = var
+        self.ind = ind
+
+    def __call__(self, *ind):
+        return self.var(*self.ind, *ind)
+
+    def dt(self, *ind):
+        return self.var.dt(*self.ind, *ind)
+
+    def SetInitialGuess(self, *args):
+        self.var.SetInitialGuess(*self.ind, *args)
+
+    def SetInitialCondition(self, *args):
+        self.var.SetInitialCondition(*self.ind, *args)
+
+    def AssignValue(self, *args):
+        self.var.AssignValue(*self.ind, *args)
+
+    def ReAssignValue(self, *args):
+        self.var.ReAssignValue(*self.ind, *args)
+
+
+class EliminatedVariable:
+    """An algebraic variable of a particle which is substituted by a weighted sum of other
+    variables of the particle, e.g. the rate of filling in a reduced model.
+
+    It is only used outside of the equations of the particle, with the variables of a single
+    particle, so it can be used like the variable it replaces.
+
+    :param particle: The particle
+    :param dict definition: Weights of the variables of the particle, {variable: weights},
+        an array of weights for variables on the discretization domain
+    """
+    def __init__(self, particle, definition):
+        self.particle = particle
+        self.definition = definition
+
+    def __call__(self):
+        value = 0
+        for name, weights in self.definition.items():
+            var = getattr(self.particle, name)
+            if np.ndim(weights):
+                value += np.sum([weights[k] * var(k) for k in range(len(weights))])
+            else:
+                value += weights * var()
+        return value
+
+
+class BankParticle:
+    """A single particle within a :class:`ModParticleBank`.
+
+    It exposes the same variables as a stand-alone particle model. The electrolyte and solid
+    potential are those of the cell volume and particle in the parent cell model, so there are
+    no ports to connect.
+    """
+    def __init__(self, bank, bInd, vInd, pInd):
+        self.bank = bank
+        self.config = bank.config
+        self.trode = trode = bank.trode
+        self.ind = (vInd, pInd)
+        self.Name = "partTrode{trode}vol{vInd}part{pInd}".format(
+            trode=trode, vInd=vInd, pInd=pInd)
+        self.Ports = []
+        self.params = {name: VariableView(var, bInd) for name, var in bank.params.items()}
+        self.calc_rxn_rate = bank.calc_rxn_rate
+        for name in bank.particle_variables:
+            setattr(self, name, VariableView(getattr(bank, name), bInd))
+        self.use_cell_variables(bank.Parent)
+        if self.config["reduceModel"]:
+            self.dcbardt = EliminatedVariable(self, self.get_eliminated_outputs()["dcbardt"])
+
+    def CreateEquation(self, Name, Description=""):
+        return self.bank.CreateEquation(f"{self.Name}_{Name}", Description)
+
+    def IF(self, *args):
+        self.bank.IF(*args)
+
+    def ELSE_IF(self, *args):
+        self.bank.ELSE_IF(*args)
+
+    def ELSE(self):
+        self.bank.ELSE()
+
+    def END_IF(self):
+        self.bank.END_IF()
+
+
+class BankParticle1var(BankParticle, Particle1varEquations):
+    pass
+
+
+class BankParticle2var(BankParticle, Particle2varEquations):
+    pass
+
+
+class GroupVariable:
+    """A variable of the particles in a :class:`BankGroup`.
+
+    Calling the variable (or its ``dt`` method) with the remaining indices gives the variable of
+    the particle the equation being declared is distributed over, i.e. it is indexed with the
+    distributed equation domain info of that equation.
+    """
+    def __init__(self, group, var, *ind, offset=0):
+        self.group = group
+        self.var = var
+        self.ind = ind
+        self.offset = offset
+
+    def __call__(self, *ind):
+        return self.var(*self.ind, self.group.get_index(self.offset), *ind)
+
+    def dt(self, *ind):
+        return self.var.dt(*self.ind, self.group.get_index(self.offset), *ind)
+
+
+class UnusedEquation:
+    """An equation of a :class:`BankGroup` which is not being declared."""
+    def __init__(self):
+        self.Residual = 0
+
+
+class EquationDeclared(Exception):
+    """Raised once the equation of a :class:`BankGroup` being declared is complete."""
+
+
+class BankGroup:
+    """Consecutive particles of a :class:`ModParticleBank` in the same electrolyte volume.
+
+    Each equation of the particles is declared once, distributed over the particles of the
+    group. The equations are declared as those of a single particle, whose variables and
+    particle-specific parameters are indexed with the distributed equation domain info (DEDI)
+    of the equation. A DEDI can only be used in the equation it belongs to, so the traced
+    equations of the bank are replayed with the DEDI of each equation. If the equations cannot
+    be traced, they are built again for each equation instead, up to the equation being
+    declared, of which the residual is kept. This makes the cost of declaring the equations
+    independent of the number of particles.
+    """
+    def __init__(self, bank, bInds):
+        self.bank = bank
+        self.config = bank.config
+        self.trode = trode = bank.trode
+        self.bInds = bInds
+        # The values in the config that are the same for all particles are those of the first
+        self.ind = vInd, pInd = bank.inds[bInds[0]]
+        pEnd = bank.inds[bInds[-1]][1]
+        self.Name = "partTrode{trode}vol{vInd}part{pInd}to{pEnd}".format(
+            trode=trode, vInd=vInd, pInd=pInd, pEnd=pEnd)
+        self.params = {name: GroupVariable(self, var) for name, var in bank.params.items()}
+        self.calc_rxn_rate = bank.calc_rxn_rate
+        for name in bank.particle_variables:
+            setattr(self, name, GroupVariable(self, getattr(bank, name)))
+        # Parameters that differ between the particles of the group
+        self.parameters = {
+            name: param for name, param in bank.parameters.items()
+            if len(set(self.config[trode, name][bank.inds[bInd]] for bInd in bInds)) > 1}
+        # Variables of the cell, where the particle index differs from that in the bank
+        cell = bank.Parent
+        self.c_lyte = VariableView(cell.c_lyte[trode], vInd)
+        self.phi_lyte = VariableView(cell.phi_lyte[trode], vInd)
+        self.phi_m = GroupVariable(self, cell.phi_part[trode], vInd, offset=pInd - bInds[0])
+        self.dedi = None
+        self.muRfunc_group = None
+
+    def get_index(self, offset=0):
+        """Index of the particles in the equation being declared"""
+        if offset < 0:
+            # The offset of a DEDI is unsigned
+            return self.dedi - (-offset)
+        return self.dedi + offset if offset else self.dedi
+
+    def get_trode_param(self, item):
+        if item in self.parameters:
+            return self.parameters[item](self.get_index())
+        return super().get_trode_param(item)
+
+    def get_muRfunc(self):
+        # The parameters are looked up when the function is evaluated, so the same function is
+        # used in all equations
+        if self.muRfunc_group is None:
+            self.muRfunc_group = super().get_muRfunc()
+        return self.muRfunc_group
+
+    def declare_traced_equations(self, equations):
+        """
+        Declare the equations of the particles in the group from the traced equations of the
+        bank.
+
+        :param list equations: Traced equations (:class:`mpet.trace.TracedEquation`)
+        """
+        for traced in equations:
+            eq = self.bank.CreateEquation("{group}_{name}".format(group=self.Name,
+                                                                  name=traced.Name),
+                                          traced.Description)
+            self.dedi = eq.DistributeOnDomain(self.bank.DmnBank, self.bInds)
+            eq.Residual = trace.replay(traced.Residual, self)
+
+    def declare_particle_equations(self, names=None):
+        """
+        Declare the equations of the particles in the group, building them again for each
+        equation.
+
+        :param list names: (name, description) of each equation, as declared for a single
+            particle, if known from another group
+        :return: the names of the equations
+        """
+        if names is None:
+            # Find the equations from those of the first particle
+            self.dedi = self.bInds[0]
+            names = self.build_equations()
+        for target, (name, description) in enumerate(names):
+            eq = self.bank.CreateEquation("{group}_{name}".format(group=self.Name, name=name),
+                                          description)
+            self.dedi = eq.DistributeOnDomain(self.bank.DmnBank, self.bInds)
+            self.build_equations(target, eq)
+        return names
+
+    def build_equations(self, target=None, equation=None):
+        """
+        Build the equations of a single particle, up to the equation being declared.
+
+        :param int target: Number of the equation being declared, or None to build all
+            equations without declaring any
+        :param equation: Equation being declared
+        :return: (name, description) of each equation that is built
+        """
+        self.target = target
+        self.equation = equation
+        self.names = []
+        try:
+            super().declare_particle_equations()
+        except EquationDeclared:
+            pass
+        return self.names
+
+    def CreateEquation(self, Name, Description=""):
+        self.names.append((Name, Description))
+        if self.target is None:
+            return UnusedEquation()
+        number = len(self.names) - 1
+        if number > self.target:
+            raise EquationDeclared()
+        return self.equation if number == self.target else UnusedEquation()
+
+
+class BankGroup1var(BankGroup, Particle1varEquations):
+    pass
+
+
+class BankGroup2var(BankGroup, Particle2varEquations):
+    pass
+
+
+class BankTrace:
+    """The equations of a particle of a :class:`ModParticleBank`, traced for all groups.
+
+    The variables and the particle-specific parameters that differ between the particles of
+    the bank are leaves of the traced expressions, which are resolved for the group and
+    equation being declared (see :meth:`BankGroup.declare_traced_equations`). The other values
+    in the config are the same for all particles.
+
+    :param ModParticleBank bank: The particle bank
+    :param tuple ind: (vInd, pInd) of a particle the equations are traced for
+    :param list numeric: Names of the parameters used as the numbers of that particle
+    """
+    def __init__(self, bank, ind, numeric=()):
+        self.bank = bank
+        self.config = bank.config
+        self.trode = bank.trode
+        self.ind = ind
+        self.Name = bank.Name
+        self.numeric = numeric
+        self.params = {name: trace.TracedVariable(lambda group, name=name: group.params[name])
+                       for name in bank.params}
+        self.calc_rxn_rate = bank.calc_rxn_rate
+        for name in bank.particle_variables + ["c_lyte", "phi_lyte", "phi_m"]:
+            setattr(self, name, trace.TracedVariable(
+                lambda group, name=name: getattr(group, name)))
+        self.equations = []
+
+    def get_trode_param(self, item):
+        if item in self.bank.parameters and item not in self.numeric:
+            return trace.Traced(
+                lambda group: group.bank.parameters[item](group.get_index()), leaf=True)
+        return super().get_trode_param(item)
+
+    def trace(self):
+        """
+        Trace the equations of the particle.
+
+        :return: list of :class:`mpet.trace.TracedEquation`, or None if the equations cannot
+            be traced, e.g. if a function needs the values of the variables
+        """
+        self.equations = []
+        with trace.deferred_functions():
+            try:
+                self.declare_particle_equations()
+            except TypeError:
+                return None
+        return self.equations
+
+    def CreateEquation(self, Name, Description=""):
+        eq = trace.TracedEquation(Name, Description)
+        self.equations.append(eq)
+        return eq
+
+
+class BankTrace1var(BankTrace, Particle1varEquations):
+    pass
+
+
+class BankTrace2var(BankTrace, Particle2varEquations):
+    pass
+
+
+def get_runtime_parameters(model, domains=[]):
+    """
+    Variables for the particle parameters that are assigned at run time, if
+    ``runtimeParameters`` is set, distributed over the given domains.
+
+    :return: dict of {parameter name: variable}
+    """
+    if not model.config["runtimeParameters"]:
+        return {}
+    return {name: dae.daeVariable(name, dae.no_t, model,
+                                  "Runtime value of {name}".format(name=name), domains)
+            for name in constants.RUNTIME_PARAMS_PARTICLE}
+
+
+#: Coefficients (alpha, beta, a, b) of the polynomial profile approximation of diffusion in a
+#: particle, per shape and number of parameters. In nondimensional form, the surface
+#: concentration follows from alpha*D*(c_surf - cbar) - beta*D*q = Rxn, and the volume-averaged
+#: concentration gradient from dq/dt = -a*D*q + b*Rxn.
+POLY_COEFFS = {("sphere", 2): (5., 0., 0., 0.),
+               ("sphere", 3): (35., 8., 30., 22.5),
+               ("cylinder", 2): (4., 0., 0., 0.),
+               ("cylinder", 3): (24., 7.5, 20., 40./3)}
+
+
+def calc_eta(muR, muO):
+    return muR - muO
 
 
 def calc_flux_diffn(c, D, Dfunc, E_D, Flux_bc, dr, T, noise):
@@ -485,7 +1192,7 @@ def calc_flux_diffn(c, D, Dfunc, E_D, Flux_bc, dr, T, noise):
         Flux_vec[1:N] = -D * Dfunc(c_edges) * np.exp(-E_D/T + E_D/1) * np.diff(c)/dr
     else:
         Flux_vec[1:N] = -D * Dfunc(c_edges) * np.exp(-E_D/T + E_D/1) * \
-            np.diff(c + noise(dae.Time().Value))/dr
+            np.diff(c + noise)/dr
     return Flux_vec
 
 
@@ -499,7 +1206,7 @@ def calc_flux_CHR(c, mu, D, Dfunc, E_D, Flux_bc, dr, T, noise):
         Flux_vec[1:N] = -D/T * Dfunc(c_edges) * np.exp(-E_D/T + E_D/1) * np.diff(mu)/dr
     else:
         Flux_vec[1:N] = -D/T * Dfunc(c_edges) * np.exp(-E_D/T + E_D/1) * \
-            np.diff(mu + noise(dae.Time().Value))/dr
+            np.diff(mu + noise)/dr
     return Flux_vec
 
 
@@ -518,9 +1225,9 @@ def calc_flux_CHR2(c1, c2, mu1_R, mu2_R, D, Dfunc, E_D, Flux1_bc, Flux2_bc, dr,
         Flux2_vec[1:N] = -D/T * Dfunc(c2_edges) * np.exp(-E_D/T + E_D/1) * np.diff(mu2_R)/dr
     else:
         Flux1_vec[1:N] = -D/T * Dfunc(c1_edges) * np.exp(-E_D/T + E_D/1) * \
-            np.diff(mu1_R+noise1(dae.Time().Value))/dr
+            np.diff(mu1_R+noise1)/dr
         Flux2_vec[1:N] = -D/T * Dfunc(c2_edges) * np.exp(-E_D/T + E_D/1) * \
-            np.diff(mu2_R+noise2(dae.Time().Value))/dr
+            np.diff(mu2_R+noise2)/dr
     return Flux1_vec, Flux2_vec
 
 
@@ -535,9 +1242,7 @@ def calc_mu_O(c_lyte, phi_lyte, phi_sld, T, elyteModelType):
     return mu_O, act_lyte
 
 
-def calc_muR(c, cbar, config, trode, ind):
-    muRfunc = props_am.muRfuncs(config, trode, ind).muRfunc
-    muR_ref = config[trode, "muR_ref"]
+def calc_muR(c, cbar, muRfunc, muR_ref):
     muR, actR = muRfunc(c, cbar, muR_ref)
     return muR, actR
 
@@ -546,7 +1251,7 @@ def MX(mat, objvec):
     if not isinstance(mat, sprs.csr.csr_matrix):
         raise Exception("MX function designed for csr mult")
     n = objvec.shape[0]
-    if isinstance(objvec[0], dae.pyCore.adouble):
+    if objvec.dtype == object:
         out = np.empty(n, dtype=object)
     else:
         out = np.zeros(n, dtype=float)
@@ -560,3 +1265,18 @@ def MX(mat, objvec):
         else:
             out[i] = 0.0
     return out
+
+
+def MX_banded(bands, objvec):
+    """
+    Multiply a tridiagonal matrix, given by its lower, main and upper diagonals, with a vector
+    (e.g. of daetools expressions). The terms of each row are added in the same order as in
+    :func:`MX`, and off-diagonals that are zero are skipped.
+    """
+    lower, diag, upper = bands
+    out = diag * objvec
+    if np.any(lower):
+        out[1:] = lower * objvec[:-1] + out[1:]
+    if np.any(upper):
+        out[:-1] = out[:-1] + upper * objvec[1:]
+    return out
@@ -10,6 +10,7 @@ import mpet.geometry as geom
 import mpet.mod_cell as mod_cell
 import mpet.utils as utils
 from mpet.config import Config, constants
+from mpet.exceptions import UnknownParameterError
 
 """Set list of matplotlib rc parameters to make more readable plots."""
 # axtickfsize = 18
@@ -43,6 +44,13 @@ def show_data(indir, plot_type, print_flag, save_flag, data_only, vOut=None, pOu
         sStr = "."
     # Read in the parameters used to define the simulation
     config = Config.from_dicts(indir)
+    try:
+        if not config["expandMergedOutput"]:
+            # Only the output of the simulated particles is written
+            data = utils.MergedParticleData(data, config["partRep"])
+    except UnknownParameterError:
+        # Output of a simulation without merged particles
+        pass
     # simulated (porous) electrodes
     trodes = config["trodes"]
     # Pick out some useful calculated values
@@ -65,30 +73,17 @@ def show_data(indir, plot_type, print_flag, save_flag, data_only, vOut=None, pOu
     # Discretization (and associated porosity)
     Lfac = 1e6
     Lunit = r"$\mu$m"
-    dxc = config["L"]["c"]/Nvol["c"]
-    dxvec = np.array(Nvol["c"] * [dxc])
-    porosvec = np.array(Nvol["c"] * [config["poros"]["c"]])
-    cellsvec = dxc*np.arange(Nvol["c"]) + dxc/2.
-    if config["have_separator"]:
-        dxs = config["L"]["s"]/Nvol["s"]
-        dxvec_s = np.array(Nvol["s"] * [dxs])
-        dxvec = np.hstack((dxvec_s, dxvec))
-        poros_s = np.array(Nvol["s"] * [config["poros"]["s"]])
-        porosvec = np.hstack((poros_s, porosvec))
-        cellsvec += config["L"]["s"] / config["L"]["c"]
-        cellsvec_s = dxs*np.arange(Nvol["s"]) + dxs/2.
-        cellsvec = np.hstack((cellsvec_s, cellsvec))
-    if "a" in trodes:
-        dxa = config["L"]["a"]/Nvol["a"]
-        dxvec_a = np.array(Nvol["a"] * [dxa])
-        dxvec = np.hstack((dxvec_a, dxvec))
-        poros_a = np.array(Nvol["a"] * [config["poros"]["a"]])
-        porosvec = np.hstack((poros_a, porosvec))
-        cellsvec += config["L"]["a"] / config["L"]["c"]
-        cellsvec_a = dxa*np.arange(Nvol["a"]) + dxa/2.
-        cellsvec = np.hstack((cellsvec_a, cellsvec))
-    cellsvec *= config["L_ref"] * Lfac
+    try:
+        elyteMesh = (config["elyteMesh"], config["elyteMeshRatio"])
+    except UnknownParameterError:
+        # Output of a simulation without the electrolyte mesh options
+        elyteMesh = ("uniform", None)
+    disc = geom.get_elyte_disc(Nvol, config["L"], config["poros"], config["BruggExp"],
+                               *elyteMesh)
+    dxvec = disc["dxvec"]
+    porosvec = disc["porosvec"]
     facesvec = np.insert(np.cumsum(dxvec), 0, 0.) * config["L_ref"] * Lfac
+    cellsvec = utils.mean_linear(facesvec)
     # Extract the reported simulation times
     times = utils.get_dict_key(data, pfx + 'phi_applied_times')
     numtimes = len(times)
@@ -358,8 +353,6 @@ def show_data(indir, plot_type, print_flag, save_flag, data_only, vOut=None, pOu
             pGP_L = utils.get_dict_key(data, "phi_lyteGP_L")
             cmat = np.hstack((cGP_L.reshape((-1,1)), datay_c, datay_c[:,-1].reshape((-1,1))))
             pmat = np.hstack((pGP_L.reshape((-1,1)), datay_p, datay_p[:,-1].reshape((-1,1))))
-            disc = geom.get_elyte_disc(
-                Nvol, config["L"], config["poros"], config["BruggExp"])
             i_edges = np.zeros((numtimes, len(facesvec)))
             for tInd in range(numtimes):
                 i_edges[tInd, :] = mod_cell.get_lyte_internal_fluxes(
@@ -497,6 +490,16 @@ def show_data(indir, plot_type, print_flag, save_flag, data_only, vOut=None, pOu
         else:
             plt_cavg = False
         plt_axlabels = True
+
+        try:
+            mesh = (config[trode, "radialMesh"], config[trode, "radialMeshRatio"])
+        except UnknownParameterError:
+            # Output of a simulation without the radial mesh options
+            mesh = ("uniform", 1.)
+
+        def get_radial_mesh(numy):
+            """Positions of the grid points of a particle, relative to its length"""
+            return geom.get_radial_mesh(numy, *mesh)
         if config[trode, "type"] in constants.one_var_types:
             type2c = False
         elif config[trode, "type"] in constants.two_var_types:
@@ -540,7 +543,7 @@ def show_data(indir, plot_type, print_flag, save_flag, data_only, vOut=None, pOu
                 cbarstr = cbarstr_base.format(trode=trode, pInd=pOut, vInd=vOut)
                 datay = utils.get_dict_key(data, cstr)[tOut]
                 numy = len(datay)
-            datax = np.linspace(0, lenval * Lfac, numy)
+            datax = lenval * Lfac * get_radial_mesh(numy)
             plt.close(fig)
             return datax, datay
         ylim = (0, 1.01)
@@ -558,7 +561,7 @@ def show_data(indir, plot_type, print_flag, save_flag, data_only, vOut=None, pOu
                     lbl1, lbl2 = r"$\widetilde{c}_1$", r"$\widetilde{c}_2$"
                     lbl3 = r"$\overline{c}$"
                     numy = len(datay1) if isinstance(datay1, np.ndarray) else 1
-                    datax = np.linspace(0, lens[pInd,vInd] * Lfac, numy)
+                    datax = lens[pInd,vInd] * Lfac * get_radial_mesh(numy)
                     line1, = ax[pInd,vInd].plot(datax, datay1, label=lbl1)
                     line2, = ax[pInd,vInd].plot(datax, datay2, label=lbl2)
                     if plt_cavg:
@@ -571,7 +574,7 @@ def show_data(indir, plot_type, print_flag, save_flag, data_only, vOut=None, pOu
                     cbarstr[pInd,vInd] = cbarstr_base.format(trode=trode, pInd=pInd, vInd=vInd)
                     datay = utils.get_dict_key(data, cstr[pInd,vInd])[t0ind]
                     numy = len(datay)
-                    datax = np.linspace(0, lens[pInd,vInd] * Lfac, numy)
+                    datax = lens[pInd,vInd] * Lfac * get_radial_mesh(numy)
                     line, = ax[pInd,vInd].plot(datax, datay)
                     lines[pInd,vInd] = line
                 ax[pInd,vInd].set_ylim(ylim)
@@ -0,0 +1,138 @@
+"""Registry of the material, reaction, diffusion and electrolyte functions of a simulation.
+
+A function of a given kind is looked up by name, in order, from
+ - a .py file, if one is given in the configuration (e.g. ``rxnType_filename``)
+ - functions registered with :func:`register_function`
+ - the MPET module of that name, e.g. ``mpet.electrode.reactions.BV``
+ - installed packages, through the ``mpet.<kind>`` entry point group, e.g. ``mpet.reactions``
+
+Resolved functions are cached, so a function is only imported once, however many particles use
+it. The registry can be used from multiple threads.
+"""
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+
+#: MPET package holding the functions of each kind, with one module per function
+PACKAGES = {"materials": "mpet.electrode.materials",
+            "reactions": "mpet.electrode.reactions",
+            "diffusion": "mpet.electrode.diffusion",
+            "electrolyte": "mpet.electrolyte"}
+
+_lock = threading.RLock()
+_registered = {}
+_cache = {}
+
+
+def get_function(kind, name, filename=None):
+    """Get a material, reaction, diffusion or electrolyte function.
+
+    :param str kind: Kind of function, one of the keys of :data:`PACKAGES`
+    :param str name: Name of the function
+    :param str filename: .py file containing the function (optional)
+
+    :return: A callable function
+    """
+    if kind not in PACKAGES:
+        raise ValueError(f"Unknown kind of function: {kind}, options are: {list(PACKAGES)}")
+    if filename is None:
+        key = (kind, name, None, None)
+    else:
+        filename = os.path.abspath(filename)
+        # A modified file is loaded again
+        key = (kind, name, filename, os.path.getmtime(filename))
+    with _lock:
+        if key not in _cache:
+            _cache[key] = _resolve(kind, name, filename)
+        return _cache[key]
+
+
+def register_function(kind, name, function):
+    """Register a function under a name, to be used like the MPET functions of the same kind.
+
+    :param str kind: Kind of function, one of the keys of :data:`PACKAGES`
+    :param str name: Name of the function as used in the configuration
+    :param function: The callable function
+    """
+    if kind not in PACKAGES:
+        raise ValueError(f"Unknown kind of function: {kind}, options are: {list(PACKAGES)}")
+    with _lock:
+        _registered[(kind, name)] = function
+        # Functions resolved before may have been overridden
+        clear_cache()
+
+
+def clear_cache():
+    """Forget all resolved functions, so they are looked up again on their next use."""
+    with _lock:
+        _cache.clear()
+
+
+def load_function_from_file(filename, function):
+    """Load a function from a .py file that is not part of MPET.
+
+    The file is loaded as a separate module. While it is loaded, its folder is at the front of
+    the Python search path, so it can import other modules from the same folder. Files are
+    loaded one at a time, so this is safe to use from multiple threads.
+
+    :param str filename: .py file containing the function
+    :param str function: Name of the function to load
+
+    :return: A callable function
+    """
+    filename = os.path.abspath(filename)
+    folder = os.path.dirname(filename)
+    module_name = os.path.splitext(os.path.basename(filename))[0]
+    spec = importlib.util.spec_from_file_location(module_name, filename)
+    if spec is None:
+        raise ImportError(f"Cannot load {filename} as a Python module")
+    module = importlib.util.module_from_spec(spec)
+    with _lock:
+        sys.path.insert(0, folder)
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            sys.path.remove(folder)
+    return getattr(module, function)
+
+
+def _resolve(kind, name, filename):
+    """Look up a function in the locations listed in the module docstring."""
+    if filename is not None:
+        return load_function_from_file(filename, name)
+    if (kind, name) in _registered:
+        return _registered[(kind, name)]
+    module_name = f"{PACKAGES[kind]}.{name}"
+    try:
+        module = importlib.import_module(module_name)
+    except ModuleNotFoundError as e:
+        # Only fall back to entry points if the MPET module itself does not exist
+        if e.name != module_name:
+            raise
+    else:
+        return getattr(module, name)
+    function = _load_entry_point(kind, name)
+    if function is None:
+        raise ValueError(f"Unknown {kind} function: {name}. It is not part of MPET, and not "
+                         f"provided by an installed package in entry point group mpet.{kind}")
+    return function
+
+
+def _load_entry_point(kind, name):
+    """Load a function from the entry points of installed packages, or None if not found."""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        # importlib.metadata requires Python 3.8
+        return None
+    group = f"mpet.{kind}"
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        matches = eps.select(group=group, name=name)
+    else:
+        matches = [ep for ep in eps.get(group, []) if ep.name == name]
+    for ep in matches:
+        return ep.load()
+    return None
@@ -7,7 +7,7 @@ import numpy as np
 
 import mpet.geometry as geo
 from mpet.config import constants
-from mpet.utils import import_function
+from mpet.plugins import get_function
 
 
 class muRfuncs():
@@ -23,30 +23,28 @@ class muRfuncs():
         muR -- chemical potential
         actR -- activity (if applicable, else None)
     """
-    def __init__(self, config, trode, ind=None):
+    def __init__(self, config, trode, ind=None, particle=None):
         """config is the full dictionary of
         parameters for the electrode particles, as made for the
         simulations. trode is the selected electrode.
         ind is optinally the selected particle, provided as (vInd, pInd)
+        particle is optionally the particle model, whose parameters are
+        used instead of those in the config (e.g. parameters distributed
+        over the particles of a bank)
         """
         self.config = config
         self.trode = trode
         self.ind = ind
+        self.particle = particle
         self.T = config['T']  # nondimensional
         # eokT and kToe are the reference values for scalings
         self.eokT = constants.e / (constants.k * constants.T_ref)
         self.kToe = 1. / self.eokT
 
         # If the user provided a filename with muRfuncs, try to load
-        # the function from there, otherwise load it from this class
-        filename = self.get_trode_param("muRfunc_filename")
-        muRfunc_name = self.get_trode_param("muRfunc")
-        if filename is None:
-            # the function will be loaded from the materials folder
-            muRfunc = import_function(None, muRfunc_name,
-                                      mpet_module=f"mpet.electrode.materials.{muRfunc_name}")
-        else:
-            muRfunc = import_function(filename, muRfunc_name)
+        # the function from there, otherwise load it from the materials folder
+        muRfunc = get_function("materials", self.get_trode_param("muRfunc"),
+                               self.get_trode_param("muRfunc_filename"))
 
         # We have to make sure the function knows what 'self' is with
         # the types.MethodType function
@@ -56,6 +54,8 @@ class muRfuncs():
         """
         Shorthand to retrieve electrode-specific value
         """
+        if self.particle is not None:
+            return self.particle.get_trode_param(item)
         value = self.config[self.trode, item]
         # check if it is a particle-specific parameter
         if self.ind is not None and item in self.config.params_per_particle:
@@ -156,7 +156,10 @@ class muRfuncs():
 
     def non_homog_round_wetting(self, y, ybar, B, kappa, beta_s, shape, r_vec):
         """ Helper function """
-        dr = r_vec[1] - r_vec[0]
+        if self.get_trode_param("radialMesh") == "uniform":
+            dr = r_vec[1] - r_vec[0]
+        else:
+            dr = np.diff(r_vec)
         Rs = 1.
         curv = geo.calc_curv(y, dr, r_vec, Rs, beta_s, shape)
         muR_nh = B*(y - ybar) - kappa*curv
@@ -188,7 +191,8 @@ class muRfuncs():
                     raise NotImplementedError("no 2param C3 model known")
             elif shape in ["cylinder", "sphere"]:
                 beta_s = self.get_trode_param("beta_s")
-                r_vec = geo.get_unit_solid_discr(shape, N)[0]
+                r_vec = geo.get_solid_disc(shape, N, self.get_trode_param("radialMesh"),
+                                           self.get_trode_param("radialMeshRatio"))["r_vec"]
                 if mod1var:
                     muR_nh = self.non_homog_round_wetting(
                         y, ybar, B, kappa, beta_s, shape, r_vec)
@@ -18,10 +18,21 @@ from mpet.config import constants
 
 
 class SimMPET(dae.daeSimulation):
-    def __init__(self, config, tScale=None):
+    def __init__(self, config, tScale=None, progress=None):
+        """
+        :param config: Processed :class:`mpet.config.Config`
+        :param float tScale: Time scale of the simulation (s)
+        :param progress: Function called with the simulation time and the time horizon (s)
+            after each reporting interval. If given, the progress is not written to stdout.
+        """
         dae.daeSimulation.__init__(self)
         self.config = config
         self.tScale = tScale
+        self.progress = progress
+        # Description of the end condition that stopped the simulation, if any
+        self.endCondition = None
+        # Message of an error that stopped the simulation, if any
+        self.error = None
         config["currPrev"] = 0.
         config["phiPrev"] = 0.
         if config["prevDir"] and config["prevDir"] != "false":
@@ -40,8 +51,17 @@ class SimMPET(dae.daeSimulation):
         mpet.daeVariableTypes.conc_t.AbsoluteTolerance = config["absTol"]
         mpet.daeVariableTypes.elec_pot_t.AbsoluteTolerance = config["absTol"]
 
+        # Wall clock time spent in each phase of the simulation
+        self.timer = utils.PhaseTimer()
+        # DAE solver statistics of each reporting interval
+        self.solver_stats = {}
+
+        # Whether the runtime parameters are assigned, after which they are reassigned
+        self.parametersAssigned = False
+
         # Define the model we're going to simulate
-        self.m = mod_cell.ModCell(config, "mpet")
+        with self.timer.phase("ModCell construction"):
+            self.m = mod_cell.ModCell(config, "mpet", timer=self.timer)
 
     def SetUpParametersAndDomains(self):
         # Domains
@@ -51,8 +71,16 @@ class SimMPET(dae.daeSimulation):
         for tr in config["trodes"]:
             self.m.DmnCell[tr].CreateArray(config["Nvol"][tr])
             self.m.DmnPart[tr].CreateArray(config["Npart"][tr])
+            if self.m.particleBank:
+                for bank in self.m.banks[tr]:
+                    bank.DmnBank.CreateArray(len(bank.inds))
+                    bank.Dmn.CreateArray(bank.N)
+                    bank.set_parameters()
+                continue
             for i in range(config["Nvol"][tr]):
                 for j in range(config["Npart"][tr]):
+                    if not self.m.is_representative(tr, i, j):
+                        continue
                     self.m.particles[tr][i, j].Dmn.CreateArray(
                         int(config["psd_num"][tr][i,j]))
 
@@ -77,13 +105,21 @@ class SimMPET(dae.daeSimulation):
                     else:  # cathode
                         self.m.phi_bulk[tr].SetInitialGuess(i, phi_cathode)
                     for j in range(Npart[tr]):
+                        if not self.m.is_representative(tr, i, j):
+                            continue
                         Nij = config["psd_num"][tr][i,j]
                         part = self.m.particles[tr][i,j]
                         # Guess initial value for the average solid
                         # concentrations and set initial value for
                         # solid concentrations
                         solidType = self.config[tr, "type"]
-                        if solidType in constants.one_var_types:
+                        if solidType == "diffn_poly":
+                            # The average concentration is the differential variable
+                            part.cbar.SetInitialCondition(cs0)
+                            part.c.SetInitialGuess(0, cs0)
+                            if config[tr, "polyParams"] == 3:
+                                part.q.SetInitialCondition(0.)
+                        elif solidType in constants.one_var_types:
                             part.cbar.SetInitialGuess(cs0)
                             for k in range(Nij):
                                 part.c.SetInitialCondition(k, cs0)
@@ -120,18 +156,23 @@ class SimMPET(dae.daeSimulation):
             # Separator electrolyte initialization
             if config["have_separator"]:
                 for i in range(Nvol["s"]):
-                    self.m.c_lyte["s"].SetInitialCondition(i, config['c0'])
+                    self.set_c_lyte_initial(self.m.c_lyte["s"], i, config['c0'])
                     self.m.phi_lyte["s"].SetInitialGuess(i, 0)
 
             # Anode and cathode electrolyte initialization
             for tr in config["trodes"]:
                 for i in range(Nvol[tr]):
-                    self.m.c_lyte[tr].SetInitialCondition(i, config['c0'])
+                    self.set_c_lyte_initial(self.m.c_lyte[tr], i, config['c0'])
                     self.m.phi_lyte[tr].SetInitialGuess(i, 0)
 
                     # Set electrolyte concentration in each particle
                     for j in range(Npart[tr]):
-                        self.m.particles[tr][i,j].c_lyte.SetInitialGuess(config["c0"])
+                        if not self.m.is_representative(tr, i, j):
+                            continue
+                        part = self.m.particles[tr][i,j]
+                        # Particles without ports use the cell variables directly
+                        if part.Ports:
+                            part.c_lyte.SetInitialGuess(config["c0"])
 
         else:
             dPrev = self.dataPrev
@@ -145,6 +186,8 @@ class SimMPET(dae.daeSimulation):
                     self.m.phi_bulk[tr].SetInitialGuess(
                         i, data["phi_bulk_" + tr][-1,i])
                     for j in range(Npart[tr]):
+                        if not self.m.is_representative(tr, i, j):
+                            continue
                         Nij = config["psd_num"][tr][i,j]
                         part = self.m.particles[tr][i,j]
                         solidType = self.config[tr, "type"]
@@ -152,11 +195,19 @@ class SimMPET(dae.daeSimulation):
                             l=tr, i=i, j=j)
 
                         # Set the inlet port variables for each particle
-                        part.c_lyte.SetInitialGuess(data["c_lyte_" + tr][-1,i])
-                        part.phi_lyte.SetInitialGuess(data["phi_lyte_" + tr][-1,i])
-                        part.phi_m.SetInitialGuess(data["phi_bulk_" + tr][-1,i])
+                        if part.Ports:
+                            part.c_lyte.SetInitialGuess(data["c_lyte_" + tr][-1,i])
+                            part.phi_lyte.SetInitialGuess(data["phi_lyte_" + tr][-1,i])
+                            part.phi_m.SetInitialGuess(data["phi_bulk_" + tr][-1,i])
 
-                        if solidType in constants.one_var_types:
+                        if solidType == "diffn_poly":
+                            part.cbar.SetInitialCondition(
+                                utils.get_dict_key(data, partStr + "cbar", final=True))
+                            part.c.SetInitialGuess(0, data[partStr + "c"][-1,0])
+                            if config[tr, "polyParams"] == 3:
+                                part.q.SetInitialCondition(
+                                    utils.get_dict_key(data, partStr + "q", final=True))
+                        elif solidType in constants.one_var_types:
                             part.cbar.SetInitialGuess(
                                 utils.get_dict_key(data, partStr + "cbar", final=True))
                             for k in range(Nij):
@@ -176,14 +227,14 @@ class SimMPET(dae.daeSimulation):
                                     k, data[partStr + "c2"][-1,k])
             if config["have_separator"]:
                 for i in range(Nvol["s"]):
-                    self.m.c_lyte["s"].SetInitialCondition(
-                        i, data["c_lyte_s"][-1,i])
+                    self.set_c_lyte_initial(
+                        self.m.c_lyte["s"], i, data["c_lyte_s"][-1,i])
                     self.m.phi_lyte["s"].SetInitialGuess(
                         i, data["phi_lyte_s"][-1,i])
             for tr in config["trodes"]:
                 for i in range(Nvol[tr]):
-                    self.m.c_lyte[tr].SetInitialCondition(
-                        i, data["c_lyte_" + tr][-1,i])
+                    self.set_c_lyte_initial(
+                        self.m.c_lyte[tr], i, data["c_lyte_" + tr][-1,i])
                     self.m.phi_lyte[tr].SetInitialGuess(
                         i, data["phi_lyte_" + tr][-1,i])
 
@@ -204,6 +255,72 @@ class SimMPET(dae.daeSimulation):
 
         # The simulation runs when the endCondition is 0
         self.m.endCondition.AssignValue(0)
+        # Values of the parameters that can be changed at run time
+        self.m.assign_runtime_parameters()
+        self.parametersAssigned = True
+
+    def set_parameters(self, **values):
+        """
+        Change the values of runtime parameters (see ``runtimeParameters``) without rebuilding
+        the model. The values are nondimensional, as in the processed config. The system
+        parameters in :data:`mpet.config.constants.RUNTIME_PARAMS` are numbers, the particle
+        parameters in :data:`mpet.config.constants.RUNTIME_PARAMS_PARTICLE` dicts of arrays of
+        shape (Nvol, Npart) per electrode. Once the simulation is initialized, the new values
+        take effect after :meth:`reinitialize`.
+        """
+        config = self.config
+        if not config["runtimeParameters"]:
+            raise ValueError("Parameters can only be changed at run time with "
+                             "runtimeParameters enabled")
+        for name, value in values.items():
+            if name in self.m.runtime_params:
+                config[name] = float(value)
+            elif name in constants.RUNTIME_PARAMS_PARTICLE:
+                for trode, trodeValue in value.items():
+                    config[trode, name] = config.get_particle_values(trode, name, trodeValue)
+            else:
+                raise ValueError(f"{name} is not a runtime parameter of this simulation, "
+                                 f"options are: {list(self.m.runtime_params)} "
+                                 f"+ {constants.RUNTIME_PARAMS_PARTICLE}")
+        # The duration of constant current simulations follows from the current
+        if ("currset" in values and config["profileType"] == "CC"
+                and not np.allclose(config["currset"], 0., atol=1e-12)):
+            config["tend"] = np.abs(config["capFrac"] / config["currset"])
+        if self.parametersAssigned:
+            self.m.assign_runtime_parameters(reassign=True)
+
+    def reinitialize(self, initialValues=None, **values):
+        """
+        Change runtime parameters (see :meth:`set_parameters`) of an initialized simulation and
+        reinitialize the DAE solver, which computes consistent values of the algebraic variables
+        for the new parameters. A following :meth:`Run` continues from the current time for the
+        duration of the simulation (tend), e.g. with a different current or voltage, without
+        rebuilding the model.
+
+        :param str initialValues: File with the state to restart from, as written by
+            ``StoreInitializationValues`` (e.g. after ``SolveInitial``). Note that ramps,
+            segments and noise are functions of the simulation time, which is not reset.
+        """
+        self.set_parameters(**values)
+        if initialValues is not None:
+            self.LoadInitializationValues(initialValues)
+        # Continue after an end condition was reached
+        self.m.endCondition.ReAssignValue(0)
+        self.Reinitialize()
+        config = self.config
+        self.TimeHorizon = self.CurrentTime + config["tend"]
+        self.ReportingTimes = list(self.CurrentTime
+                                   + np.linspace(0, config["tend"], config["tsteps"] + 1))[1:]
+
+    def set_c_lyte_initial(self, c_lyte, i, value):
+        """
+        Set the initial electrolyte concentration of a volume. With a quasi-steady electrolyte
+        the concentration is not a differential variable, so the value is only a guess.
+        """
+        if self.config["elyteQuasiSteady"] and not self.m.SVsim:
+            c_lyte.SetInitialGuess(i, value)
+        else:
+            c_lyte.SetInitialCondition(i, value)
 
     def Run(self):
         """
@@ -211,22 +328,55 @@ class SimMPET(dae.daeSimulation):
         terminates when the specified condition is satisfied.
         """
         tScale = self.tScale
+        statsPrev = self.get_solver_stats()
+        if not hasattr(self.DAESolver, "IntegratorStats") and self.progress is None:
+            print("The DAE solver does not provide its integrator statistics, "
+                  "so they are not written to the output")
+        self.endCondition = None
         for nextTime in self.ReportingTimes:
 
             # Print logging information
-            progressStr = "{0} {1}".format(self.Log.PercentageDone,self.Log.ETA)
-            message = "Integrating from {t0:.2f} to {t1:.2f} s ...".format(
-                t0=self.CurrentTime*tScale, t1=nextTime*tScale)
-            sys.stdout.write(f"\r{progressStr[:-1]} {message}")
-            sys.stdout.flush()
+            if self.progress is None:
+                progressStr = "{0} {1}".format(self.Log.PercentageDone,self.Log.ETA)
+                message = "Integrating from {t0:.2f} to {t1:.2f} s ...".format(
+                    t0=self.CurrentTime*tScale, t1=nextTime*tScale)
+                sys.stdout.write(f"\r{progressStr[:-1]} {message}")
+                sys.stdout.flush()
 
             # Integrate the equations
             self.IntegrateUntilTime(nextTime, dae.eStopAtModelDiscontinuity, True)
             self.ReportData(self.CurrentTime)
+            statsPrev = self.record_solver_stats(statsPrev)
             self.Log.SetProgress(int(100. * self.CurrentTime/self.TimeHorizon))
+            if self.progress is not None:
+                self.progress(self.CurrentTime*tScale, self.TimeHorizon*tScale)
 
             # Break when an end condition has been met
             if self.m.endCondition.npyValues:
-                description = mod_cell.endConditions[int(self.m.endCondition.npyValues)]
-                sys.stdout.write("\nEnding condition: " + description)
+                self.endCondition = mod_cell.endConditions[int(self.m.endCondition.npyValues)]
+                if self.progress is None:
+                    sys.stdout.write("\nEnding condition: " + self.endCondition)
                 break
+
+    def get_solver_stats(self):
+        """
+        Current integrator statistics of the DAE solver (e.g. NumSteps, CurrentStep,
+        CurrentOrder), or an empty dict if the solver does not provide them.
+        """
+        return dict(getattr(self.DAESolver, "IntegratorStats", {}))
+
+    def record_solver_stats(self, statsPrev):
+        """
+        Record the solver statistics of the last reporting interval, given those at its start.
+        Counters (Num...) are stored as their increase during the interval, other statistics as
+        their value at the end of the interval. Returns the current statistics.
+        """
+        stats = self.get_solver_stats()
+        if not stats:
+            return stats
+        self.solver_stats.setdefault("times", []).append(self.CurrentTime)
+        for key, value in stats.items():
+            if key.startswith("Num"):
+                value -= statsPrev.get(key, 0)
+            self.solver_stats.setdefault(key, []).append(value)
+        return stats
@@ -0,0 +1,292 @@
+"""Selection and setup of the linear solver used by the DAE solver, and of the evaluation mode
+of the equations.
+
+The linear systems of the DAE solver are either solved with a sparse direct solver, or with the
+iterative GMRES solver of IDAS and a block-Jacobi preconditioner (see
+:func:`create_preconditioner`).
+
+The daetools linear solvers are optional compiled modules, so only some of them may be installed.
+If the selected linear solver is not available, SuperLU is used instead.
+"""
+import importlib
+import os
+from time import perf_counter
+
+import daetools.pyDAE as dae
+import numpy as np
+
+#: Available linear solvers: package, module, and the name of the function creating the solver
+LINEAR_SOLVERS = {"SuperLU": ("daetools.solvers.superlu", "pySuperLU",
+                              "daeCreateSuperLUSolver"),
+                  "SuperLU_MT": ("daetools.solvers.superlu_mt", "pySuperLU_MT",
+                                 "daeCreateSuperLUSolver"),
+                  "Amesos_Klu": ("daetools.solvers.trilinos", "pyTrilinos",
+                                 "daeCreateTrilinosSolver"),
+                  "Amesos_Umfpack": ("daetools.solvers.trilinos", "pyTrilinos",
+                                     "daeCreateTrilinosSolver"),
+                  "Pardiso": ("daetools.solvers.pardiso", "pyPardiso",
+                              "daeCreatePardisoSolver"),
+                  "IntelPardiso": ("daetools.solvers.intel_pardiso", "pyIntelPardiso",
+                                   "daeCreateIntelPardisoSolver")}
+
+#: daetools configuration keys of the GMRES solver of IDAS, and the MPET settings for them
+GMRES_OPTIONS = {"daetools.IDAS.gmres.kspace": "gmresKrylovDim",
+                 "daetools.IDAS.gmres.MaxRestarts": "gmresMaxRestarts",
+                 "daetools.IDAS.gmres.EpsLin": "gmresEpsLin"}
+
+#: Evaluation modes of the equations compared by the auto evaluation mode
+EVALUATION_MODES = ["computeStack_OpenMP", "evaluationTree_OpenMP"]
+
+
+def import_solver_module(name):
+    """Import the daetools module of a linear solver.
+
+    :param str name: Name of the linear solver, one of the keys of :data:`LINEAR_SOLVERS`
+
+    :return: The solver module
+    """
+    package, module, _ = LINEAR_SOLVERS[name]
+    # equivalent to: from <package> import <module>
+    try:
+        return getattr(importlib.import_module(package), module)
+    except AttributeError:
+        return importlib.import_module(f"{package}.{module}")
+
+
+def create_linear_solver(config):
+    """Create the linear solver selected in the config, falling back to SuperLU if it is not
+    installed.
+
+    :param Config config: MPET configuration
+
+    :return: name of the linear solver that is used, the linear solver
+    """
+    name = config["linearSolver"]
+    try:
+        module = import_solver_module(name)
+    except ImportError:
+        print(f"Linear solver {name} is not available, using SuperLU instead")
+        name = "SuperLU"
+        module = import_solver_module(name)
+    create = getattr(module, LINEAR_SOLVERS[name][2])
+    if name.startswith("Amesos"):
+        lasolver = create(name, "")
+    else:
+        lasolver = create()
+
+    # Solver options of SuperLU and SuperLU_MT
+    if name in ["SuperLU", "SuperLU_MT"] and config["linearSolverOrdering"] != "default":
+        lasolver.Options.ColPerm = getattr(module, config["linearSolverOrdering"])
+    if name == "SuperLU_MT" and config["linearSolverThreads"] > 0:
+        lasolver.Options.nprocs = config["linearSolverThreads"]
+    return name, lasolver
+
+
+def get_num_blocks(config):
+    """Number of diagonal blocks of the block-Jacobi preconditioner: the number of simulated
+    particles and electrolyte volumes, so that a block holds about as many unknowns as a
+    particle or an electrolyte volume.
+
+    :param Config config: MPET configuration
+
+    :return: Number of blocks
+    """
+    Nvol = config["Nvol"]
+    Npart = config["Npart"]
+    return int(sum(np.sum(config["partRep"][trode] == np.arange(Npart[trode]))
+                   for trode in config["trodes"])
+               + sum(Nvol.values()))
+
+
+def create_preconditioner(config):
+    """Create a block-Jacobi preconditioner, where each block is factored independently with
+    Amesos (KLU).
+
+    daetools numbers the unknowns variable by variable, so contiguous rows do not belong to the
+    same particle or electrolyte volume (e.g. a variable of a particle bank spans all particles
+    of an electrolyte volume). Instead, the blocks are grown from the sparsity pattern of the
+    Jacobian by the greedy partitioner of Ifpack, so that each block holds coupled unknowns.
+    The blocks are not the particles and electrolyte volumes themselves: that needs a map from
+    each row to its block, which cannot be passed to Ifpack through daetools.
+
+    :param Config config: MPET configuration
+
+    :return: The Ifpack preconditioner
+    """
+    pyTrilinos = import_solver_module("Amesos_Klu")
+    preconditioner = pyTrilinos.daeCreateIfpackPreconditioner(
+        "block relaxation stand-alone (Amesos)")
+    parameters = preconditioner.ParameterList
+    parameters.set_string("partitioner: type", "greedy")
+    parameters.set_int("partitioner: local parts", get_num_blocks(config))
+    parameters.set_int("partitioner: overlap", 0)
+    parameters.set_string("relaxation: type", "Jacobi")
+    parameters.set_int("relaxation: sweeps", 1)
+    parameters.set_string("amesos: solver type", "Amesos_Klu")
+    return preconditioner
+
+
+def set_linear_solver(daesolver, config):
+    """Set the linear solver of the DAE solver as selected in the config. If the GMRES solver
+    is selected but its preconditioner is not available, the direct solver is used instead.
+
+    :param daesolver: daetools DAE solver (IDAS)
+    :param Config config: MPET configuration
+
+    :return: name of the linear solver that is used, the linear solver or preconditioner
+    """
+    if config["linearSolverMethod"] == "GMRES":
+        try:
+            preconditioner = create_preconditioner(config)
+        except (ImportError, AttributeError) as e:
+            print(f"GMRES preconditioner is not available ({e}), using a direct solver instead")
+        else:
+            cfg = dae.daeGetConfig()
+            for key, option in GMRES_OPTIONS.items():
+                if key in cfg:
+                    if isinstance(config[option], int):
+                        cfg.SetInteger(key, config[option])
+                    else:
+                        cfg.SetFloat(key, config[option])
+            daesolver.SetLASolver(dae.eSundialsGMRES, preconditioner)
+            return "GMRES (block-Jacobi)", preconditioner
+    name, lasolver = create_linear_solver(config)
+    daesolver.SetLASolver(lasolver)
+    return name, lasolver
+
+
+def get_call_stats(solver):
+    """Get the call statistics (number of calls and time spent in e.g. factorization) of a
+    daetools solver, if it provides them.
+
+    :param solver: daetools DAE or linear solver
+
+    :return: dict of {name: statistics}
+    """
+    return {str(key): value for key, value in dict(getattr(solver, "CallStats", {})).items()}
+
+
+def set_evaluation_mode(config):
+    """Set the daetools evaluation mode of the equations and its number of OpenMP threads, as
+    selected in the config. This has to be done before the simulation is initialized. The auto
+    mode keeps the daetools default here, and the fastest mode is selected with
+    :func:`calibrate_evaluation_mode` once the simulation is initialized. The Evaluation Tree
+    mode is used if the equations contain external functions (see
+    :func:`uses_external_functions`).
+
+    :param Config config: MPET configuration
+
+    :return: The evaluation mode, or None if the daetools default is used
+    """
+    mode = config["evaluationMode"]
+    if uses_external_functions(config):
+        # External functions are only evaluated in the Evaluation Tree mode
+        mode = "evaluationTree_OpenMP"
+    if mode == "default":
+        return None
+    if mode != "auto":
+        apply_evaluation_mode(mode, config["evaluationThreads"])
+    return mode
+
+
+def uses_external_functions(config):
+    """Whether the equations contain external functions, the tables of
+    :mod:`mpet.tables` (``muRfuncTable`` and ``SMsetTable``), which are only evaluated in the
+    Evaluation Tree mode of daetools.
+
+    :param Config config: MPET configuration
+    """
+    muRfuncTable = any(config[trode, "muRfuncTable"] for trode in config["trodes"])
+    SMsetTable = config["elyteModelType"] == "SM" and config["SMsetTable"]
+    return bool(muRfuncTable or SMsetTable)
+
+
+def apply_evaluation_mode(mode, threads):
+    """Set the daetools evaluation mode and its number of OpenMP threads (0 for the default)."""
+    cfg = dae.daeGetConfig()
+    if 'daetools.core.equations.evaluationMode' in cfg:
+        cfg.SetString('daetools.core.equations.evaluationMode', mode)
+    threadsKey = f'daetools.core.equations.{mode}.numThreads'
+    if threads > 0 and threadsKey in cfg:
+        cfg.SetInteger(threadsKey, threads)
+
+
+def set_block_evaluation_mode(block, mode, threads):
+    """Set the evaluation mode and number of OpenMP threads of the DAE system of an initialized
+    simulation (block, a daetools daeBlock_t).
+    """
+    apply_evaluation_mode(mode, threads)
+    block.EvaluationMode = getattr(dae, "e" + mode[0].upper() + mode[1:])
+
+
+def get_thread_counts(config):
+    """Numbers of OpenMP threads compared by the auto evaluation mode: the number set in the
+    config, or powers of two up to the number of CPUs and the number of CPUs itself.
+    """
+    if config["evaluationThreads"] > 0:
+        return [config["evaluationThreads"]]
+    ncpu = os.cpu_count() or 1
+    return sorted({2**i for i in range(ncpu.bit_length()) if 2**i <= ncpu} | {ncpu})
+
+
+def time_evaluations(block, currentTime, repeats):
+    """Time the evaluation of the residuals and of the Jacobian of a DAE system.
+
+    :param block: daetools DAE system (daeBlock_t) of an initialized simulation
+    :param float currentTime: Time at which the equations are evaluated
+    :param int repeats: Number of evaluations of each
+
+    :return: time per evaluation of the residuals and of the Jacobian (s)
+    """
+    tStart = perf_counter()
+    for _ in range(repeats):
+        block.CalculateResiduals(currentTime)
+    tResiduals = (perf_counter() - tStart) / repeats
+    tStart = perf_counter()
+    for _ in range(repeats):
+        block.CalculateJacobian(currentTime)
+    tJacobian = (perf_counter() - tStart) / repeats
+    return tResiduals, tJacobian
+
+
+def calibrate_evaluation_mode(simulation, daesolver, config, repeats=3, verbose=True):
+    """Select the fastest evaluation mode and number of OpenMP threads for this model, by
+    timing a few evaluations of the residuals and Jacobian of the initialized simulation in
+    each combination of :data:`EVALUATION_MODES` and :func:`get_thread_counts`. Only the
+    Evaluation Tree mode is used if the equations contain external functions. The evaluations
+    do not change the state of the simulation.
+
+    :param simulation: Initialized simulation
+    :param daesolver: DAE solver of the simulation
+    :param Config config: MPET configuration
+    :param int repeats: Number of evaluations of the residuals and of the Jacobian per setting
+    :param bool verbose: Print the timings and the selected setting
+
+    :return: dict with the selected "mode" and "threads", and the "timings" of each setting
+        (s per evaluation of the residuals and of the Jacobian), or None if the installed
+        daetools cannot change the evaluation mode of an initialized simulation
+    """
+    try:
+        block = daesolver.Block
+        timings = {}
+        modes = EVALUATION_MODES
+        if uses_external_functions(config):
+            modes = ["evaluationTree_OpenMP"]
+        for mode in modes:
+            for threads in get_thread_counts(config):
+                set_block_evaluation_mode(block, mode, threads)
+                timings[f"{mode} {threads}"] = time_evaluations(block, simulation.CurrentTime,
+                                                                repeats)
+    except (AttributeError, TypeError) as e:
+        if verbose:
+            print(f"Evaluation mode calibration is not supported ({e}), using the default mode")
+        return None
+    best = min(timings, key=lambda key: sum(timings[key]))
+    mode, threads = best.split()
+    set_block_evaluation_mode(block, mode, int(threads))
+    if verbose:
+        print("Evaluation mode calibration (residuals, Jacobian):",
+              ", ".join(f"{key} threads {res:.3g} s, {jac:.3g} s"
+                        for key, (res, jac) in timings.items()),
+              "-- using", mode, "with", threads, "threads")
+    return {"mode": mode, "threads": int(threads), "timings": timings}
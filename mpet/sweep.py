@@ -0,0 +1,306 @@
+"""Run a set of variants of a simulation in parallel.
+
+The variants are derived from a base config with :meth:`mpet.config.Config.copy_with`, so they
+are generated from the same particle size distributions unless parameters these are sampled with
+are changed. Each variant (job) runs in its own process and output directory, with an optional
+time limit and memory limit. The largest jobs are started first, and a summary of all jobs is
+written to ``summary.csv`` in the sweep directory.
+
+Parameter names are those of the system config, or those of the electrode configs prefixed by
+``cathode.`` or ``anode.`` (e.g. ``cathode.k0``). Values are given as in the config files.
+
+Example usage:
+
+>>> from mpet import sweep
+>>> jobs = sweep.expand_grid({'Crate': ['0.5', '1', '2'], 'cathode.k0': ['1', '10']})
+>>> rows = sweep.run_sweep('configs/params_system.cfg', jobs, processes=4, timeout=3600)
+"""
+import ast
+import csv
+import itertools
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from mpet.config import Config, constants
+
+#: Electrode prefixes of parameter names, and the corresponding argument of Config.copy_with
+TRODE_PREFIXES = {'cathode.': 'cathode', 'anode.': 'anode'}
+
+#: Columns of the summary, after the parameters of the jobs
+SUMMARY_COLUMNS = ['status', 'endCondition', 't_end (s)', 'V_end (V)', 'run time (s)', 'cached',
+                   'error']
+
+
+def parse_values(values):
+    """
+    Parse the values of a parameter given on the command line, either as a Python list or
+    tuple, or as comma-separated values.
+
+    :param str values: Values of the parameter
+    :return: list of values
+    """
+    try:
+        parsed = ast.literal_eval(values)
+    except (ValueError, SyntaxError):
+        parsed = None
+    if isinstance(parsed, (list, tuple)):
+        return list(parsed)
+    return [value.strip() for value in values.split(',')]
+
+
+def expand_grid(grid):
+    """
+    Create a job for every combination of parameter values.
+
+    :param dict grid: Values of each parameter, {name: [values]}
+    :return: list of jobs, each a dict of parameter values
+    """
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def read_samples(filename):
+    """
+    Read jobs from a CSV file, with the parameter names in the first row and the values of
+    each job in the next rows.
+
+    :param str filename: Path to the CSV file
+    :return: list of jobs, each a dict of parameter values
+    """
+    with open(filename, newline='') as fi:
+        return [{name.strip(): value.strip() for name, value in row.items()}
+                for row in csv.DictReader(fi)]
+
+
+def split_overrides(params):
+    """
+    Split the parameters of a job into the arguments of :meth:`mpet.config.Config.copy_with`.
+
+    :param dict params: Parameter values of the job
+    :return: dict of keyword arguments
+    """
+    kwargs = {}
+    for name, value in params.items():
+        for prefix, trode in TRODE_PREFIXES.items():
+            if name.startswith(prefix):
+                kwargs.setdefault(trode, {})[name[len(prefix):]] = value
+                break
+        else:
+            kwargs[name] = value
+    return kwargs
+
+
+def estimate_cost(config):
+    """
+    Estimate the relative cost of a simulation, to start the largest jobs first: the number of
+    particle grid points and electrolyte volumes, times the number of reporting intervals.
+
+    :param config: Processed :class:`mpet.config.Config`
+    :return: Estimated cost
+    """
+    size = sum(config['Nvol'].values())
+    for trode in config['trodes']:
+        size += np.sum(config['psd_num'][trode])
+    return size * config['tsteps']
+
+
+def _run_job(jobdir, memory=None, cache=None):
+    """
+    Run the simulation of a job in the current process. The processed config is read from the
+    job directory, and the output, log and result of the job are written to it.
+
+    :param str jobdir: Job directory
+    :param int memory: Limit of the address space of the process (bytes), or None
+    :param cache: :class:`mpet.cache.ResultCache`, or None
+    """
+    os.chdir(jobdir)
+    # Redirect the output of the process, including that of daetools, to the log file
+    log = os.open('log.txt', os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(log, 1)
+    os.dup2(log, 2)
+    if memory is not None:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+    result = {'status': 'failed'}
+    try:
+        # daetools is imported after setting the memory limit
+        import mpet.api as api
+        config = Config.from_dicts(jobdir)
+        res = api.run(config, outdir=jobdir, progress=lambda t, tend: None, cache=cache)
+        result['cached'] = res.cached
+        result['endCondition'] = res.endCondition
+        result['error'] = res.error
+        result['run time (s)'] = res.timings['total']
+        # Time and cell voltage at the end of the simulation
+        if 'phi_applied' in res:
+            result['t_end (s)'] = float(np.squeeze(res['phi_applied_times'])[-1]
+                                        * config['t_ref'])
+            Etheta = {'a': 0.}
+            for trode in config['trodes']:
+                Etheta[trode] = -(constants.k*constants.T_ref/constants.e) \
+                    * config[trode, 'phiRef']
+            result['V_end (V)'] = float(
+                Etheta['c'] - Etheta['a']
+                - (constants.k*constants.T_ref/constants.e) * np.squeeze(res['phi_applied'])[-1])
+        result['status'] = 'ok' if res.error is None else 'error'
+    except MemoryError:
+        result['status'] = 'memory'
+        result['error'] = 'Memory limit exceeded'
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    with open('result.json', 'w') as fo:
+        json.dump(result, fo, indent=4, default=str)
+
+
+def _stop(process):
+    """Stop the process of a job, and kill it if it does not stop."""
+    process.terminate()
+    process.join(5)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+
+def run_sweep(paramfile, jobs, outdir=None, processes=None, timeout=None, memory=None,
+              cache=None):
+    """
+    Run a simulation for each job, in parallel.
+
+    Each job runs in a separate process, in the directory ``job<number>`` in the sweep
+    directory. It contains the processed config and the output of the simulation, as written by
+    :func:`mpet.api.run`, the parameters of the job (``params.json``), the log of the simulation
+    (``log.txt``) and its result (``result.json``). The processes are started with the
+    ``spawn`` method, so a script that calls this function must do so under
+    ``if __name__ == '__main__':``.
+
+    :param str paramfile: System config file of the base config
+    :param list jobs: Parameter values of each job, e.g. from :func:`expand_grid` or
+        :func:`read_samples`
+    :param str outdir: Folder to create the sweep directory in (default: ``sweeps`` in the
+        current folder). Each sweep creates a new directory, named after the time it started.
+    :param int processes: Number of jobs to run at the same time (default: number of CPUs)
+    :param float timeout: Time limit of each job (s), or None
+    :param int memory: Memory limit of each job (bytes), or None
+    :param cache: :class:`mpet.cache.ResultCache` to read the output of jobs from, if it holds
+        the output of an identical simulation, and to store the output in otherwise
+
+    :return: list of rows of the summary, each a dict with the parameters and the result of a job
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if outdir is None:
+        outdir = os.path.join(os.getcwd(), 'sweeps')
+    os.makedirs(outdir, exist_ok=True)
+    # Unique, also if several sweeps start at the same time
+    sweepdir = tempfile.mkdtemp(prefix=time.strftime('%Y%m%d_%H%M%S_', time.localtime()),
+                                dir=outdir)
+
+    # Process the config of every job first, so invalid parameters are found before any
+    # simulation starts
+    base = Config(paramfile)
+    costs = []
+    for i, params in enumerate(jobs):
+        jobdir = os.path.join(sweepdir, f'job{i:04d}')
+        os.makedirs(jobdir)
+        config = base.copy_with(**split_overrides(params))
+        config.write(jobdir)
+        with open(os.path.join(jobdir, 'params.json'), 'w') as fo:
+            json.dump(params, fo, indent=4, default=str)
+        costs.append(estimate_cost(config))
+    # Longest job first
+    pending = sorted(range(len(jobs)), key=lambda i: costs[i], reverse=True)
+
+    print(f'Running {len(jobs)} jobs in {sweepdir}')
+    # Start the jobs in new processes, without the state of this process (e.g. of daetools)
+    context = multiprocessing.get_context('spawn')
+    results = [None] * len(jobs)
+    running = {}
+    while pending or running:
+        while pending and len(running) < processes:
+            i = pending.pop(0)
+            jobdir = os.path.join(sweepdir, f'job{i:04d}')
+            process = context.Process(target=_run_job, args=(jobdir, memory, cache))
+            process.start()
+            running[i] = (process, time.time())
+        multiprocessing.connection.wait([process.sentinel for process, _ in running.values()],
+                                        timeout=1.)
+        for i, (process, start) in list(running.items()):
+            elapsed = time.time() - start
+            if process.is_alive():
+                if timeout is None or elapsed < timeout:
+                    continue
+                _stop(process)
+                result = {'status': 'timeout', 'error': f'Time limit of {timeout} s exceeded'}
+            else:
+                process.join()
+                resultfile = os.path.join(sweepdir, f'job{i:04d}', 'result.json')
+                if os.path.isfile(resultfile):
+                    with open(resultfile) as fi:
+                        result = json.load(fi)
+                else:
+                    # e.g. killed, or a memory error outside of Python
+                    result = {'status': 'failed',
+                              'error': f'Process exited with code {process.exitcode}'}
+            result.setdefault('run time (s)', elapsed)
+            results[i] = result
+            del running[i]
+            print(f'job{i:04d}: {result["status"]} ({elapsed:.1f} s)')
+
+    rows = []
+    for i, (params, result) in enumerate(zip(jobs, results)):
+        row = {'job': f'job{i:04d}', **params}
+        row.update({column: result.get(column) for column in SUMMARY_COLUMNS})
+        rows.append(row)
+    write_summary(rows, os.path.join(sweepdir, 'summary.csv'))
+    return rows
+
+
+def write_summary(rows, filename):
+    """
+    Write the summary of a sweep to a CSV file.
+
+    :param list rows: Rows of the summary, see :func:`run_sweep`
+    :param str filename: Path to the CSV file
+    """
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    with open(filename, 'w', newline='') as fo:
+        writer = csv.DictWriter(fo, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def format_summary(rows):
+    """
+    Format the summary of a sweep as a table, without the error messages.
+
+    :param list rows: Rows of the summary, see :func:`run_sweep`
+    :return: str
+    """
+    columns = [column for column in dict.fromkeys(column for row in rows for column in row)
+               if column != 'error']
+
+    def fmt(value):
+        if value is None:
+            return '-'
+        if isinstance(value, float):
+            return f'{value:.4g}'
+        return str(value)
+
+    cells = [[fmt(row.get(column)) for column in columns] for row in rows]
+    widths = [max([len(column)] + [len(line[j]) for line in cells])
+              for j, column in enumerate(columns)]
+    lines = ['  '.join(column.ljust(width) for column, width in zip(columns, widths))]
+    lines.append('  '.join('-' * width for width in widths))
+    for line in cells:
+        lines.append('  '.join(cell.ljust(width) for cell, width in zip(line, widths)))
+    return '\n'.join(lines)
@@ -0,0 +1,281 @@
+"""Tabulated versions of functions that are expensive to evaluate in the simulation.
+
+Material functions with many terms (e.g. nested tanh, exp and power terms) result in large
+expression trees, which are evaluated and differentiated for every grid point in every Newton
+iteration. The same holds for the transport properties of concentrated electrolytes, which are
+evaluated at every cell and edge. A :class:`Table` samples such a function of one variable once
+and interpolates it with a monotone piecewise cubic (PCHIP) spline, with knots added where the
+interpolation error exceeds the tolerance.
+
+In the simulation, a table is evaluated by an external function
+(:class:`mpet.extern_funcs.InterpScalar`), which finds the interval of its argument by bisection
+and returns the value and exact derivative of the cubic of that interval. The expression of a
+table is therefore a single node, whatever its number of knots. The table is constant outside of
+its range. External functions are only evaluated in the Evaluation Tree mode of daetools, which
+is used in simulations with tables (see :func:`mpet.solvers.set_evaluation_mode`).
+"""
+import hashlib
+import itertools
+
+import numpy as np
+import scipy.interpolate as sintrp
+
+#: Default range of filling fractions covered by the tables of chemical potentials
+Y_RANGE = (1e-3, 1 - 1e-3)
+#: Number of knots the adaptive refinement starts with
+INITIAL_KNOTS = 9
+#: Maximum number of knots of a table
+MAX_KNOTS = 10000
+#: Number of points per interval at which the error of the interpolation is checked
+CHECK_POINTS = 8
+
+_cache = {}
+_reported = set()
+# Numbers of the external functions of the tables, which make their names unique
+_counter = itertools.count()
+
+
+class Table:
+    """Monotone cubic spline table of a function of one variable, with knots added where the
+    interpolation error exceeds the tolerance.
+
+    :param func: Function to tabulate, which accepts numpy arrays
+    :param float xmin: Lower end of the table
+    :param float xmax: Upper end of the table
+    :param float tol: Absolute tolerance of the interpolation
+    """
+    def __init__(self, func, xmin, xmax, tol):
+        self.tol = tol
+        self.range = (xmin, xmax)
+        knots = np.linspace(xmin, xmax, INITIAL_KNOTS)
+        while True:
+            self.fit(knots, _finite(func(knots)))
+            # Check the error inside each interval
+            s = np.linspace(0, 1, CHECK_POINTS + 2)[1:-1]
+            x = knots[:-1, None] + s[None, :]*np.diff(knots)[:, None]
+            err = np.max(np.abs(self.evaluate(x.ravel()) - _finite(func(x.ravel())))
+                         .reshape(x.shape), axis=1)
+            # Refine with some margin, as the table is verified on other points
+            refine = ~(err <= 0.5*tol)
+            if not np.any(refine) or len(knots) + np.sum(refine) > MAX_KNOTS:
+                break
+            knots = np.sort(np.concatenate((knots, 0.5*(knots[:-1] + knots[1:])[refine])))
+        # Verify the table, as it is used in the simulation, on points not used in the fit
+        x = np.linspace(xmin, xmax, 10*len(knots) + 1)
+        x = 0.5*(x[:-1] + x[1:])
+        self.max_error = np.max(np.abs(self.evaluate(x) - _finite(func(x))))
+
+    def fit(self, knots, values):
+        """Fit the spline to the values at the knots."""
+        self.knots = knots
+        self.spline = sintrp.PchipInterpolator(knots, values)
+
+    def __call__(self, x, model):
+        """Evaluate the table at an expression x, with an external function of the model."""
+        # Imported here, as only expressions need daetools
+        import daetools.pyDAE as dae
+        from mpet.extern_funcs import InterpScalar
+        return InterpScalar(f"table{next(_counter)}", model, dae.unit(), x, self.knots,
+                            self.spline.c)()
+
+    def apply(self, x, model=None):
+        """Evaluate the table at x, elementwise if x is an array. Numbers and numeric arrays
+        (e.g. simulation output) are evaluated with numpy, and expressions with an external
+        function, which belongs to the given model."""
+        if isinstance(x, np.ndarray) and x.dtype == object:
+            return np.array([self.apply(xi, model) for xi in x], dtype=object)
+        if isinstance(x, (np.ndarray, np.number, float, int)):
+            return self.evaluate(x)
+        if model is None:
+            raise ValueError("A table can only be evaluated in an expression of a model")
+        return self(x, model)
+
+    def evaluate(self, x):
+        """Evaluate the table at a numpy array of points."""
+        return self.spline(np.clip(x, *self.range))
+
+    def size(self):
+        """Number of nodes in the expression tree of the table, that of its external function."""
+        return 1
+
+
+class ExpressionSize:
+    """Counts the nodes of the expression tree built by a function, by evaluating the function
+    with this object as its argument. Constants and variables are one node each.
+    """
+    def __init__(self, *args):
+        self.size = 1 + sum(arg.size if isinstance(arg, ExpressionSize) else 1 for arg in args)
+
+    def _binary(self, other):
+        return ExpressionSize(self, other)
+
+    __add__ = __radd__ = __sub__ = __rsub__ = _binary
+    __mul__ = __rmul__ = __truediv__ = __rtruediv__ = _binary
+    __pow__ = __rpow__ = _binary
+
+    def __neg__(self):
+        return ExpressionSize(self)
+
+    __pos__ = __abs__ = __neg__
+
+    def __getattr__(self, name):
+        # Functions such as np.exp call the method of the same name for objects
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self.__neg__
+
+
+def get_table(func, xmin, xmax, tol):
+    """Get a table of func, reusing an existing table if func has the same values at the
+    knots of the initial table (e.g. for particles of the same material).
+
+    :return: The table
+    """
+    x = np.linspace(xmin, xmax, 4*INITIAL_KNOTS + 1)
+    values = np.asarray(func(x), dtype=float)
+    key = (hashlib.sha1(values.tobytes()).hexdigest(), xmin, xmax, tol)
+    if key not in _cache:
+        _cache[key] = Table(func, xmin, xmax, tol)
+    return _cache[key]
+
+
+def tabulate_muRfunc(muRfunc, muR_ref, tol, yrange=Y_RANGE, name="", model=None):
+    """Replace a homogeneous chemical potential function muR(y) (and its activity, if any) by
+    tables. The accuracy of the tables is verified against the analytic function, and the size
+    of their expressions is compared to that of the analytic function. The analytic function is
+    used if the function is not finite in the range of the tables, if the tables are not within
+    the tolerance, or if they are not smaller.
+
+    :param muRfunc: Material function with arguments (y, ybar, muR_ref)
+    :param float muR_ref: Offset of the chemical potential, as used in the simulation
+    :param float tol: Absolute tolerance of muR (and of ln(actR))
+    :param tuple yrange: Range of filling fractions of the tables
+    :param str name: Name used in the report
+    :param model: Model of the equations the function is used in, to which the external
+        functions of the tables belong
+
+    :return: Function with the same arguments as muRfunc
+    """
+    def muR(y):
+        return muRfunc(y, 0.5, muR_ref)[0]
+
+    def lnactR(y):
+        return np.log(muRfunc(y, 0.5, muR_ref)[1])
+
+    # Only functions of the local filling fraction can be tabulated, e.g. not those with
+    # gradient terms or a dependence on the average filling fraction
+    y = np.linspace(*yrange, 5)
+    try:
+        pointwise = np.array([muRfunc(y[i:i+1], 0.5, muR_ref)[0][0] for i in range(len(y))])
+        # Values that are not finite are checked with the table
+        homogeneous = (np.allclose(muR(y), pointwise, rtol=0, atol=tol, equal_nan=True)
+                       and np.allclose(muRfunc(y, 0.25, muR_ref)[0], muR(y), rtol=0, atol=tol,
+                                       equal_nan=True))
+    except TypeError:
+        # Non-homogeneous terms are computed with arrays of objects
+        homogeneous = False
+    if not homogeneous:
+        raise ValueError(f"muR of {name} is not a function of the local filling fraction "
+                         "only, and cannot be tabulated")
+    try:
+        tables = [get_table(muR, *yrange, tol)]
+        if muRfunc(y, 0.5, muR_ref)[1] is not None:
+            tables.append(get_table(lnactR, *yrange, tol))
+    except ValueError as e:
+        if name not in _reported:
+            print(f"muR table of {name}: {e}, using the analytic function")
+            _reported.add(name)
+        return muRfunc
+
+    max_error = max(table.max_error for table in tables)
+    y_size = ExpressionSize()
+    muR_size, actR_size = muRfunc(np.array([y_size]), 0.5, muR_ref)
+    size = _expression_size(muR_size[0]) + (0 if actR_size is None else actR_size[0].size)
+    # The activity is the exponential of its table
+    table_size = sum(table.size() for table in tables) + (len(tables) - 1)
+    report = (f"muR table of {name}: {len(tables[0].knots)} knots, max. error {max_error:.3g}, "
+              f"expression nodes per point {size} -> {table_size}")
+    # The table is only used if it is accurate and smaller than the analytic function
+    if max_error > tol:
+        report += f", not accurate enough (tolerance {tol:.3g}), using the analytic function"
+    elif table_size >= size:
+        report += ", not smaller, using the analytic function"
+    if tables[0] not in _reported:
+        print(report)
+        _reported.add(tables[0])
+    if max_error > tol or table_size >= size:
+        return muRfunc
+
+    def tabulated_muRfunc(y, ybar, muR_ref):
+        if len(tables) == 1:
+            return tables[0].apply(y, model), None
+        return tables[0].apply(y, model), np.exp(tables[1].apply(y, model))
+    return tabulated_muRfunc
+
+
+def tabulate_elyte_functions(functions, T, tol, crange, name=""):
+    """Replace the transport functions of a Stefan-Maxwell electrolyte, f(c, T), by tables in
+    the concentration at a fixed temperature. Each table is verified against its function, and
+    the size of their expressions is compared. A function is kept if it is not finite in the
+    range of the table, if its table is not within the tolerance, or if it is not smaller.
+
+    :param functions: Functions of (c, T), e.g. D, sigma, thermodynamic factor and tp0
+    :param float T: Temperature of the simulation (nondimensional)
+    :param float tol: Tolerance, relative to the largest absolute value of each function
+    :param tuple crange: Range of concentrations of the tables (nondimensional)
+    :param str name: Name used in the report
+
+    :return: List of functions with arguments (c, T, model=None), of which T must be the given
+        temperature. Tables evaluated in expressions need the model of the equations.
+    """
+    out = []
+    for function in functions:
+        def func(c, function=function):
+            return function(c, T) + 0*c
+        scale = np.max(np.abs(func(np.linspace(*crange, 4*INITIAL_KNOTS + 1))))
+        try:
+            table = get_table(func, *crange, tol*scale if scale > 0 else tol)
+        except ValueError as e:
+            if (name, function.__name__) not in _reported:
+                print(f"{name} {function.__name__} table: {e}, using the function")
+                _reported.add((name, function.__name__))
+            out.append(function)
+            continue
+        size = _expression_size(function(ExpressionSize(), T))
+        table_size = table.size()
+        report = (f"{name} {function.__name__} table: {len(table.knots)} knots, max. relative "
+                  f"error {table.max_error/scale if scale > 0 else table.max_error:.3g}, "
+                  f"expression nodes {size} -> {table_size}")
+        if table.max_error > table.tol:
+            report += f", not accurate enough (tolerance {tol:.3g}), using the function"
+        elif table_size >= size:
+            report += ", not smaller, using the function"
+        if (name, function.__name__, table) not in _reported:
+            print(report)
+            _reported.add((name, function.__name__, table))
+        if table.max_error > table.tol or table_size >= size:
+            out.append(function)
+        else:
+            out.append(_tabulated_function(table))
+    return out
+
+
+def _tabulated_function(table):
+    """Function of (c, T) that evaluates a table in c, with the table as its attribute."""
+    def tabulated_function(c, T, model=None):
+        return table.apply(c, model)
+    tabulated_function.table = table
+    return tabulated_function
+
+
+def _finite(values):
+    """Values of a function as a float array, which must be finite to be tabulated."""
+    values = np.asarray(values, dtype=float)
+    if not np.all(np.isfinite(values)):
+        raise ValueError("The function is not finite in the range of the table")
+    return values
+
+
+def _expression_size(value):
+    """Number of nodes of an expression evaluated with :class:`ExpressionSize`."""
+    return value.size if isinstance(value, ExpressionSize) else 1
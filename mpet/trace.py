@@ -0,0 +1,172 @@
+"""Recording of expressions, to build the same equations for several models or domains.
+
+The equations of the particles of a :class:`mpet.mod_electrodes.ModParticleBank` are declared
+once for each group of particles, distributed over the particles of the group. Their variables
+are indexed with the distributed equation domain info (DEDI) of the equation, which can only be
+used in the equation it belongs to. Instead of building all equations of a particle again for
+each equation, the equations are built once with :class:`Traced` expressions, of which the
+leaves are the variables and parameters. These are replayed for each equation, with the leaves
+resolved for the group and equation being declared (see :func:`replay`).
+
+Functions that only accept daetools expressions or numbers (see :data:`DEFERRED_FUNCTIONS`) are
+applied when the expressions are replayed. Any other use of a traced expression as a number,
+e.g. in a condition, raises a TypeError.
+"""
+import contextlib
+import functools
+import importlib
+import operator
+
+import numpy as np
+
+#: Functions which are applied to traced expressions when they are replayed: (module, name)
+DEFERRED_FUNCTIONS = [("daetools.pyDAE", "Abs"), ("daetools.pyDAE", "Erf"),
+                      ("daetools.pyDAE", "Exp"), ("daetools.pyDAE", "Log"),
+                      ("daetools.pyDAE", "Max"), ("daetools.pyDAE", "Min"),
+                      ("daetools.pyDAE", "Sqrt"), ("mpet.tables", "Table.__call__")]
+#: Methods of expressions called by the numpy functions of the same name
+METHODS = ["exp", "log", "log10", "sqrt", "sin", "cos", "tan", "arcsin", "arccos", "arctan",
+           "sinh", "cosh", "tanh", "arcsinh", "arccosh", "arctanh"]
+
+
+class Traced:
+    """An expression, recorded as an operation and its arguments, or a leaf.
+
+    :param op: Operation, which is called with the replayed arguments, or for a leaf the
+        function which gives the expression of the leaf for a context (e.g. a group of
+        particles)
+    :param tuple args: Arguments of the operation, traced expressions or constants
+    :param bool leaf: Whether this is a leaf
+    """
+    __slots__ = ("op", "args", "leaf")
+
+    def __init__(self, op, args=(), leaf=False):
+        self.op = op
+        self.args = args
+        self.leaf = leaf
+
+    def _binary(op):
+        def method(self, other):
+            # Arrays apply the operation elementwise
+            if isinstance(other, np.ndarray):
+                return NotImplemented
+            return Traced(op, (self, other))
+
+        def reflected(self, other):
+            if isinstance(other, np.ndarray):
+                return NotImplemented
+            return Traced(op, (other, self))
+        return method, reflected
+
+    __add__, __radd__ = _binary(operator.add)
+    __sub__, __rsub__ = _binary(operator.sub)
+    __mul__, __rmul__ = _binary(operator.mul)
+    __truediv__, __rtruediv__ = _binary(operator.truediv)
+    __pow__, __rpow__ = _binary(operator.pow)
+
+    def __neg__(self):
+        return Traced(operator.neg, (self,))
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Traced(operator.abs, (self,))
+
+    def __bool__(self):
+        raise TypeError("The value of a traced expression is not known")
+
+
+def _method(name):
+    def method(self):
+        return Traced(operator.methodcaller(name), (self,))
+    method.__name__ = name
+    return method
+
+
+for _name in METHODS:
+    setattr(Traced, _name, _method(_name))
+
+
+class TracedVariable:
+    """A variable, of which calling it (or its ``dt`` method) gives a leaf.
+
+    :param get: Function which gives the variable for a context
+    """
+    def __init__(self, get):
+        self.get = get
+
+    def __call__(self, *ind):
+        return Traced(lambda context: self.get(context)(*ind), leaf=True)
+
+    def dt(self, *ind):
+        return Traced(lambda context: self.get(context).dt(*ind), leaf=True)
+
+
+class TracedEquation:
+    """An equation, of which the residual is traced."""
+    def __init__(self, Name, Description=""):
+        self.Name = Name
+        self.Description = Description
+        self.Residual = 0
+
+
+def replay(value, context):
+    """Build the expression of a traced value for a context. Subexpressions that are used
+    several times are built once.
+
+    :param value: Traced expression, or a constant
+    :param context: Context the leaves are resolved for
+    :return: The expression
+    """
+    if not isinstance(value, Traced):
+        return value
+    values = {}
+    # Depth-first, without recursion, as sums over grid points are deep expressions
+    stack = [value]
+    while stack:
+        node = stack[-1]
+        if id(node) in values:
+            stack.pop()
+            continue
+        pending = [arg for arg in node.args
+                   if isinstance(arg, Traced) and id(arg) not in values]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        if node.leaf:
+            values[id(node)] = node.op(context)
+        else:
+            values[id(node)] = node.op(*(values[id(arg)] if isinstance(arg, Traced) else arg
+                                         for arg in node.args))
+    return values[id(value)]
+
+
+def defer(function):
+    """Function that records its application to traced expressions, to apply it when the
+    expression is replayed."""
+    @functools.wraps(function)
+    def deferred(*args):
+        if any(isinstance(arg, Traced) for arg in args):
+            return Traced(function, args)
+        return function(*args)
+    return deferred
+
+
+@contextlib.contextmanager
+def deferred_functions():
+    """Context in which the functions of :data:`DEFERRED_FUNCTIONS` are deferred."""
+    originals = []
+    for module, name in DEFERRED_FUNCTIONS:
+        *path, attribute = name.split(".")
+        owner = functools.reduce(getattr, path, importlib.import_module(module))
+        if hasattr(owner, attribute):
+            originals.append((owner, attribute, getattr(owner, attribute)))
+    try:
+        for owner, attribute, function in originals:
+            setattr(owner, attribute, defer(function))
+        yield
+    finally:
+        for owner, attribute, function in originals:
+            setattr(owner, attribute, function)
@@ -1,13 +1,15 @@
 import subprocess as subp
 
+import contextlib
 import os
-import sys
 import importlib
+import re
+import time
 import numpy as np
 import h5py
 import scipy.io as sio
 
-import daetools.pyDAE as dae
+import mpet.plugins as plugins
 
 
 def mean_linear(a):
@@ -66,8 +68,8 @@ def get_asc_vec(var, Nvol, dt=False):
     for sectn in ["a", "s", "c"]:
         # If we have information within this battery section
         if sectn in var.keys():
-            # If it's an array of dae variable objects
-            if isinstance(var[sectn], dae.pyCore.daeVariable):
+            # If it's a dae variable, which is indexed by calling it
+            if callable(var[sectn]):
                 varout[sectn] = get_var_vec(var[sectn], Nvol[sectn], dt)
             # Otherwise, it's a parameter that varies with electrode section
             else:
@@ -82,21 +84,90 @@ def get_asc_vec(var, Nvol, dt=False):
     return out
 
 
-def get_dxvec(L, Nvol):
-    """Get a vector of cell widths spanning the full cell."""
-    if "a" in Nvol:
-        dxa = Nvol["a"] * [L["a"]/Nvol["a"]]
-    else:
-        dxa = []
-    if "s" in Nvol:
-        dxs = Nvol["s"] * [L["s"]/Nvol["s"]]
-    else:
-        dxs = []
-    dxc = Nvol["c"] * [L["c"]/Nvol["c"]]
-    out = np.array(dxa + dxs + dxc)
+def get_dxvec(L, Nvol, widths=None):
+    """Get a vector of cell widths spanning the full cell. The volumes of each region are
+    uniform, unless their widths relative to the length of the region are given."""
+    def get_region(region):
+        if region not in Nvol:
+            return []
+        if widths is None:
+            return Nvol[region] * [L[region]/Nvol[region]]
+        return list(L[region]*widths[region])
+    out = np.array(get_region("a") + get_region("s") + get_region("c"))
     return out
 
 
+def get_piecewise_linear_segments(tvec, yvec):
+    """Intervals of a quantity that is interpolated linearly in time, as declared by
+    :func:`declare_piecewise_linear_time`. Steps are not represented, so only the first of
+    repeated times is used.
+
+    :param tvec: Increasing times, starting at the beginning of the simulation
+    :param yvec: Values at each time, with shape (len(tvec),) or (len(tvec), N)
+
+    :return: list of (start time, end time, values at the start, slopes) of each interval, and
+        the times and values that are used
+    """
+    tvec = np.asarray(tvec, dtype=float)
+    yvec = np.asarray(yvec, dtype=float)
+    keep = np.diff(tvec, prepend=-np.inf) > 0
+    tvec, yvec = tvec[keep], yvec[keep]
+    segments = [(tvec[k], tvec[k+1], yvec[k], (yvec[k+1] - yvec[k])/(tvec[k+1] - tvec[k]))
+                for k in range(len(tvec) - 1)]
+    return segments, tvec, yvec
+
+
+def declare_piecewise_linear_time(model, tvec, yvec, declare_equations, eventTolerance=1.e-3,
+                                  yafter=None):
+    """Declare the equations of a quantity that is interpolated linearly in time.
+    The equations are a state transition network with one state per interval of tvec, in which
+    only the line through the ends of the interval is evaluated, so the cost of the equations
+    does not grow with the number of times (see :func:`get_piecewise_linear_segments`).
+
+    :param model: Model with the equations, which provides IF, ELSE_IF, ELSE, END_IF and
+        CreateEquation
+    :param tvec: Increasing times, starting at the beginning of the simulation
+    :param yvec: Values at each time, with shape (len(tvec),) or (len(tvec), N)
+    :param declare_equations: Function that declares the equations for the value of the quantity
+        in a state, an expression or array of N expressions if yvec is 2D
+    :param yafter: Values after the last time, the last values of yvec if None
+    """
+    # daetools is only imported here, so that the other functions can be used without it
+    import daetools.pyDAE as dae
+    from pyUnits import s
+
+    segments, tvec, yvec = get_piecewise_linear_segments(tvec, yvec)
+    if yafter is None:
+        yafter = yvec[-1]
+    yafter = np.broadcast_to(np.asarray(yafter, dtype=float), yvec.shape[1:])
+
+    def line(t0, y0, slope):
+        if yvec.ndim == 2:
+            return np.array([float(y) + float(dy)*(dae.Time() - float(t0))
+                             for y, dy in zip(y0, slope)], dtype=object)
+        return float(y0) + float(slope)*(dae.Time() - float(t0))
+
+    def constant(y):
+        if yvec.ndim == 2:
+            return np.array([dae.Constant(float(yi)) for yi in y], dtype=object)
+        return dae.Constant(float(y))
+
+    if not segments:
+        # A single value is constant
+        declare_equations(constant(yvec[0]))
+        return
+    for k, (t0, t1, y0, slope) in enumerate(segments):
+        condition = dae.Time() < dae.Constant(float(t1)*s)
+        if k == 0:
+            model.IF(condition, eventTolerance)
+        else:
+            model.ELSE_IF(condition, eventTolerance)
+        declare_equations(line(t0, y0, slope))
+    model.ELSE()
+    declare_equations(constant(yafter))
+    model.END_IF()
+
+
 def get_git_info(local_dir, shell=False):
     commit_hash = subp.check_output(['git', '-C', local_dir, 'rev-parse', '--short', 'HEAD'],
                                     stderr=subp.STDOUT, universal_newlines=True, shell=shell)
@@ -122,6 +193,38 @@ def open_data_file(dataFile):
     return data
 
 
+class MergedParticleData:
+    """Output data of a simulation with merged particles whose output is only written under the
+    keys of the representative particles (``expandMergedOutput = false``). The keys of a merged
+    particle give the output of the particle that represents it, as if the output was expanded.
+    """
+    particle = re.compile(r"partTrode(\w)vol(\d+)part(\d+)")
+
+    def __init__(self, data, partRep):
+        """
+        :param data: Output data, as returned by :func:`open_data_file`
+        :param dict partRep: Representative particle of each particle in each electrode
+        """
+        self.data = data
+        self.partRep = partRep
+
+    def __getitem__(self, key):
+        match = self.particle.search(key)
+        if match and key not in self.data:
+            trode, vInd, pInd = match.group(1), int(match.group(2)), int(match.group(3))
+            rep = self.partRep[trode][vInd, pInd]
+            key = "{pre}partTrode{trode}vol{vInd}part{rep}{post}".format(
+                pre=key[:match.start()], trode=trode, vInd=vInd, rep=rep, post=key[match.end():])
+        return self.data[key]
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+
 def get_dict_key(data, string, squeeze=True, final=False):
     """Gets the values in a 1D array, which is formatted slightly differently
     depending on whether it is a h5py file or a mat file
@@ -139,9 +242,25 @@ def get_dict_key(data, string, squeeze=True, final=False):
         return data[string][...]
 
 
+def parse_size(size):
+    """
+    Parse a memory size with an optional K, M or G suffix (powers of 1024), e.g. ``4G``.
+
+    :param str size: Memory size
+    :return: size in bytes (int)
+    """
+    size = str(size).strip().upper()
+    factor = 1
+    if size and size[-1] in 'KMG':
+        factor = 1024**('KMG'.index(size[-1]) + 1)
+        size = size[:-1]
+    return int(float(size) * factor)
+
+
 def import_function(filename, function, mpet_module=None):
     """Load a function from a file that is not part of MPET, with a fallback to MPET internal
-    functions.
+    functions. Material, reaction, diffusion and electrolyte functions should be obtained from
+    :func:`mpet.plugins.get_function` instead, which only loads them once.
 
     :param Config config: MPET configuration
     :param str filename: .py file containing the function to import. None to load from mpet_module
@@ -154,21 +273,61 @@ def import_function(filename, function, mpet_module=None):
     if filename is None:
         # no filename set, load function from mpet itself
         module = importlib.import_module(mpet_module)
-    else:
-        # Import module  which contains the function we seek,
-        # we need to call import_module because the module import is dependent
-        # on a variable name.
-        # sys.path is used to temporarily have only the folder containig the module we
-        # need to import in the Python search path for imports
-        # the following lines can be interpreted as "import <module_name>"
-        folder = os.path.dirname(os.path.abspath(filename))
-        module_name = os.path.splitext(os.path.basename(filename))[0]
-        old_path = sys.path
-        sys.path = [folder]
-        module = importlib.import_module(module_name)
-        sys.path = old_path
-
-    # import the function from the module
-    callable_function = getattr(module, function)
-
-    return callable_function
+        # import the function from the module
+        return getattr(module, function)
+    # Load the file as a separate module, without modifying the Python search path
+    return plugins.load_function_from_file(filename, function)
+
+
+class PhaseTimer:
+    """Records the wall clock time spent in each phase of a simulation, in seconds."""
+
+    def __init__(self):
+        self.timings = {}
+        self._starts = {}
+
+    def start(self, phase):
+        self._starts[phase] = time.perf_counter()
+
+    def stop(self, phase):
+        elapsed = time.perf_counter() - self._starts.pop(phase)
+        # A phase that occurs multiple times accumulates its time
+        self.timings[phase] = self.timings.get(phase, 0.) + elapsed
+
+    @contextlib.contextmanager
+    def phase(self, phase):
+        """Time the enclosed block of code as the given phase."""
+        self.start(phase)
+        try:
+            yield
+        finally:
+            self.stop(phase)
+
+
+def get_model_sizes(model, sizes=None):
+    """Count the models, equations and variables of a model and its sub-models, per model type.
+    Each point of a distributed equation or variable counts separately. The equations of the
+    states of a state transition network (e.g. IF/ELSE blocks) are counted once, as every state
+    has the same number of equations. This is only available after the simulation is initialized.
+
+    :param model: daeModel to count
+    :param dict sizes: Counts to add to (optional)
+
+    :return: dict of {model type: {"models": int, "equations": int, "variables": int}}
+    """
+    if sizes is None:
+        sizes = {}
+    size = sizes.setdefault(type(model).__name__, {"models": 0, "equations": 0, "variables": 0})
+    size["models"] += 1
+    size["equations"] += sum(len(eq.EquationExecutionInfos) for eq in model.Equations)
+    for stn in model.STNs:
+        if len(stn.States) > 0:
+            size["equations"] += sum(len(eq.EquationExecutionInfos)
+                                     for eq in stn.States[0].Equations)
+    variables = list(model.Variables)
+    for port in model.Ports:
+        variables += list(port.Variables)
+    size["variables"] += sum(var.NumberOfPoints for var in variables)
+    for submodel in model.Models:
+        get_model_sizes(submodel, sizes)
+    return sizes
@@ -29,7 +29,8 @@ setuptools.setup(
     extras_require={'test':['pytest','coverage', 'coveralls', 'flake8'],
                     'doc':['sphinx','sphinx_rtd_theme']},
     python_requires='>=3.6',
-    scripts=['bin/mpetrun.py','bin/mpetplot.py'],
+    scripts=['bin/mpetrun.py','bin/mpetplot.py','bin/mpetsweep.py',
+             'bin/mpetcache.py'],
     classifiers=[
         "Programming Language :: Python :: 3",
     ],
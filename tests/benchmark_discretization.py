@@ -0,0 +1,60 @@
+"""Microbenchmark of the particle discretization operators against the previous implementation,
+which rebuilt the mass matrix, grid and areas for every particle and multiplied the mass matrix
+with the concentrations row by row.
+
+Run from the repository root with ``PYTHONPATH=. python tests/benchmark_discretization.py``.
+The time per particle is that of the operations done while building the equations of a particle,
+with daetools adoubles as concentrations.
+"""
+import timeit
+
+import daetools.pyDAE as dae
+import numpy as np
+
+import mpet.geometry as geo
+from mpet.mod_electrodes import MX, MX_banded
+
+SHAPES = ["sphere", "cylinder"]
+SIZES = [10, 50, 200]
+MESHES = [("uniform", 1.), ("geometric", 10.)]
+
+
+def reference(shape, N, mesh, ratio, c):
+    """Operators and mass matrix product as computed before the cache"""
+    Mmat = geo.get_Mmat(shape, N, mesh, ratio)
+    dr, edges = geo.get_dr_edges(shape, N, mesh, ratio)
+    if shape == "sphere":
+        area_vec = 4*np.pi*edges**2
+    elif shape == "cylinder":
+        area_vec = 2*np.pi*edges
+    return MX(Mmat, c), dr, area_vec
+
+
+def new(shape, N, mesh, ratio, c):
+    disc = geo.get_solid_disc(shape, N, mesh, ratio)
+    return MX_banded(disc["Mbands"], c), disc["dr"], disc["area_vec"]
+
+
+def main():
+    print(f"{'shape':9} {'mesh':10} {'N':>4} {'previous (ms)':>14} {'new (ms)':>9} "
+          f"{'speedup':>8} {'max. rel. diff':>15}")
+    for shape in SHAPES:
+        for mesh, ratio in MESHES:
+            for N in SIZES:
+                rng = np.random.default_rng(0)
+                c = np.array([dae.adouble(x) for x in rng.uniform(0.01, 0.99, N)],
+                             dtype=object)
+                number = max(1, 2000 // N)
+                t_ref = timeit.timeit(lambda: reference(shape, N, mesh, ratio, c),
+                                      number=number)/number
+                t_new = timeit.timeit(lambda: new(shape, N, mesh, ratio, c),
+                                      number=number)/number
+                M_ref = np.array([x.Value for x in reference(shape, N, mesh, ratio, c)[0]])
+                M_new = np.array([x.Value for x in new(shape, N, mesh, ratio, c)[0]])
+                diff = np.max(np.abs(M_new - M_ref)/np.abs(M_ref))
+                print(f"{shape:9} {mesh:10} {N:4d} {1e3*t_ref:14.3f} {1e3*t_new:9.3f} "
+                      f"{t_ref/t_new:8.1f} {diff:15.2e}")
+
+
+if __name__ == "__main__":
+    main()
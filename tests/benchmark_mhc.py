@@ -0,0 +1,85 @@
+"""Microbenchmark of the MHC and CIET reaction rates against the previous implementation, which
+evaluated both rate constants of each surface element separately.
+
+Run from the repository root with ``PYTHONPATH=. python tests/benchmark_mhc.py``.
+The rates are evaluated for arrays of numbers and, as in the simulation, of daetools adoubles.
+"""
+import timeit
+
+import daetools.pyDAE as dae
+import numpy as np
+
+from mpet.electrode.reactions.CIET import CIET
+from mpet.electrode.reactions.MHC import MHC
+from mpet.electrode.reactions.MHC_kfunc import MHC_kfunc
+
+LMBDA = 8.3
+T = 1.
+K0 = 1.
+SIZES = [1, 10, 100, 1000]
+
+
+def MHC_reference(eta, c_sld, c_lyte, k0, E_A, T, act_R=None,
+                  act_lyte=None, lmbda=None, alpha=None):
+    """MHC rate as implemented before the rate constants were combined"""
+    k0 = k0/MHC_kfunc(0., lmbda)
+    eta_f = eta + T*np.log(c_lyte/c_sld)
+    gamma_ts = 1./(1. - c_sld)
+    alpha = 0.5
+    ecd_extras = act_lyte**(1-alpha) * act_R**(alpha) / (gamma_ts*np.sqrt(c_lyte*c_sld))
+    Rate = np.empty(len(eta), dtype=object)
+    for i, etaval in enumerate(eta):
+        krd = k0*MHC_kfunc(-eta_f[i], lmbda)
+        kox = k0*MHC_kfunc(eta_f[i], lmbda)
+        Rate[i] = ecd_extras[i]*(krd*c_lyte - kox*c_sld[i])
+    return Rate
+
+
+def CIET_reference(eta, c_sld, c_lyte, k0, E_A, T, act_R=None,
+                   act_lyte=None, lmbda=None, alpha=None):
+    """CIET rate as implemented before the rate constants were combined"""
+    eta_f = eta + T*np.log(c_lyte/c_sld)
+    ecd_extras = (1-c_sld)/np.sqrt(4.0*np.pi*lmbda)
+    Rate = np.empty(len(eta), dtype=object)
+    for i, etaval in enumerate(eta):
+        krd = k0*MHC_kfunc(-eta_f[i], lmbda)
+        kox = k0*MHC_kfunc(eta_f[i], lmbda)
+        Rate[i] = ecd_extras[i]*(krd*c_lyte - kox*c_sld[i])
+    return Rate
+
+
+def get_args(N, adouble):
+    rng = np.random.default_rng(0)
+    eta = rng.uniform(-10., 10., N)
+    c_sld = rng.uniform(0.01, 0.99, N)
+    c_lyte = 1.
+    if adouble:
+        eta = np.array([dae.adouble(x) for x in eta], dtype=object)
+        c_sld = np.array([dae.adouble(x) for x in c_sld], dtype=object)
+    act_R = c_sld/(1-c_sld)
+    return (eta, c_sld, c_lyte, K0, 0., T, act_R, c_lyte, LMBDA, 0.5)
+
+
+def value(x):
+    return x.Value if isinstance(x, dae.pyCore.adouble) else x
+
+
+def main():
+    print(f"{'function':8} {'values':8} {'N':>5} {'previous (ms)':>14} {'new (ms)':>9} "
+          f"{'speedup':>8} {'max. rel. diff':>15}")
+    for name, new, reference in [("MHC", MHC, MHC_reference), ("CIET", CIET, CIET_reference)]:
+        for adouble in [False, True]:
+            for N in SIZES:
+                args = get_args(N, adouble)
+                number = max(1, 1000 // N)
+                t_ref = timeit.timeit(lambda: reference(*args), number=number)/number
+                t_new = timeit.timeit(lambda: new(*args), number=number)/number
+                r_ref = np.array([value(x) for x in reference(*args)], dtype=float)
+                r_new = np.array([value(x) for x in new(*args)], dtype=float)
+                diff = np.max(np.abs(r_new - r_ref)/np.maximum(np.abs(r_ref), 1e-300))
+                print(f"{name:8} {'adouble' if adouble else 'float':8} {N:5d} "
+                      f"{1e3*t_ref:14.3f} {1e3*t_new:9.3f} {t_ref/t_new:8.1f} {diff:15.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark of the ramped segments and the noise of the solid dynamics against the previous
+implementation, which declared them as a single expression of the simulation time with one
+``Max`` term per time, evaluated in every residual evaluation.
+
+Run from the repository root with ``PYTHONPATH=. python tests/benchmark_piecewise_linear.py``.
+Each test is simulated with both implementations, for a number of noise times (``numnoise``) or
+segments. The script prints the time to initialize (build) and run the model, the number of
+integration steps and the largest difference in cell voltage.
+"""
+import json
+import os
+import os.path as osp
+import shutil
+import tempfile
+from unittest import mock
+
+import daetools.pyDAE as dae
+import numpy as np
+
+import mpet.main
+import mpet.utils as utils
+import tests.test_defs as defs
+
+REFDIR = osp.join(osp.dirname(osp.abspath(__file__)), "ref_outputs")
+# (test, {cfg file: {(section, option): value}}) of each variant
+CASES = [("test004", {"params_c.cfg": {("Material", "numnoise"): str(numnoise)}})
+         for numnoise in [25, 100, 400]]
+CASES += [(test, {}) for test in ["test014", "test015"]]
+
+
+def declare_piecewise_linear_time_reference(model, tvec, yvec, declare_equations,
+                                            eventTolerance=1.e-3, yafter=None):
+    """Piecewise linear function of time as implemented before the state transition network,
+    y(t) = y_0 + sum_k ds_k*max(0, t - t_k), where ds_k is the change in slope at time t_k.
+    It keeps the last values after the last time, which the simulations do not reach."""
+    tvec = np.asarray(tvec, dtype=float)
+    yvec = np.asarray(yvec, dtype=float)
+    keep = np.diff(tvec, prepend=-np.inf) > 0
+    tvec, yvec = tvec[keep], yvec[keep]
+    slopes = np.diff(yvec, axis=0)/np.diff(tvec).reshape((-1,) + (1,)*(yvec.ndim - 1))
+    zeros = np.zeros((1,) + yvec.shape[1:])
+    dslopes = np.diff(slopes, axis=0, prepend=zeros, append=zeros)
+
+    def expression(y0, dslope):
+        expr = dae.Constant(float(y0))
+        for tk, ds in zip(tvec, dslope):
+            if ds != 0:
+                expr = expr + float(ds)*dae.Max(0., dae.Time() - float(tk))
+        return expr
+    if yvec.ndim == 2:
+        declare_equations(np.array([expression(yvec[0, i], dslopes[:, i])
+                                    for i in range(yvec.shape[1])], dtype=object))
+    else:
+        declare_equations(expression(yvec[0], dslopes))
+
+
+def run(testStr, changes, reference, workDir):
+    """Simulate a test with one of the implementations.
+
+    :return: times, voltage, number of integration steps, initialization and run time (s)
+    """
+    simDir = osp.join(workDir, f"{testStr}_{len(os.listdir(workDir))}")
+    os.makedirs(simDir)
+    refDir = osp.join(REFDIR, testStr)
+    for f in os.listdir(refDir):
+        if f.endswith(".cfg"):
+            P = defs.get_config(osp.join(refDir, f))
+            for (section, option), value in changes.get(f, {}).items():
+                P.set(section, option, value)
+            defs.write_config_file(P, osp.join(simDir, f))
+
+    cwd = os.getcwd()
+    os.chdir(simDir)
+    try:
+        if reference:
+            with mock.patch.object(utils, "declare_piecewise_linear_time",
+                                   declare_piecewise_linear_time_reference):
+                mpet.main.main(osp.join(simDir, "params_system.cfg"), keepArchive=False)
+        else:
+            mpet.main.main(osp.join(simDir, "params_system.cfg"), keepArchive=False)
+    finally:
+        os.chdir(cwd)
+    outDir = osp.join(simDir, "sim_output")
+    data = utils.open_data_file(osp.join(outDir, "output_data"))
+    times = np.squeeze(utils.get_dict_key(data, "phi_applied_times"))
+    voltage = np.squeeze(utils.get_dict_key(data, "phi_applied"))
+    with open(osp.join(outDir, "run_timings.json")) as fi:
+        phases = json.load(fi)["phases"]
+    try:
+        steps = int(np.sum(utils.get_dict_key(data, "solver_stats_NumSteps")))
+    except KeyError:
+        steps = -1
+    return (times, voltage, steps, phases.get("Initialize", np.nan),
+            phases.get("Run", np.nan))
+
+
+def main():
+    workDir = tempfile.mkdtemp(prefix="mpet_piecewise_linear_")
+    print(f"{'test':8} {'variant':14} {'init prev (s)':>13} {'init new (s)':>12} "
+          f"{'run prev (s)':>12} {'run new (s)':>11} {'steps prev':>10} {'steps new':>9} "
+          f"{'max dV':>9}")
+    for testStr, changes in CASES:
+        tRef, vRef, stepsRef, initRef, runRef = run(testStr, changes, True, workDir)
+        tNew, vNew, stepsNew, initNew, runNew = run(testStr, changes, False, workDir)
+        common = tRef <= tNew[-1]
+        dV = np.max(np.abs(np.interp(tRef[common], tNew, vNew) - vRef[common]))
+        variant = ",".join(f"{option}={value}" for fileChanges in changes.values()
+                           for (_, option), value in fileChanges.items())
+        print(f"{testStr:8} {variant or '-':14} {initRef:13.2f} {initNew:12.2f} "
+              f"{runRef:12.2f} {runNew:11.2f} {stepsRef:10d} {stepsNew:9d} {dV:9.2e}")
+    shutil.rmtree(workDir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Accuracy and cost of the quasi-steady electrolyte (``elyteQuasiSteady``) compared to the full
+electrolyte model, on the benchmarks in ``tests/ref_outputs``.
+
+Each benchmark is simulated with both electrolyte models. The script prints the largest
+difference in cell voltage (in mV) and in final capacity, and the number of integration steps
+and run time of each model.
+
+Run from the repository root with ``PYTHONPATH=. python tests/compare_quasisteady.py``.
+Other benchmarks or tests can be given as arguments.
+"""
+import json
+import os
+import os.path as osp
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+import mpet.main
+import mpet.utils as utils
+from mpet.config import constants
+
+BENCHMARKS = ["benchmark_Doyle96-cell1", "benchmark_Doyle96-cell2", "benchmark_Fuller94"]
+REFDIR = osp.join(osp.dirname(osp.abspath(__file__)), "ref_outputs")
+
+
+def run(testStr, quasiSteady, workDir):
+    """Simulate a benchmark with the given electrolyte model.
+
+    :return: times, cell voltage (V, up to a constant offset), number of integration steps,
+        run time (s)
+    """
+    simDir = osp.join(workDir, f"{testStr}_{'quasisteady' if quasiSteady else 'full'}")
+    os.makedirs(simDir)
+    refDir = osp.join(REFDIR, testStr)
+    for f in os.listdir(refDir):
+        if f.endswith(".cfg"):
+            shutil.copyfile(osp.join(refDir, f), osp.join(simDir, f))
+    cfgfile = osp.join(simDir, "params_system.cfg")
+    with open(cfgfile) as fi:
+        cfg = fi.read()
+    with open(cfgfile, "w") as fo:
+        fo.write(cfg.replace("[Electrolyte]\n",
+                             f"[Electrolyte]\nelyteQuasiSteady = {quasiSteady}\n"))
+
+    cwd = os.getcwd()
+    os.chdir(simDir)
+    try:
+        mpet.main.main(osp.join(simDir, "params_system.cfg"), keepArchive=False)
+    finally:
+        os.chdir(cwd)
+    outDir = osp.join(simDir, "sim_output")
+    data = utils.open_data_file(osp.join(outDir, "output_data"))
+    times = np.squeeze(utils.get_dict_key(data, "phi_applied_times"))
+    voltage = -(constants.k*constants.T_ref/constants.e) \
+        * np.squeeze(utils.get_dict_key(data, "phi_applied"))
+    with open(osp.join(outDir, "run_timings.json")) as fi:
+        timings = json.load(fi)
+    try:
+        steps = int(np.sum(utils.get_dict_key(data, "solver_stats_NumSteps")))
+    except KeyError:
+        steps = -1
+    return times, voltage, steps, timings["phases"].get("Run", np.nan)
+
+
+def main(tests):
+    workDir = tempfile.mkdtemp(prefix="mpet_quasisteady_")
+    results = []
+    for testStr in tests:
+        tFull, vFull, stepsFull, timeFull = run(testStr, False, workDir)
+        tQS, vQS, stepsQS, timeQS = run(testStr, True, workDir)
+        # Compare the voltage over the time both simulations ran
+        common = tFull <= tQS[-1]
+        dV = np.max(np.abs(np.interp(tFull[common], tQS, vQS) - vFull[common]))
+        dCap = (tQS[-1] - tFull[-1])/tFull[-1]
+        results.append((testStr, 1e3*dV, 100*dCap, stepsFull, stepsQS, timeFull, timeQS))
+    print(f"\n{'benchmark':26} {'max dV (mV)':>11} {'dCap (%)':>9} {'steps full':>10} "
+          f"{'steps qs':>9} {'run full (s)':>12} {'run qs (s)':>11}")
+    for testStr, dV, dCap, stepsFull, stepsQS, timeFull, timeQS in results:
+        print(f"{testStr:26} {dV:11.2f} {dCap:9.2f} {stepsFull:10d} {stepsQS:9d} "
+              f"{timeFull:12.2f} {timeQS:11.2f}")
+    shutil.rmtree(workDir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or BENCHMARKS)
@@ -52,6 +52,13 @@ def pytest_collection_modifyitems(config, items):
                 item.add_marker(skip_analytic)
 
 
+def equivalenceTests():
+    """Tests compared to the output of another test, see tests.test_defs"""
+    # Imported here, as it requires daetools
+    import tests.test_defs as defs
+    return defs.equivalenceTests
+
+
 def pytest_generate_tests(metafunc):
     if "Dirs" in metafunc.fixturenames:
         dir_t = metafunc.config.getoption("modDir")
@@ -73,7 +80,20 @@ def pytest_generate_tests(metafunc):
             tests_str = " ".join(metafunc.config.getoption("tests"))
             tests_lst = tests_str.split()
             metafunc.parametrize("Dirs", [(dir_b + "/" + test, dir_t + "/" + test)
-                                          for test in tests_lst])
+                                          for test in tests_lst
+                                          if test not in equivalenceTests()])
+    if "equivalenceDirs" in metafunc.fixturenames:
+        # Output of the test and the reference output of the test it is compared to
+        dir_t = metafunc.config.getoption("modDir")
+        dir_b = metafunc.config.getoption("baseDir")
+        tests_lst = " ".join(metafunc.config.getoption("tests")).split()
+        tests = {test: ref for test, (ref, _) in sorted(equivalenceTests().items())
+                 if not tests_lst or test in tests_lst}
+        # A reference that is a variant of a test is run within the output of the test
+        metafunc.parametrize("equivalenceDirs",
+                             [(osp.join(dir_t, test, "reference") if isinstance(ref, tuple)
+                               else osp.join(dir_b, ref), osp.join(dir_t, test))
+                              for test, ref in tests.items()], ids=list(tests))
     if "tol" in metafunc.fixturenames:
         metafunc.parametrize("tol", [float(metafunc.config.getoption("tolerance"))])
     if "testDir" in metafunc.fixturenames:
@@ -10,6 +10,71 @@ import mpet.main as main
 import re
 
 
+#: Tolerance of the average concentration of the three-parameter polynomial profile model in
+#: the analytical test, relative to the concentration step. The approximation deviates most
+#: from the analytical solution shortly after the potential step.
+polyTol = 0.08
+
+
+#: Tests of options that do not change the solution, beyond the tolerance of the solver. Each
+#: is run with the config files of a test in ref_outputs with some parameters changed, and its
+#: output is compared to the reference output of that test:
+#: {name: (reference test, {config file: {(section, parameter): value}})}
+#: The reference can also be a variant of a test, (test, changes), which is run as well, and
+#: the changes of the test are applied on top of those of the reference.
+identicalParticles = ("test008", {"params_system.cfg": {("Particles", "stddev_c"): "0"}})
+# test019 at a rate and duration at which the electrolyte concentration follows the current
+slowElectrolyte = ("test019", {"params_system.cfg": {("Sim Params", "Crate"): "0.1",
+                                                     ("Sim Params", "tend"): "1.2e4"}})
+equivalenceTests = {
+    # Particles of different sizes in several electrolyte volumes
+    "testParticleBank": (
+        "test008", {"params_system.cfg": {("Sim Params", "particleBank"): "true"}}),
+    # Diffusion in the particles of the anode, and homogeneous particles in the cathode
+    "testParticleBankDiffn": (
+        "test012", {"params_system.cfg": {("Sim Params", "particleBank"): "true"}}),
+    # Particles using the cell variables instead of ports, with two electrodes
+    "testReduceModel": (
+        "test012", {"params_system.cfg": {("Sim Params", "reduceModel"): "true"}}),
+    # Reduced model with film resistance
+    "testReduceModelRfilm": (
+        "test018", {"params_system.cfg": {("Sim Params", "reduceModel"): "true"}}),
+    # Noise of the solid dynamics, declared for each particle of the bank, compared to the
+    # particle models with the same noise
+    "testNoiseParticleBank": (
+        ("test010", {}), {"params_system.cfg": {("Sim Params", "particleBank"): "true"}}),
+    # Identical particles in several electrolyte volumes, simulated once per volume
+    "testMergeParticles": (
+        identicalParticles, {"params_system.cfg": {("Sim Params", "mergeParticles"): "true"}}),
+    # Only the output of the simulated particles is written
+    "testMergeParticlesCompact": (
+        identicalParticles, {"params_system.cfg": {
+            ("Sim Params", "mergeParticles"): "true",
+            ("Sim Params", "expandMergedOutput"): "false"}}),
+    # Evaluation modes of the residuals and Jacobian in daetools, which are compared to the
+    # default mode of the reference, and so to each other
+    "testEvaluationComputeStack": (
+        "test008", {"params_system.cfg": {
+            ("Sim Params", "evaluationMode"): "computeStack_OpenMP"}}),
+    "testEvaluationTree": (
+        "test008", {"params_system.cfg": {
+            ("Sim Params", "evaluationMode"): "evaluationTree_OpenMP"}}),
+    "testEvaluationAuto": (
+        "test008", {"params_system.cfg": {("Sim Params", "evaluationMode"): "auto"}}),
+    # Iterative linear solver with the block-Jacobi preconditioner, compared to the direct solver
+    # (SuperLU) of the reference. Skipped if the preconditioner (Trilinos) is not installed.
+    "testGMRES": (
+        "test008", {"params_system.cfg": {("Solver", "linearSolverMethod"): "GMRES"}}),
+    # Quasi-steady Stefan-Maxwell electrolyte, compared to the full electrolyte model
+    "testElyteQuasiSteady": (
+        slowElectrolyte, {"params_system.cfg": {("Electrolyte", "elyteQuasiSteady"): "true"}}),
+}
+#: Tolerance of the equivalence tests of approximations, which replaces the tolerance of the
+#: comparison if it is larger. The quasi-steady electrolyte neglects the relaxation of the
+#: electrolyte at the start of the simulation.
+equivalenceTolerances = {"testElyteQuasiSteady": 1e-2}
+
+
 def corePlots(testDir, dirDict):
     cmpr.vt(testDir, dirDict)
     cmpr.curr(testDir, dirDict)
@@ -48,8 +113,9 @@ def write_config_file(P, filename="input_params.cfg"):
         P.write(fo)
 
 
-def testAnalytSphDifn(testDir, dirDict):
-    """ Analytical test for diffusion in a sphere """
+def testAnalytSphDifn(testDir, dirDict, changes={}):
+    """ Analytical test for diffusion in a sphere, with changed cathode parameters
+    {(section, parameter): value} """
     shutil.copy(osp.join(dirDict["baseConfig"], "params_system.cfg"), testDir)
     shutil.copy(osp.join(dirDict["baseConfig"], "params_c.cfg"), testDir)
     psys = osp.join(testDir, "params_system.cfg")
@@ -74,11 +140,19 @@ def testAnalytSphDifn(testDir, dirDict):
     P.set("Material", "D", "1e-20")
     P.set("Reactions", "rxnType", "BV_raw")
     P.set("Reactions", "k0", "1e+1")
+    for (section, option), value in changes.items():
+        P.set(section, option, value)
     write_config_file(P, ptrode)
     main.main(psys, keepArchive=False)
     shutil.move(dirDict["simOut"], testDir)
 
 
+def testAnalytSphDifnGeometric(testDir, dirDict):
+    """ Analytical test for diffusion in a sphere with a mesh refined towards the surface """
+    testAnalytSphDifn(testDir, dirDict, {("Particles", "radialMesh"): "geometric",
+                                         ("Particles", "radialMeshRatio"): "4"})
+
+
 def testAnalytCylDifn(testDir, dirDict):
     """ Analytical test for diffusion in a cylinder """
     shutil.copy(osp.join(dirDict["baseConfig"], "params_system.cfg"), testDir)
@@ -109,6 +183,36 @@ def testAnalytCylDifn(testDir, dirDict):
     shutil.move(dirDict["simOut"], testDir)
 
 
+def testAnalytSphDifnPoly(testDir, dirDict):
+    """ Analytical test for diffusion in a sphere with a polynomial profile """
+    shutil.copy(osp.join(dirDict["baseConfig"], "params_system.cfg"), testDir)
+    shutil.copy(osp.join(dirDict["baseConfig"], "params_c.cfg"), testDir)
+    psys = osp.join(testDir, "params_system.cfg")
+    ptrode = osp.join(testDir, "params_c.cfg")
+    P_s = get_config(psys)
+    P_s.set("Sim Params", "profileType", "CV")
+    P_s.set("Sim Params", "Vset", "0.10")
+    P_s.set("Sim Params", "tend", "1e+6")
+    P_s.set("Sim Params", "tsteps", "1800")
+    P_s.set("Sim Params", "relTol", "1e-7")
+    P_s.set("Sim Params", "tramp", "1e-6")
+    P_s.set("Particles", "mean_c", "100e-9")
+    P_s.set("Particles", "cs0_c", "0.5")
+    write_config_file(P_s, psys)
+    P = get_config(ptrode)
+    P.set("Particles", "type", "diffn_poly")
+    P.set("Particles", "polyParams", "3")
+    P.set("Particles", "discretization", "3e-10")
+    P.set("Particles", "shape", "sphere")
+    P.set("Material", "muRfunc", "testIS_ss")
+    P.set("Material", "D", "1e-20")
+    P.set("Reactions", "rxnType", "BV_raw")
+    P.set("Reactions", "k0", "1e+1")
+    write_config_file(P, ptrode)
+    main.main(psys, keepArchive=False)
+    shutil.move(dirDict["simOut"], testDir)
+
+
 def analytSphDifn(R, T):
     """ Analytical solution for diffusion in a sphere """
     n = 30
@@ -130,3 +234,13 @@ def analytCylDifn(R, T):
         theta += ((2. / lmbda) * spcl.j0(lmbda * R) / spcl.j1(lmbda)
                   * np.exp(-lmbda ** 2 * T))
     return theta
+
+
+def analytSphDifnAvg(T):
+    """ Analytical solution for the average concentration of diffusion in a sphere """
+    n = 30
+    lmbdavec = np.pi * np.arange(1, n + 1)
+    theta = 0 * T
+    for lmbda in lmbdavec:
+        theta += (6. / lmbda ** 2) * np.exp(-lmbda ** 2 * T)
+    return theta
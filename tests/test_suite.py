@@ -10,6 +10,7 @@ import scipy.io as sio
 
 import mpet.main
 from mpet.config.configuration import Config
+import mpet.geometry as geo
 import tests.test_defs as defs
 
 
@@ -51,6 +52,51 @@ def run_test_sims_analyt(runInfo, dirDict, pflag=True):
             raise
 
 
+def run_test_sims_equivalence(runInfo, dirDict):
+    for testStr in runInfo:
+        testDir = osp.join(dirDict["out"], testStr)
+        refStr, changes = defs.equivalenceTests[testStr]
+        if isinstance(refStr, tuple):
+            # The reference is a variant of a test, which is run as well
+            refStr, refChanges = refStr
+            changes = {f: {**refChanges.get(f, {}), **changes.get(f, {})}
+                       for f in set(refChanges) | set(changes)}
+            run_test_sim_variant(refStr, changes, testDir, dirDict)
+            run_test_sim_variant(refStr, refChanges, osp.join(testDir, "reference"), dirDict)
+        else:
+            run_test_sim_variant(refStr, changes, testDir, dirDict)
+
+    # Remove the history directory that mpet creates.
+    try:
+        os.rmdir(osp.join(dirDict["suite"], "history"))
+    except OSError as exception:
+        if exception.errno != errno.ENOENT:
+            raise
+
+
+def run_test_sim_variant(refStr, changes, testDir, dirDict):
+    """Run a test from ref_outputs with changed parameters, {cfg file: {(section, option): value}}
+    """
+    os.makedirs(testDir)
+
+    # Copy config files from ref_outputs, with the changed parameters
+    refDir = osp.join(dirDict["suite"], "ref_outputs", refStr)
+    _, _, filenames = next(os.walk(osp.join(refDir)))
+    for f in filenames:
+        if ".cfg" in f:
+            P = defs.get_config(osp.join(refDir, f))
+            for (section, option), value in changes.get(f, {}).items():
+                if not P.has_section(section):
+                    P.add_section(section)
+                P.set(section, option, value)
+            defs.write_config_file(P, osp.join(testDir, f))
+
+    # Run the simulation
+    configfile = osp.join(testDir, 'params_system.cfg')
+    mpet.main.main(configfile, keepArchive=False)
+    shutil.move(dirDict["simOut"], testDir)
+
+
 def get_sim_time(simDir):
     with open(osp.join(simDir, "run_info.txt")) as fi:
         simTime = float(fi.readlines()[-1].split()[-2])
@@ -72,7 +118,21 @@ def compare_with_analyt(runInfo, dirDict, tol=1e-4):
                 raise
             print("No simulation data for " + testStr)
             continue
-        if "Difn" in testStr:
+        if "DifnPoly" in testStr:
+            t_ref = config["t_ref"]
+            L_part = config["psd_len"]["c"][0,0]
+            t_refPart = L_part**2 / config["c", "D"]
+            # Skip first time point: analytical solution fails at t=0.
+            t0ind = 2
+            tvecA = newData["phi_applied_times"][0][t0ind:] * (t_ref/t_refPart)
+            cbarvec = np.ravel(newData["partTrodecvol0part0_cbar"])
+            csurf = np.ravel(newData["partTrodecvol0part0_c"])[-1]
+            thetavec = (cbarvec[t0ind:] - csurf) / (cbarvec[0] - csurf)
+            # Compare the average concentration, with the tolerance of the approximation
+            if np.max(np.abs(runInfo[testStr][1](tvecA) - thetavec)) > defs.polyTol:
+                print(testStr, "Fail from tolerance")
+                failList.append(testStr)
+        elif "Difn" in testStr:
             t_ref = config["t_ref"]
             L_part = config["psd_len"]["c"][0,0]
             nx_part = config["psd_num"]["c"][0,0]
@@ -89,7 +149,8 @@ def compare_with_analyt(runInfo, dirDict, tol=1e-4):
             cmat = cmat[t0ind:,r0ind:]
             nt = len(tvecA)
             # Skip center mesh point: analytical solution as sin(r)/r
-            xvecA = np.linspace(0., 1., nx_part)[1:]
+            xvecA = geo.get_radial_mesh(nx_part, config["c", "radialMesh"],
+                                        config["c", "radialMeshRatio"])[1:]
             R, T = np.meshgrid(xvecA, tvecA)
             theta = runInfo[testStr][1](R, T)
             theta = delC*theta + cmin
@@ -193,6 +254,8 @@ def main(compareDir):
     runInfoAnalyt = {
         "testAnalytCylDifn": (defs.testAnalytCylDifn, defs.analytCylDifn),
         "testAnalytSphDifn": (defs.testAnalytSphDifn, defs.analytSphDifn),
+        "testAnalytSphDifnGeometric": (defs.testAnalytSphDifnGeometric, defs.analytSphDifn),
+        "testAnalytSphDifnPoly": (defs.testAnalytSphDifnPoly, defs.analytSphDifnAvg),
         }
 
     if compareDir is None:
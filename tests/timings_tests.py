@@ -1,6 +1,11 @@
+import json
 import os.path as osp
 import pytest
 
+# Phases that take less time than this in the reference are not compared, as their timings
+# are dominated by noise
+MIN_PHASE_TIME = 1.
+
 
 def get_sim_time(simDir):
     with open(osp.join(simDir, "run_info.txt")) as fi:
@@ -8,6 +13,15 @@ def get_sim_time(simDir):
     return simTime
 
 
+def get_phase_times(simDir):
+    """Time spent in each phase of a simulation, or None if this was not recorded"""
+    timingsFile = osp.join(simDir, "run_timings.json")
+    if not osp.isfile(timingsFile):
+        return None
+    with open(timingsFile) as fi:
+        return json.load(fi)["phases"]
+
+
 def test_compare_timings(Dirs, tol):
     refDir, testDir = Dirs
     newDir = osp.join(testDir, "sim_output")
@@ -15,3 +29,40 @@ def test_compare_timings(Dirs, tol):
     time_new = get_sim_time(newDir)
     time_ref = get_sim_time(refDir)
     assert time_new < time_ref * pytest.slowdown_tolerance, "too high slowdown with reference"
+
+
+def test_compare_phase_timings(Dirs, tol):
+    refDir, testDir = Dirs
+    newDir = osp.join(testDir, "sim_output")
+    refDir = osp.join(refDir, "sim_output")
+    phases_new = get_phase_times(newDir)
+    phases_ref = get_phase_times(refDir)
+    if phases_new is None or phases_ref is None:
+        pytest.skip("phase timings not available")
+    for phase, time_ref in phases_ref.items():
+        if phase not in phases_new or time_ref < MIN_PHASE_TIME:
+            continue
+        assert phases_new[phase] < time_ref * pytest.slowdown_tolerance, \
+            f"too high slowdown with reference in phase {phase}"
+
+
+def test_particle_bank_timings(equivalenceDirs):
+    """Declaring the equations of a particle bank is not slower than declaring those of the
+    separate particle models of the test it is compared to"""
+    # Imported here, as it requires daetools
+    import tests.test_defs as defs
+    refDir, testDir = equivalenceDirs
+    ref, changes = defs.equivalenceTests[osp.basename(testDir)]
+    if changes["params_system.cfg"].get(("Sim Params", "particleBank")) != "true":
+        pytest.skip("not a particle bank test")
+    if not isinstance(ref, tuple):
+        # The reference test is run with the modified code as well
+        refDir = osp.join(osp.dirname(testDir), ref)
+    phases_new = get_phase_times(osp.join(testDir, "sim_output"))
+    phases_ref = get_phase_times(osp.join(refDir, "sim_output"))
+    if phases_new is None or phases_ref is None:
+        pytest.skip("phase timings not available")
+    for phase in ["DeclareEquations", "Initialize"]:
+        time_ref = max(phases_ref[phase], MIN_PHASE_TIME)
+        assert phases_new[phase] < time_ref * pytest.slowdown_tolerance, \
+            f"particle bank slower than the particle models in phase {phase}"
@@ -0,0 +1,62 @@
+"""Unit tests of simulations run from Python with mpet.api, on a small config"""
+import os.path as osp
+
+import numpy as np
+import pytest
+import scipy.io as sio
+
+from mpet.cache import ResultCache
+from mpet.config import Config
+
+api = pytest.importorskip("mpet.api")
+
+CONFIG = osp.join(osp.dirname(osp.abspath(__file__)), "..", "..", "configs",
+                  "params_system.cfg")
+
+
+@pytest.fixture(scope="module")
+def config():
+    return Config(CONFIG).copy_with(tsteps=10, Nvol_c=2, Nvol_s=1, Nvol_a=2,
+                                    Npart_c=1, Npart_a=1)
+
+
+def assert_same_output(data, ref):
+    assert set(data) == set(ref)
+    for key in ref:
+        np.testing.assert_allclose(np.squeeze(data[key]), np.squeeze(ref[key]),
+                                   err_msg=f"Output {key} differs")
+
+
+def test_run_in_memory(config, tmp_path):
+    # The output kept in memory is the output written to the output data file
+    result = api.run(config, outdir=str(tmp_path), progress=lambda t, tend: None)
+    assert result.error is None and not result.cached
+    assert "phi_applied" in result and "phi_applied_times" in result
+    fileData = sio.loadmat(osp.join(tmp_path, "output_data.mat"))
+    assert_same_output(result.data, {key: value for key, value in fileData.items()
+                                     if not key.startswith("__")})
+    assert osp.isfile(osp.join(tmp_path, "run_timings.json"))
+
+
+def test_run_cached(config, tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    result = api.run(config, outdir=str(tmp_path / "out"), progress=lambda t, tend: None,
+                     cache=cache)
+    assert not result.cached
+    assert len(cache.entries()) == 1
+    # The same simulation is read from the cache
+    cached = api.run(config.copy_with(), cache=cache)
+    assert cached.cached
+    assert cached.endCondition == result.endCondition and cached.error is None
+    assert cached.timings == pytest.approx(result.timings)
+    assert_same_output(cached.data, result.data)
+    # With the output files, which are stored as well
+    cached = api.run(config, outdir=str(tmp_path / "out2"), cache=cache)
+    assert cached.cached
+    for filename in ["output_data.mat", "run_timings.json"]:
+        assert (tmp_path / "out2" / filename).read_bytes() == \
+            (tmp_path / "out" / filename).read_bytes()
+    # A changed config is simulated again
+    changed = api.run(config.copy_with(Crate=2), progress=lambda t, tend: None, cache=cache)
+    assert not changed.cached
+    assert len(cache.entries()) == 2
@@ -0,0 +1,82 @@
+"""Unit tests of the keys and the eviction of the result cache in mpet.cache"""
+import os
+import os.path as osp
+
+import pytest
+
+from mpet.cache import ResultCache, fingerprint
+from mpet.config import Config
+
+CONFIG = osp.join(osp.dirname(osp.abspath(__file__)), "..", "..", "configs",
+                  "params_system.cfg")
+
+
+@pytest.fixture(scope="module")
+def config():
+    return Config(CONFIG).copy_with(randomSeed=True, seed=1)
+
+
+def test_fingerprint(config):
+    key = fingerprint(config)
+    assert key == fingerprint(config)
+    # The same parameters and samples give the same key
+    assert fingerprint(config.copy_with(seed=1)) == key
+    assert fingerprint(Config(CONFIG).copy_with(randomSeed=True, seed=1)) == key
+    # Any change of the parameters or of the samples changes the key
+    assert fingerprint(config.copy_with(Crate=2)) != key
+    assert fingerprint(config.copy_with(cathode={"k0": 5.})) != key
+    assert fingerprint(config.copy_with(seed=2)) != key
+
+
+def test_fingerprint_function_file(config, tmp_path):
+    filename = tmp_path / "custom_rxn.py"
+    filename.write_text("def custom_rxn():\n    pass\n")
+    custom = config.copy_with(cathode={"rxnType_filename": str(filename)})
+    key = fingerprint(custom)
+    assert key != fingerprint(config)
+    # The contents of the file are part of the key
+    filename.write_text("def custom_rxn():\n    return 1\n")
+    assert fingerprint(custom) != key
+
+
+def put(cache, tmp_path, key, size, mtime):
+    """Add an entry with a file of the given size, last used at the given time"""
+    filename = tmp_path / f"{key}.dat"
+    filename.write_bytes(b"0"*size)
+    entry = cache.put(key, {"output_data.dat": str(filename)}, {"endCondition": 1})
+    os.utime(entry, (mtime, mtime))
+    return entry
+
+
+def test_result_cache(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    assert cache.entries() == [] and cache.get("key1") is None
+    entry = put(cache, tmp_path, "key1", 100, 1000)
+    assert cache.get("key1", ["output_data.dat"]) == (entry, {"endCondition": 1})
+    assert cache.get("key1", ["output_data.hdf5"]) is None
+    assert cache.get("key2") is None
+    # Getting an entry marks it as used
+    assert cache.entries()[0][2] > 1000
+    assert cache.invalidate() == ["key1"]
+    assert cache.entries() == []
+
+
+def test_result_cache_evict(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_size=10000)
+    for i, mtime in enumerate([3000, 1000, 2000]):
+        put(cache, tmp_path, f"key{i}", 1000, mtime)
+    # Most recently used first
+    assert [key for key, _, _ in cache.entries()] == ["key0", "key2", "key1"]
+    sizes = [size for _, size, _ in cache.entries()]
+    assert all(size > 1000 for size in sizes)
+    # The least recently used entries are removed
+    assert cache.evict(sum(sizes) - 1) == ["key1"]
+    cache.get("key2")
+    assert cache.evict(max(sizes)) == ["key0"]
+    assert [key for key, _, _ in cache.entries()] == ["key2"]
+    # Adding an entry evicts to the size limit of the cache. key2 was used just now, and key3
+    # before it.
+    cache.max_size = 2*max(sizes)
+    put(cache, tmp_path, "key3", 1000, 4000)
+    put(cache, tmp_path, "key4", 1000, 5000)
+    assert sorted(key for key, _, _ in cache.entries()) == ["key2", "key4"]
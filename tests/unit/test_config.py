@@ -0,0 +1,103 @@
+"""Unit tests of the processing of configs in mpet.config"""
+import os.path as osp
+
+import numpy as np
+import pytest
+
+from mpet.config import Config
+from mpet.exceptions import UnknownParameterError
+
+CONFIG = osp.join(osp.dirname(osp.abspath(__file__)), "..", "..", "configs",
+                  "params_system.cfg")
+
+
+@pytest.fixture(scope="module")
+def config():
+    return Config(CONFIG)
+
+
+@pytest.mark.parametrize("Npart", [3, 5])
+def test_psd_quadrature(config, Npart):
+    mean, stddev = 100e-9, 20e-9
+    quad = config.copy_with(psdQuadrature=True, mean_c=mean, stddev_c=stddev, Npart_c=Npart,
+                            cathode={"type": "homog", "shape": "sphere"})
+    sizes = quad["psd_len"]["c"]
+    fracVol = quad["psd_vol_FracVol"]["c"]
+    # Every volume has the same sizes
+    assert sizes.shape == (quad["Nvol"]["c"], Npart)
+    np.testing.assert_array_equal(sizes, np.tile(sizes[0], (len(sizes), 1)))
+    np.testing.assert_allclose(np.sum(fracVol, axis=1), 1.)
+    # The volume fractions are those of the number fractions of the quadrature, so they give
+    # the moments of the lognormal distribution, E[L^k] = E[L^3]*sum(fracVol*L^(k-3)), to
+    # the accuracy of the quadrature
+    cv2 = (stddev/mean)**2
+    L3 = mean**3*(1 + cv2)**3
+    assert 1/np.sum(fracVol[0]/sizes[0]**3) == pytest.approx(L3, rel=1e-3)
+    assert L3*np.sum(fracVol[0]/sizes[0]**2) == pytest.approx(mean, rel=1e-3)
+    assert L3*np.sum(fracVol[0]/sizes[0]) == pytest.approx(mean**2*(1 + cv2), rel=1e-3)
+    # Deterministic
+    again = config.copy_with(psdQuadrature=True, mean_c=mean, stddev_c=stddev, Npart_c=Npart,
+                             cathode={"type": "homog", "shape": "sphere"}, seed=1)
+    np.testing.assert_array_equal(again["psd_len"]["c"], sizes)
+
+
+def test_from_mapping(config):
+    mapped = Config.from_mapping(config.D_s.get_sections(), config.D_c.get_sections(),
+                                 config.D_a.get_sections(), path=osp.dirname(CONFIG))
+    for name in ["Crate", "tend", "Nvol", "Npart", "trodes"]:
+        assert mapped[name] == config[name]
+    assert mapped["c", "type"] == config["c", "type"]
+    assert mapped["psd_len"]["c"].shape == config["psd_len"]["c"].shape
+    with pytest.raises(ValueError):
+        Config.from_mapping(config.D_s.get_sections(), config.D_c.get_sections())
+
+
+def test_copy_with(config):
+    copy = config.copy_with(Crate=2, cathode={"k0": 5.})
+    assert copy["Crate"] == 2 and config["Crate"] != 2
+    assert copy.D_c["k0"] == 5.
+    # Values are processed again, e.g. the particle rate constants are scaled
+    np.testing.assert_allclose(copy["c", "k0"]/config["c", "k0"], 5./config.D_c["k0"])
+    # The particles are generated from the same samples
+    assert copy.samples.keys() == config.samples.keys()
+    for key, sample in config.samples.items():
+        np.testing.assert_array_equal(copy.samples[key], sample)
+    np.testing.assert_array_equal(copy["psd_len"]["c"], config["psd_len"]["c"])
+    with pytest.raises(UnknownParameterError):
+        config.copy_with(mpet_unit_test_unknown=1)
+
+
+def test_copy_with_random_state(config):
+    seeded = config.copy_with(randomSeed=True, seed=3)
+    after = np.random.rand()
+    # Copies continue the random sequence from the state after the samples were drawn, as a
+    # config created with the same parameters
+    copy = seeded.copy_with(Crate=3)
+    np.testing.assert_array_equal(copy["psd_len"]["c"], seeded["psd_len"]["c"])
+    assert np.random.rand() == after
+    again = config.copy_with(randomSeed=True, seed=3)
+    np.testing.assert_array_equal(again["psd_len"]["c"], seeded["psd_len"]["c"])
+    assert np.random.rand() == after
+    # Sampling parameters draw new samples
+    sampled = seeded.copy_with(stddev_c=5e-9)
+    assert not np.array_equal(sampled["psd_len"]["c"], seeded["psd_len"]["c"])
+    mapped = Config.from_mapping(seeded.D_s.get_sections({"stddev_c": 5e-9}),
+                                 seeded.D_c.get_sections(), seeded.D_a.get_sections(),
+                                 path=osp.dirname(CONFIG))
+    np.testing.assert_array_equal(sampled["psd_len"]["c"], mapped["psd_len"]["c"])
+
+
+def test_get_particle_values(config):
+    merged = config.copy_with(mergeParticles=True, stddev_c=0, cathode={"type": "homog"})
+    shape = merged["psd_num"]["c"].shape
+    assert np.all(merged["partRep"]["c"] == 0)
+    np.testing.assert_array_equal(merged.get_particle_values("c", "k0", 2.), np.full(shape, 2.))
+    values = np.tile(np.arange(shape[0], dtype=float)[:, None], (1, shape[1]))
+    np.testing.assert_array_equal(merged.get_particle_values("c", "k0", values), values)
+    # Merged particles are only simulated once, so they cannot have different values
+    with pytest.raises(ValueError, match="merged particles"):
+        merged.get_particle_values("c", "k0", np.arange(shape[1], dtype=float))
+    # Without merging, every particle can have its own value
+    unmerged = config.copy_with(stddev_c=0, cathode={"type": "homog"})
+    values = np.arange(np.prod(shape), dtype=float).reshape(shape)
+    np.testing.assert_array_equal(unmerged.get_particle_values("c", "k0", values), values)
@@ -0,0 +1,54 @@
+"""Unit tests of the interpolation of the external functions in mpet.extern_funcs"""
+import numpy as np
+import pytest
+import scipy.interpolate as sintrp
+
+dae = pytest.importorskip("daetools.pyDAE")
+extern_funcs = pytest.importorskip("mpet.extern_funcs")
+
+
+@pytest.fixture(scope="module")
+def model():
+    return dae.daeModel("model")
+
+
+def calculate(function, x, derivative=0.):
+    """Evaluate an external function as daetools does, with the derivative of its argument"""
+    arg = dae.adouble(x)
+    arg.Derivative = derivative
+    result = function.Calculate({function.argument: arg})
+    return result.Value, result.Derivative
+
+
+def test_interp_scalar(model):
+    knots = np.array([0., 0.1, 0.5, 0.6, 1.])
+    spline = sintrp.PchipInterpolator(knots, np.sin(3*knots))
+    function = extern_funcs.InterpScalar("f", model, dae.unit(), dae.Constant(0.), knots,
+                                         spline.c)
+    for x in np.linspace(0, 1, 41):
+        value, slope = function.evaluate(x)
+        assert value == pytest.approx(spline(x), abs=1e-14)
+        assert slope == pytest.approx(spline(x, 1), abs=1e-12)
+    # Constant outside of the knots
+    assert function.evaluate(-1.) == (pytest.approx(spline(0.)), 0.)
+    assert function.evaluate(2.) == (pytest.approx(spline(1.)), 0.)
+    # The derivative follows from the chain rule, and the previous argument is cached
+    assert calculate(function, 0.3) == (pytest.approx(spline(0.3)), 0.)
+    assert calculate(function, 0.3, 2.) == (pytest.approx(spline(0.3)),
+                                            pytest.approx(2*spline(0.3, 1)))
+    assert function.get_stats()["cache_hits"] >= 1
+
+
+def test_interp_time_scalar(model):
+    tvec = [0., 1., 1., 3.]
+    yvec = [0., 2., 4., 0.]
+    function = extern_funcs.InterpTimeScalar("y", model, dae.unit(), dae.Time(), tvec, yvec)
+    assert function.evaluate(0.5) == (pytest.approx(1.), pytest.approx(2.))
+    # A repeated time is a step, of which the last value holds from that time on
+    assert function.evaluate(1.) == (pytest.approx(4.), pytest.approx(-2.))
+    assert function.evaluate(2.) == (pytest.approx(2.), pytest.approx(-2.))
+    # The last value holds after the last time
+    assert function.evaluate(4.) == (0., 0.)
+    assert calculate(function, 0.5, 1.) == (pytest.approx(1.), pytest.approx(2.))
+    stats = function.get_stats()
+    assert stats == {"calls": 1, "cache_hits": 0}
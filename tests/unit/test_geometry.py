@@ -0,0 +1,67 @@
+"""Unit tests of the particle and electrolyte meshes in mpet.geometry"""
+import numpy as np
+import pytest
+
+import mpet.geometry as geo
+import mpet.utils as utils
+
+MESHES = [("uniform", 1.), ("geometric", 5.), ("tanh", 5.)]
+
+
+@pytest.mark.parametrize("mesh, ratio", MESHES)
+def test_radial_mesh(mesh, ratio):
+    r_vec = geo.get_radial_mesh(20, mesh, ratio)
+    widths = np.diff(r_vec)
+    assert r_vec[0] == 0 and r_vec[-1] == pytest.approx(1.)
+    assert np.all(widths > 0)
+    # The mesh is refined towards the surface by the given ratio
+    assert widths[0]/widths[-1] == pytest.approx(ratio)
+    if mesh == "uniform":
+        np.testing.assert_allclose(r_vec, np.linspace(0, 1, 20))
+
+
+@pytest.mark.parametrize("shape, Vp", [("sphere", 4./3*np.pi), ("cylinder", np.pi)])
+@pytest.mark.parametrize("mesh, ratio", MESHES)
+def test_solid_disc_volumes(shape, Vp, mesh, ratio):
+    disc = geo.get_solid_disc(shape, 20, mesh, ratio)
+    vol_vec = Vp*disc["volfrac_vec"]
+    assert np.sum(disc["volfrac_vec"]) == pytest.approx(1.)
+    # The volumes are those of the control volumes between the edges
+    power = 3 if shape == "sphere" else 2
+    np.testing.assert_allclose(vol_vec, Vp*np.diff(disc["edges"]**power), rtol=1e-12)
+    # The mass matrix conserves mass: its columns sum to the control volumes
+    np.testing.assert_allclose(np.asarray(disc["Mmat"].sum(axis=0)).ravel(), vol_vec,
+                               rtol=1e-12)
+    np.testing.assert_allclose(disc["Mmat"].toarray(),
+                               np.diag(disc["Mbands"][1]) + np.diag(disc["Mbands"][0], -1)
+                               + np.diag(disc["Mbands"][2], 1))
+
+
+@pytest.mark.parametrize("mesh, ratio", MESHES)
+@pytest.mark.parametrize("N", [1, 2, 5, 8])
+def test_elyte_mesh(mesh, ratio, N):
+    widths = geo.get_elyte_mesh(N, mesh, ratio)
+    assert len(widths) == N
+    assert np.sum(widths) == pytest.approx(1.)
+    # Refined symmetrically towards both ends of the region
+    np.testing.assert_allclose(widths, widths[::-1])
+    if N > 2:
+        assert widths[N//2]/widths[0] == pytest.approx(ratio)
+
+
+@pytest.mark.parametrize("mesh, ratio", MESHES)
+def test_elyte_widths(mesh, ratio):
+    Nvol = {"a": 4, "s": 3, "c": 6}
+    L = {"a": 2., "s": 0.5, "c": 3.}
+    widths = geo.get_elyte_widths(Nvol, mesh, {region: ratio for region in Nvol})
+    assert sum(len(widths[region]) for region in Nvol) == sum(Nvol.values())
+    for region in Nvol:
+        assert np.sum(widths[region]) == pytest.approx(1.)
+    # The volumes of each region span its length
+    dxvec = utils.get_dxvec(L, Nvol, widths)
+    assert len(dxvec) == sum(Nvol.values())
+    assert np.sum(dxvec[:4]) == pytest.approx(L["a"])
+    assert np.sum(dxvec[4:7]) == pytest.approx(L["s"])
+    assert np.sum(dxvec[7:]) == pytest.approx(L["c"])
+    if mesh == "uniform":
+        np.testing.assert_allclose(dxvec, utils.get_dxvec(L, Nvol))
@@ -0,0 +1,92 @@
+"""Unit tests of the rate of particle filling eliminated from a reduced model"""
+import types
+
+import numpy as np
+import pytest
+
+import mpet.geometry as geo
+
+mod_electrodes = pytest.importorskip("mpet.mod_electrodes")
+data_reporting = pytest.importorskip("mpet.data_reporting")
+
+DELTA_L = 2.5
+
+
+def get_particle(solidType, shape, N, mesh="uniform", ratio=1.):
+    params = {"type": solidType, "shape": shape, "N": N, "delta_L": DELTA_L,
+              "radialMesh": mesh, "radialMeshRatio": ratio}
+    particle = types.SimpleNamespace(config={"reduceModel": True},
+                                     get_trode_param=params.__getitem__,
+                                     get_mesh_options=lambda: (mesh, ratio))
+    for name in ["get_filling_rate_weights", "get_eliminated_outputs"]:
+        method = getattr(mod_electrodes.ParticleEquations, name)
+        setattr(particle, name, method.__get__(particle))
+    return particle
+
+
+def filling_rate(solidType, disc, Rxn, rng):
+    """Rate of filling from the discretized mass conservation of the particle, with random
+    fluxes between the grid points"""
+    N = len(disc["volfrac_vec"])
+    if solidType == "ACR":
+        RHS = DELTA_L*Rxn
+    elif solidType in ["diffn", "CHR", "diffn2", "CHR2"]:
+        Flux_vec = np.hstack((0, rng.normal(size=N-1), -Rxn))
+        if solidType in ["diffn2", "CHR2"]:
+            Flux_vec[-1] *= .5
+        RHS = -np.diff(Flux_vec*disc["area_vec"])
+    else:
+        RHS = np.atleast_1d(DELTA_L*Rxn)
+    dcdt = RHS if disc["Mmat"] is None else np.linalg.solve(disc["Mmat"].toarray(), RHS)
+    return disc["volfrac_vec"] @ dcdt
+
+
+@pytest.mark.parametrize("solidType, shape, N, mesh, ratio", [
+    ("homog", "C3", 1, "uniform", 1.), ("homog2", "sphere", 1, "uniform", 1.),
+    ("diffn_poly", "sphere", 1, "uniform", 1.), ("ACR", "C3", 10, "uniform", 1.),
+    ("diffn", "sphere", 10, "uniform", 1.), ("diffn", "sphere", 10, "geometric", 5.),
+    ("CHR", "cylinder", 10, "tanh", 5.), ("diffn2", "sphere", 10, "uniform", 1.),
+    ("CHR2", "cylinder", 10, "geometric", 5.)])
+def test_filling_rate_weights(solidType, shape, N, mesh, ratio):
+    rng = np.random.default_rng(0)
+    particle = get_particle(solidType, shape, N, mesh, ratio)
+    disc = geo.get_solid_disc(shape, N, mesh, ratio)
+    definition = particle.get_eliminated_outputs()["dcbardt"]
+    weights = particle.get_filling_rate_weights()
+    # The rate of filling only depends on the reaction rates, not on the internal fluxes
+    Rxn = rng.normal(size=N if solidType == "ACR" else 2)
+    if solidType in ["homog2", "diffn2", "CHR2"]:
+        assert list(definition) == ["Rxn1", "Rxn2"]
+        expected = .5*(filling_rate(solidType, disc, Rxn[0], rng)
+                       + filling_rate(solidType, disc, Rxn[1], rng))
+        assert weights*(Rxn[0] + Rxn[1]) == pytest.approx(expected, rel=1e-12)
+    elif solidType == "ACR":
+        assert list(definition) == ["Rxn"]
+        assert np.shape(weights) == (N,)
+        expected = filling_rate(solidType, disc, Rxn, rng)
+        assert weights @ Rxn == pytest.approx(expected, rel=1e-12)
+    else:
+        assert list(definition) == ["Rxn"]
+        expected = filling_rate(solidType, disc, Rxn[0], rng)
+        assert weights*Rxn[0] == pytest.approx(expected, rel=1e-12)
+
+
+def test_not_reduced():
+    particle = get_particle("diffn", "sphere", 10)
+    particle.config["reduceModel"] = False
+    assert particle.get_eliminated_outputs() == {}
+
+
+def test_eliminated_output():
+    times = np.linspace(0, 1, 4)
+    Rxn = np.arange(12.).reshape(4, 3)
+    outputs = {"part_Rxn": (Rxn, times), "part_Rxn1": (Rxn[:, 0], times),
+               "part_Rxn2": (Rxn[:, 1], times)}
+    # Variables on the discretization domain, with a weight per grid point
+    values, out_times = data_reporting.get_eliminated_output(
+        outputs, "part", {"Rxn": np.array([1., 2., 3.])})
+    np.testing.assert_allclose(values, Rxn @ [1., 2., 3.])
+    assert out_times is times
+    # Several scalar variables
+    values, _ = data_reporting.get_eliminated_output(outputs, "part", {"Rxn1": .5, "Rxn2": .5})
+    np.testing.assert_allclose(values, .5*(Rxn[:, 0] + Rxn[:, 1]))
@@ -0,0 +1,39 @@
+"""Unit tests of the loading of functions in mpet.plugins"""
+import sys
+
+import pytest
+
+import mpet.plugins as plugins
+
+
+def test_load_function_from_file(tmp_path):
+    # A custom file that imports a module from its own folder
+    (tmp_path / "mpet_unit_test_helper.py").write_text("SCALE = 2.\n")
+    (tmp_path / "custom_rxn.py").write_text(
+        "from mpet_unit_test_helper import SCALE\n\n\n"
+        "def custom_rxn(x):\n"
+        "    return SCALE*x\n")
+    path = list(sys.path)
+    function = plugins.get_function("reactions", "custom_rxn", str(tmp_path / "custom_rxn.py"))
+    assert function(3.) == 6.
+    assert sys.path == path
+    # Resolved functions are cached
+    assert plugins.get_function("reactions", "custom_rxn",
+                                str(tmp_path / "custom_rxn.py")) is function
+
+
+def test_load_function_from_file_error(tmp_path):
+    (tmp_path / "broken.py").write_text("import mpet_unit_test_missing_module\n")
+    path = list(sys.path)
+    with pytest.raises(ImportError):
+        plugins.load_function_from_file(str(tmp_path / "broken.py"), "broken")
+    assert sys.path == path
+
+
+def test_register_function():
+    def rate(x):
+        return x
+    plugins.register_function("reactions", "mpet_unit_test_rate", rate)
+    assert plugins.get_function("reactions", "mpet_unit_test_rate") is rate
+    with pytest.raises(ValueError):
+        plugins.get_function("reactions", "mpet_unit_test_unknown")
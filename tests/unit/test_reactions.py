@@ -0,0 +1,43 @@
+"""Unit tests of the MHC and CIET reaction rates in mpet.electrode.reactions"""
+import numpy as np
+import pytest
+
+MHC_kfunc = pytest.importorskip("mpet.electrode.reactions.MHC_kfunc")
+from mpet.electrode.reactions.MHC import MHC  # noqa: E402
+from mpet.electrode.reactions.CIET import CIET  # noqa: E402
+
+
+@pytest.mark.parametrize("lmbda", [1., 8.3, 20.])
+def test_net_rate(lmbda):
+    # The net rate of the two rate constants over a grid of overpotentials and temperatures
+    eta, T = np.meshgrid(np.linspace(-20., 20., 81), [0.5, 1., 2.])
+    c_sld = np.full(eta.shape, 0.3)
+    c_lyte = 0.8
+    eta_f = eta + T*np.log(c_lyte/c_sld)
+    expected = (MHC_kfunc.MHC_kfunc(-eta_f, lmbda)*c_lyte
+                - MHC_kfunc.MHC_kfunc(eta_f, lmbda)*c_sld)
+    rate = MHC_kfunc.MHC_net_rate(eta_f, c_sld, c_lyte, lmbda)
+    np.testing.assert_allclose(rate, expected, rtol=1e-10, atol=1e-14*np.max(np.abs(expected)))
+    # Single values
+    assert MHC_kfunc.MHC_net_rate(eta_f[0, 0], 0.3, c_lyte, lmbda) == \
+        pytest.approx(expected[0, 0], rel=1e-10)
+
+
+def test_k0():
+    assert MHC_kfunc.MHC_k0(8.3) == pytest.approx(MHC_kfunc.MHC_kfunc(0., 8.3))
+
+
+@pytest.mark.parametrize("rate", [MHC, CIET])
+def test_arrays(rate):
+    # An array gives the rates of its elements, which only depend on the activation energy for
+    # single values
+    eta = np.linspace(-2., 2., 5)
+    c_sld = np.linspace(0.1, 0.9, 5)
+    kwargs = dict(c_lyte=1., k0=2., T=1.2, act_R=c_sld, act_lyte=1., lmbda=8.3)
+    rates = rate(eta, c_sld, E_A=0.5, **kwargs)
+    for i in range(len(eta)):
+        kwargs["act_R"] = c_sld[i]
+        single = rate(eta[i], c_sld[i], E_A=0., **kwargs)
+        assert rates[i] == pytest.approx(single, rel=1e-12)
+        assert rate(eta[i], c_sld[i], E_A=0.5, **kwargs) == \
+            pytest.approx(np.exp(-0.5/1.2 + 0.5)*single, rel=1e-12)
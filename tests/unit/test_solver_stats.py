@@ -0,0 +1,58 @@
+"""Unit tests of the DAE solver statistics recorded during a simulation and written to its
+output"""
+import types
+
+import numpy as np
+import pytest
+import scipy.io as sio
+
+sim = pytest.importorskip("mpet.sim")
+data_reporting = pytest.importorskip("mpet.data_reporting")
+
+
+def get_simulation(statsList):
+    """Simulation recording the statistics of a solver that gives the next of statsList each
+    time they are requested"""
+    class Solver:
+        stats = iter(statsList)
+
+        @property
+        def IntegratorStats(self):
+            return next(self.stats)
+    simulation = types.SimpleNamespace(solver_stats={}, CurrentTime=0., DAESolver=Solver())
+    for name in ["get_solver_stats", "record_solver_stats"]:
+        setattr(simulation, name, getattr(sim.SimMPET, name).__get__(simulation))
+    return simulation
+
+
+def test_solver_stats_output(tmp_path, monkeypatch):
+    statsList = [{"NumSteps": 0, "CurrentOrder": 1},
+                 {"NumSteps": 4, "CurrentOrder": 2},
+                 {"NumSteps": 10, "CurrentOrder": 3}]
+    simulation = get_simulation(statsList)
+    statsPrev = simulation.get_solver_stats()
+    for t in [1., 2.]:
+        simulation.CurrentTime = t
+        statsPrev = simulation.record_solver_stats(statsPrev)
+    # Counters are recorded per reporting interval, other statistics at its end
+    assert simulation.solver_stats == {"times": [1., 2.], "NumSteps": [4, 6],
+                                       "CurrentOrder": [2, 3]}
+
+    # The statistics are written to the output data file
+    def get_output_variables(dataReporter):
+        yield "phi_applied", np.zeros(3), np.arange(3.)
+    monkeypatch.setattr(data_reporting, "get_output_variables", get_output_variables)
+    dataReporter = types.SimpleNamespace(ConnectionString=str(tmp_path / "output_data"),
+                                         solver_stats=simulation.solver_stats)
+    data_reporting.MyMATDataReporter.WriteDataToFile(dataReporter)
+    data = sio.loadmat(tmp_path / "output_data.mat")
+    np.testing.assert_array_equal(data["solver_stats_times"].flatten(), [1., 2.])
+    np.testing.assert_array_equal(data["solver_stats_NumSteps"].flatten(), [4, 6])
+    np.testing.assert_array_equal(data["solver_stats_CurrentOrder"].flatten(), [2, 3])
+
+
+def test_no_solver_stats():
+    # A solver without statistics records nothing
+    simulation = get_simulation([{}, {}])
+    simulation.record_solver_stats(simulation.get_solver_stats())
+    assert simulation.solver_stats == {}
@@ -0,0 +1,57 @@
+"""Unit tests of the selection of the linear solver in mpet.solvers"""
+import types
+
+import pytest
+
+solvers = pytest.importorskip("mpet.solvers")
+
+
+class Module:
+    """daetools solver module, which creates solvers recording their arguments"""
+    def __init__(self, name):
+        self.name = name
+        self.COLAMD = "COLAMD"
+        setattr(self, solvers.LINEAR_SOLVERS[name][2], self.create)
+
+    def create(self, *args):
+        return types.SimpleNamespace(module=self.name, args=args,
+                                     Options=types.SimpleNamespace())
+
+
+@pytest.fixture
+def installed(monkeypatch):
+    """Names of the installed linear solvers, SuperLU by default"""
+    names = {"SuperLU"}
+
+    def import_solver_module(name):
+        if name not in names:
+            raise ImportError(f"No module for {name}")
+        return Module(name)
+    monkeypatch.setattr(solvers, "import_solver_module", import_solver_module)
+    return names
+
+
+def get_config(**options):
+    return {"linearSolver": "SuperLU", "linearSolverThreads": 0,
+            "linearSolverOrdering": "default", **options}
+
+
+def test_linear_solver(installed):
+    installed.update(["SuperLU_MT", "Amesos_Klu"])
+    name, lasolver = solvers.create_linear_solver(get_config())
+    assert name == "SuperLU" and lasolver.args == ()
+    assert vars(lasolver.Options) == {}
+    # Solver options
+    name, lasolver = solvers.create_linear_solver(get_config(
+        linearSolver="SuperLU_MT", linearSolverThreads=4, linearSolverOrdering="COLAMD"))
+    assert name == "SuperLU_MT"
+    assert vars(lasolver.Options) == {"nprocs": 4, "ColPerm": "COLAMD"}
+    # The Trilinos solvers are created by name
+    name, lasolver = solvers.create_linear_solver(get_config(linearSolver="Amesos_Klu"))
+    assert name == "Amesos_Klu" and lasolver.args == ("Amesos_Klu", "")
+
+
+def test_linear_solver_fallback(installed, capsys):
+    name, lasolver = solvers.create_linear_solver(get_config(linearSolver="Pardiso"))
+    assert name == "SuperLU" and lasolver.module == "SuperLU"
+    assert "Pardiso is not available" in capsys.readouterr().out
@@ -0,0 +1,33 @@
+"""Unit tests of the parsing of parameter sweeps in mpet.sweep and mpet.utils"""
+import pytest
+
+import mpet.sweep as sweep
+import mpet.utils as utils
+
+
+def test_expand_grid():
+    jobs = sweep.expand_grid({"Crate": [1, 2], "cathode.k0": [0.1, 1, 10]})
+    assert len(jobs) == 6
+    assert jobs[0] == {"Crate": 1, "cathode.k0": 0.1}
+    assert jobs[-1] == {"Crate": 2, "cathode.k0": 10}
+    assert len({tuple(job.items()) for job in jobs}) == 6
+    assert sweep.expand_grid({}) == [{}]
+
+
+@pytest.mark.parametrize("values, parsed", [("[1, 2.5]", [1, 2.5]), ("(1,2)", [1, 2]),
+                                            ("1, 2.5", [1, 2.5]), ("CC", ["CC"]),
+                                            ("CC, CV", ["CC", "CV"]), ("CC,", ["CC", ""])])
+def test_parse_values(values, parsed):
+    assert sweep.parse_values(values) == parsed
+
+
+def test_split_overrides():
+    assert sweep.split_overrides({"Crate": 2}) == {"Crate": 2}
+    kwargs = sweep.split_overrides({"Crate": 2, "cathode.k0": 1, "anode.k0": 3})
+    assert kwargs == {"Crate": 2, "cathode": {"k0": 1}, "anode": {"k0": 3}}
+
+
+@pytest.mark.parametrize("size, parsed", [("512", 512), (512, 512), ("1.5K", 1536),
+                                          ("4G", 4*1024**3), (" 2m ", 2*1024**2)])
+def test_parse_size(size, parsed):
+    assert utils.parse_size(size) == parsed
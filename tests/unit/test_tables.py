@@ -0,0 +1,123 @@
+"""Unit tests of the tables of material and electrolyte functions in mpet.tables"""
+import os.path as osp
+
+import numpy as np
+import pytest
+
+import mpet.plugins as plugins
+import mpet.props_am as props_am
+import mpet.tables as tables
+from mpet.config import Config
+
+CONFIG = osp.join(osp.dirname(osp.abspath(__file__)), "..", "..", "configs",
+                  "params_system.cfg")
+TOL = 1e-4
+
+
+@pytest.fixture(scope="module")
+def config():
+    return Config(CONFIG)
+
+
+def get_muRfunc(config, material):
+    config = config.copy_with(cathode={"type": "homog", "muRfunc": material})
+    return props_am.muRfuncs(config, "c", 0).muRfunc
+
+
+@pytest.mark.filterwarnings("ignore:divide by zero")
+def test_table():
+    table = tables.Table(np.sin, 0., 3., TOL)
+    x = np.linspace(0., 3., 1001)
+    assert table.max_error <= TOL
+    assert np.max(np.abs(table.apply(x) - np.sin(x))) <= TOL
+    # Constant outside of the range
+    assert table.apply(np.array([-1., 4.])) == pytest.approx(np.sin([0., 3.]), abs=TOL)
+    # Expressions are evaluated with an external function of a model
+    with pytest.raises(ValueError):
+        table.apply(object())
+    # Functions that are not finite cannot be tabulated
+    with pytest.raises(ValueError):
+        tables.Table(lambda x: 1/(x - 1), 0., 3., TOL)
+
+
+@pytest.mark.parametrize("material", ["NCA_ss1", "LiC6_LIONSIMBA"])
+def test_muRfunc_accepted(config, material):
+    muRfunc = get_muRfunc(config, material)
+    tabulated = tables.tabulate_muRfunc(muRfunc, 0., TOL, name=material)
+    assert tabulated is not muRfunc
+    y = np.linspace(*tables.Y_RANGE, 10001)
+    muR, actR = tabulated(y, 0.5, 0.)
+    assert np.max(np.abs(muR - muRfunc(y, 0.5, 0.)[0])) <= TOL
+    assert actR is None
+
+
+@pytest.mark.parametrize("material", ["LiCoO2_LIONSIMBA", "LiMn2O4_ss2"])
+def test_muRfunc_inaccurate(config, material):
+    # The table does not resolve the function within the tolerance
+    muRfunc = get_muRfunc(config, material)
+    assert tables.tabulate_muRfunc(muRfunc, 0., TOL, name=material) is muRfunc
+
+
+@pytest.mark.filterwarnings("ignore:invalid value")
+def test_muRfunc_not_finite(config):
+    muRfunc = get_muRfunc(config, "LiMn2O4_ss")
+    assert tables.tabulate_muRfunc(muRfunc, 0., TOL, name="LiMn2O4_ss") is muRfunc
+
+
+def test_muRfunc_not_homogeneous(config):
+    def muRfunc(y, ybar, muR_ref):
+        return np.log(y/(1 - y)) + ybar, None
+    with pytest.raises(ValueError):
+        tables.tabulate_muRfunc(muRfunc, 0., TOL)
+
+
+def test_muRfunc_expression():
+    dae = pytest.importorskip("daetools.pyDAE")
+    model = dae.daeModel("tables")
+    muRfunc = tables.tabulate_muRfunc(lambda y, ybar, muR_ref: (np.log(y/(1 - y)), None),
+                                      0., TOL, model=model)
+    muR, _ = muRfunc(np.array([dae.Constant(0.2), dae.Constant(0.4)], dtype=object), 0.5, 0.)
+    assert all(isinstance(value, dae.adouble) for value in muR)
+
+
+def test_elyte_functions(config):
+    elyte_function = plugins.get_function("electrolyte", "valoen_bernardi", None)
+    functions = elyte_function()[:-1]
+    crange = config["SMsetTableRange"]
+    tabulated = tables.tabulate_elyte_functions(functions, 1., TOL, crange, name="test")
+    c = np.linspace(*crange, 10001)
+    for function, table in zip(functions, tabulated):
+        values = function(c, 1.) + 0*c
+        # The tolerance is relative to the largest value of each function
+        assert np.max(np.abs(table(c, 1.) - values)) <= TOL*np.max(np.abs(values))
+    # D, sigma and the thermodynamic factor are tabulated, the constant tp0 is kept
+    assert [hasattr(table, "table") for table in tabulated] == [True, True, True, False]
+    assert tabulated[-1] is functions[-1]
+
+
+def test_elyte_functions_fallback():
+    def oscillating(c, T):
+        return np.sin(1e5*c)
+
+    def singular(c, T):
+        return np.log(c - 1)
+    # The table of a function it cannot resolve within the tolerance is not used
+    functions = tables.tabulate_elyte_functions([oscillating], 1., TOL, (0., 1.))
+    assert functions == [oscillating]
+    # Neither is the table of a function that is not finite in its range
+    with np.errstate(invalid="ignore", divide="ignore"):
+        functions = tables.tabulate_elyte_functions([singular], 1., TOL, (0., 2.))
+    assert functions == [singular]
+
+
+def test_get_elyte_functions(config):
+    dae = pytest.importorskip("daetools.pyDAE")
+    mod_cell = pytest.importorskip("mpet.mod_cell")
+    config = config.copy_with(elyteModelType="SM", SMset="valoen_bernardi", SMsetTable=True)
+    model = dae.daeModel("elyte")
+    D_fs = mod_cell.get_elyte_functions(config, model)[0]
+    assert isinstance(D_fs(dae.Constant(1.), 1.), dae.adouble)
+    # Numbers are evaluated without a model, e.g. for plots of the output
+    c = np.linspace(0.5, 1.5, 5)
+    assert mod_cell.get_elyte_functions(config)[0](c, 1.) == pytest.approx(
+        D_fs(c, 1.), rel=1e-12)
@@ -0,0 +1,52 @@
+"""Unit tests of the phase timings and model sizes written to run_timings.json"""
+import types
+
+import pytest
+
+import mpet.utils as utils
+
+
+def test_phase_timer(monkeypatch):
+    clock = iter([0., 1., 5., 7.5, 10., 10.25])
+    monkeypatch.setattr(utils.time, "perf_counter", lambda: next(clock))
+    timer = utils.PhaseTimer()
+    with timer.phase("Initialize"):
+        pass
+    # A phase that occurs several times accumulates its time
+    timer.start("Run")
+    timer.stop("Run")
+    # The phase is also timed if it raises an exception
+    with pytest.raises(KeyboardInterrupt):
+        with timer.phase("Run"):
+            raise KeyboardInterrupt
+    assert timer.timings == {"Initialize": 1., "Run": 2.75}
+
+
+class Particle:
+    def __init__(self, N):
+        c = types.SimpleNamespace(NumberOfPoints=N)
+        cbar = types.SimpleNamespace(NumberOfPoints=1)
+        self.Variables = [c, cbar]
+        self.Ports = [types.SimpleNamespace(Variables=[cbar])]
+        equation = types.SimpleNamespace(EquationExecutionInfos=[None]*N)
+        self.Equations = [equation]
+        # An STN with two states of the same number of equations
+        state = types.SimpleNamespace(Equations=[types.SimpleNamespace(
+            EquationExecutionInfos=[None])])
+        self.STNs = [types.SimpleNamespace(States=[state, state])]
+        self.Models = []
+
+
+class Cell:
+    def __init__(self, particles):
+        self.Variables = [types.SimpleNamespace(NumberOfPoints=3)]
+        self.Ports = []
+        self.Equations = [types.SimpleNamespace(EquationExecutionInfos=[None]*3)]
+        self.STNs = []
+        self.Models = particles
+
+
+def test_model_sizes():
+    sizes = utils.get_model_sizes(Cell([Particle(5), Particle(10)]))
+    assert sizes == {"Cell": {"models": 1, "equations": 3, "variables": 3},
+                     "Particle": {"models": 2, "equations": 17, "variables": 19}}
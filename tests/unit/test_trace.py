@@ -0,0 +1,80 @@
+"""Unit tests of the tracing and replaying of expressions in mpet.trace"""
+import types
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from mpet import trace
+
+
+def test_replay():
+    c = trace.TracedVariable(lambda context: context.c)
+    k = trace.Traced(lambda context: context.k, leaf=True)
+    vec = np.array([c(i) for i in range(3)], dtype=object)
+    residual = np.sum(vec**2*2.) - k*c.dt(0)/(1 + c(1))**2
+    # The leaves are resolved for each context
+    for values, k_value in [([0.1, 0.2, 0.3], 2.), ([1., 2., 3.], -1.)]:
+        variable = types.SimpleNamespace(dt=lambda i: 10*values[i])
+        context = types.SimpleNamespace(c=lambda i: values[i], k=k_value)
+        context.c.dt = variable.dt
+        expected = np.sum(np.array(values)**2*2.) - k_value*10*values[0]/(1 + values[1])**2
+        assert trace.replay(residual, context) == pytest.approx(expected)
+    # Constants are not traced
+    assert trace.replay(1.5, None) == 1.5
+    # numpy functions call the method of the same name of the replayed expression
+    value = trace.replay(np.exp(c(0)), types.SimpleNamespace(c=lambda i: Decimal(1)))
+    assert value == Decimal(1).exp()
+
+
+def test_replay_deep():
+    # Sums over many grid points are deeper than the recursion limit
+    c = trace.TracedVariable(lambda context: context)
+    residual = 0
+    for i in range(5000):
+        residual -= c(i)
+    assert trace.replay(residual, lambda i: i) == -sum(range(5000))
+
+
+def test_not_a_number():
+    c = trace.TracedVariable(lambda context: context)
+    # The value of a traced expression is not known, e.g. in conditions
+    with pytest.raises(TypeError):
+        c(0) > 0
+    with pytest.raises(TypeError):
+        bool(c(0))
+    with pytest.raises(TypeError):
+        float(c(0))
+
+
+def test_defer():
+    def maximum(a, b):
+        return a if a > b else b
+    deferred = trace.defer(maximum)
+    assert deferred(1., 2.) == 2.
+    c = trace.TracedVariable(lambda context: context)
+    value = deferred(0.5, c(0))
+    assert isinstance(value, trace.Traced)
+    # The function is applied when the expression is replayed
+    assert trace.replay(value, lambda i: 3.) == 3.
+    assert trace.replay(value, lambda i: 0.) == 0.5
+
+
+def test_negative_group_offset():
+    # The particles of a group are indexed with an offset from the DEDI of the equation,
+    # which is subtracted if it is negative
+    mod_electrodes = pytest.importorskip("mpet.mod_electrodes")
+
+    class DEDI:
+        def __add__(self, offset):
+            assert offset > 0
+            return ("+", offset)
+
+        def __sub__(self, offset):
+            assert offset > 0
+            return ("-", offset)
+    group = types.SimpleNamespace(dedi=DEDI())
+    get_index = mod_electrodes.BankGroup.get_index
+    assert get_index(group) is group.dedi
+    assert get_index(group, 2) == ("+", 2)
+    assert get_index(group, -3) == ("-", 3)
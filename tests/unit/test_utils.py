@@ -0,0 +1,73 @@
+"""Unit tests of the quantities interpolated linearly in time in mpet.utils"""
+import numpy as np
+import pytest
+
+import mpet.utils as utils
+
+
+def evaluate(segments, yafter, t):
+    """Value at time t of the state transition network declared for the segments"""
+    for t0, t1, y0, slope in segments:
+        if t < t1:
+            return y0 + slope*(t - t0)
+    return yafter
+
+
+@pytest.mark.parametrize("yvec", [np.array([0., 2., -1., 3.]),
+                                  np.array([[0., 1.], [2., 1.], [-1., 0.], [3., 5.]])])
+def test_segments(yvec):
+    tvec = np.array([0., 1., 1.5, 4.])
+    segments, tkept, _ = utils.get_piecewise_linear_segments(tvec, yvec)
+    assert len(segments) == len(tvec) - 1
+    np.testing.assert_array_equal(tkept, tvec)
+    # Each interval ends where the next one starts
+    for (_, t1, _, _), (t0, _, _, _) in zip(segments[:-1], segments[1:]):
+        assert t1 == t0
+    # Linear interpolation within the intervals, continuous at their boundaries
+    times = np.hstack((np.linspace(0., 4., 81)[:-1], tvec[1:-1] - 1e-12))
+    for t in times:
+        expected = [np.interp(t, tvec, y) for y in yvec.reshape(len(tvec), -1).T]
+        np.testing.assert_allclose(evaluate(segments, None, t),
+                                   np.reshape(expected, yvec.shape[1:]), atol=1e-10)
+    # From the last time on, the values after the last time are used
+    assert evaluate(segments, 0., tvec[-1]) == 0.
+    assert evaluate(segments, 0., 10.) == 0.
+
+
+def test_segments_repeated_times():
+    # Steps are not represented, the first of repeated times is used
+    segments, tkept, ykept = utils.get_piecewise_linear_segments([0., 1., 1., 2.],
+                                                                 [0., 1., 5., 6.])
+    np.testing.assert_array_equal(tkept, [0., 1., 2.])
+    np.testing.assert_array_equal(ykept, [0., 1., 6.])
+    assert [segment[3] for segment in segments] == [1., 5.]
+
+
+def test_declare_segments():
+    dae = pytest.importorskip("daetools.pyDAE")
+
+    class Model:
+        def __init__(self):
+            self.calls = []
+
+        def IF(self, condition, eventTolerance):
+            self.calls.append("IF")
+
+        def ELSE_IF(self, condition, eventTolerance):
+            self.calls.append("ELSE_IF")
+
+        def ELSE(self):
+            self.calls.append("ELSE")
+
+        def END_IF(self):
+            self.calls.append("END_IF")
+    model = Model()
+    values = []
+    tvec = np.linspace(0., 1., 5)
+    yvec = np.ones((5, 3))
+    utils.declare_piecewise_linear_time(model, tvec, yvec, values.append, yafter=0.)
+    # One state per interval, and one after the last time
+    assert model.calls == ["IF"] + 3*["ELSE_IF"] + ["ELSE", "END_IF"]
+    assert len(values) == 5
+    assert all(len(value) == 3 for value in values)
+    assert all(isinstance(value, dae.adouble) for value in values[-1])